@@ -0,0 +1,79 @@
+"""Benchmark di quick_save / load_recipe / undo su una ricetta grande.
+
+Uso:  python -m scripts.bench_storage [--steps N] [--repeat R]
+
+Confronta i codec JSON disponibili (stdlib ``json``, ``orjson`` se
+installato) e le strategie di snapshot dello stack undo con il vecchio
+giro ``json.loads(json.dumps(state))``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from template_builder.services import storage
+
+
+def _big_recipe(steps: int) -> dict:
+    state = {f"STEP{i}": f"Passo {i}: " + "mescola bene " * 20 for i in range(1, steps + 1)}
+    state.update({f"FIELD_{i}": "testo " * 30 for i in range(200)})
+    state["IMAGES_STEP"] = [f"https://cdn.example.com/img/{i}.jpg" for i in range(steps)]
+    state["STEPS"] = [
+        {"IMG_SRC": f"{i}.jpg", "IMG_ALT": f"Passo {i}", "TEXT": "x" * 80, "ORDER": i}
+        for i in range(1, steps + 1)
+    ]
+    return state
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main() -> None:  # pragma: no cover
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--steps", type=int, default=300)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+    state = _big_recipe(args.steps)
+    print(f"ricetta: {len(state)} chiavi, {len(json.dumps(state)) // 1024} KiB")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage._HISTORY_DIR = Path(tmp)
+        for name in ("json", "orjson"):
+            try:
+                previous = storage.set_json_codec(name)
+            except ValueError:
+                print(f"{name:>7}: non installato")
+                continue
+            path = storage.quick_save(state)
+            save = _time(lambda: storage.quick_save(state), args.repeat)
+            load = _time(lambda: storage.load_recipe(path), args.repeat)
+            print(f"{name:>7}: quick_save {save:7.2f} ms   load_recipe {load:7.2f} ms")
+            storage.set_json_codec(previous)
+
+    def legacy_undo() -> None:
+        stack = [json.loads(json.dumps(state)) for _ in range(10)]
+        [json.loads(json.dumps(s)) for s in stack]
+
+    def stack_undo() -> None:
+        stack = storage.UndoRedoStack()
+        for _ in range(10):
+            stack.push(recipe)
+        while stack.undo() is not None:
+            pass
+
+    recipe = storage.Recipe(state)
+    print(f"   undo: json round-trip {_time(legacy_undo, args.repeat):7.2f} ms   "
+          f"Recipe {_time(stack_undo, args.repeat):7.2f} ms   (10 push + 9 undo)")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -2,19 +2,131 @@
 
 from .builder_core import TemplateBuilderApp
 import argparse
+from typing import List, Optional
 
 
-def main() -> None:
+def _history_gc(args: argparse.Namespace) -> int:
+    from .services.history import RetentionPolicy, compact_history
+
+    policy = RetentionPolicy(args.keep_hours, args.hourly_hours, args.daily_days)
+    report = compact_history(args.folder, policy, dry_run=args.dry_run)
+    print(("[dry-run] " if args.dry_run else "") + str(report))
+    return 0
+
+
+def _search(args: argparse.Namespace) -> int:
+    from .services.search import RecipeIndex
+
+    index = RecipeIndex(args.db, folder=args.folder)
+    try:
+        index.refresh()
+        hits = index.search(" ".join(args.query), args.limit)
+    finally:
+        index.close()
+    for hit in hits:
+        print(f"{hit.score:8.2f}  {hit.title or '-'}  {hit.path}")
+    return 0 if hits else 1
+
+
+def _migrate(args: argparse.Namespace) -> int:
+    import json
+
+    from .services.migration import migrate_tree
+
+    report = migrate_tree(args.root, workers=args.workers, backup=not args.no_backup,
+                          dry_run=args.dry_run)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as fh:
+            json.dump(report.to_dict(), fh, ensure_ascii=False, indent=2)
+    if args.verbose:
+        for r in report.results:
+            if r.status != "current":
+                print(f"{r.status:9} {r.path}  {r.detail}")
+    for r in report.errors:
+        print(f"ERRORE {r.path}: {r.detail}")
+    print(("[dry-run] " if args.dry_run else "") + str(report))
+    return 1 if report.errors else 0
+
+
+def _export(args: argparse.Namespace) -> int:
+    from .services.export import export_incremental, jobs_from_folder
+
+    jobs = jobs_from_folder(args.recipes, args.template, args.out)
+    report = export_incremental(jobs, force=args.force)
+    for out, err in report.errors.items():
+        print(f"ERRORE {out}: {err}")
+    print(str(report))
+    return 1 if report.errors else 0
+
+
+def _render(args: argparse.Namespace) -> int:
+    from .services.storage import load_recipe, render_many
+
+    results = render_many(load_recipe(args.recipe), args.template, out_dir=args.out,
+                          workers=args.workers)
+    for r in results:
+        where = r.path if r.path else f"{len(r.html)} caratteri"
+        status = f"ERRORE {r.error}" if r.error else str(where)
+        print(f"{r.seconds * 1000:8.1f} ms  {r.template.name}  {status}")
+    return 0 if all(r.ok for r in results) else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(prog="template_builder")
     # NOTA: non servono manualmente --help/-h, Argparse li genera di default
-    # Aggiungi qui altre opzioni se necessario:
-    # parser.add_argument("--verbose", "-v", action="store_true", help="Verbose output")
-    parser.parse_args()
+    sub = parser.add_subparsers(dest="command")
+
+    gc = sub.add_parser("history-gc", help="applica la retention alla cartella storia")
+    gc.add_argument("--folder", default=None, help="cartella storia (default ~/.template_builder/history)")
+    gc.add_argument("--keep-hours", type=float, default=6, help="conserva tutto per N ore")
+    gc.add_argument("--hourly-hours", type=float, default=24, help="una istantanea per ora fino a N ore")
+    gc.add_argument("--daily-days", type=float, default=30, help="una istantanea al giorno fino a N giorni")
+    gc.add_argument("--dry-run", action="store_true", help="mostra cosa verrebbe fatto")
+    gc.set_defaults(func=_history_gc)
+
+    search = sub.add_parser("search", help="cerca tra le ricette salvate")
+    search.add_argument("query", nargs="+", help="parole da cercare (anche prefissi)")
+    search.add_argument("--limit", type=int, default=20)
+    search.add_argument("--folder", default=None, help="cartella storia (default ~/.template_builder/history)")
+    search.add_argument("--db", default=None, help="database dell'indice (default ~/.template_builder/search.sqlite)")
+    search.set_defaults(func=_search)
+
+    migrate = sub.add_parser("migrate", help="migra le ricette v1/batch-1 allo schema v2")
+    migrate.add_argument("root", help="cartella (esplorata ricorsivamente) o singolo file")
+    migrate.add_argument("--workers", type=int, default=None, help="processi paralleli (default: CPU)")
+    migrate.add_argument("--no-backup", action="store_true", help="non conservare i file originali (.v1.bak)")
+    migrate.add_argument("--dry-run", action="store_true", help="mostra cosa verrebbe migrato")
+    migrate.add_argument("--report", default=None, help="scrive il resoconto JSON in questo file")
+    migrate.add_argument("-v", "--verbose", action="store_true", help="elenca i file migrati/saltati")
+    migrate.set_defaults(func=_migrate)
+
+    export = sub.add_parser("export", help="esporta in HTML solo le inserzioni cambiate")
+    export.add_argument("recipes", help="cartella delle ricette JSON")
+    export.add_argument("--template", required=True, help="template HTML da usare")
+    export.add_argument("--out", required=True, help="cartella di output (contiene il manifest)")
+    export.add_argument("--force", action="store_true", help="rigenera tutto ignorando il manifest")
+    export.set_defaults(func=_export)
+
+    render = sub.add_parser("render", help="renderizza una ricetta con uno o più template")
+    render.add_argument("recipe", help="file JSON della ricetta")
+    render.add_argument("-t", "--template", action="append", required=True,
+                        help="template HTML (ripetibile: un output per template)")
+    render.add_argument("--out", default=None, help="cartella di output (default: solo tempi)")
+    render.add_argument("--workers", type=int, default=1, help="thread paralleli")
+    render.set_defaults(func=_render)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if getattr(args, "func", None):
+        return args.func(args)
 
     app = TemplateBuilderApp()
     if app.root:
         app.root.mainloop()
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
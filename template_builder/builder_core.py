@@ -3,9 +3,11 @@ from __future__ import annotations
 import importlib
 import os
 import sys
+import threading
 import types
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Dict, Iterator, List, Set, Tuple, Optional
 
 # Optional safe imports for GUI modules and services
 def _safe(name: str) -> types.ModuleType:
@@ -28,10 +30,12 @@ PlaceholderEntry          = getattr(_widgets_mod, "PlaceholderEntry", object)
 PlaceholderMultiTextField = getattr(_widgets_mod, "PlaceholderMultiTextField", object)
 PlaceholderSpinbox        = getattr(_widgets_mod, "PlaceholderSpinbox", object)
 SortableImageRepeaterField= getattr(_widgets_mod, "SortableImageRepeaterField", object)
+VirtualFieldPanel         = getattr(_widgets_mod, "VirtualFieldPanel", None)
 UndoRedoStack             = getattr(_services, "UndoRedoStack", lambda: None)
 quick_save_fn             = getattr(_services, "quick_save",   lambda *_: None)
 load_recipe_fn            = getattr(_services, "load_recipe",  lambda *_: {})
 export_html_fn            = getattr(_services, "export_html",  None)
+unregister_save_hook_fn   = getattr(_services, "unregister_save_hook", None)
 PreviewEngine             = getattr(_preview_mod, "PreviewEngine", None)
 bind_mousewheel           = getattr(_ui_utils, "bind_mousewheel", lambda w: None)
 show_info    = getattr(_ui_utils, "show_info",    lambda *a, **k: None)
@@ -41,6 +45,9 @@ styled_option_menu = getattr(_ui_utils, "styled_option_menu", None)
 styled_spinbox     = getattr(_ui_utils, "styled_spinbox", None)
 StyledText         = getattr(_ui_utils, "StyledText", None)
 bind_steps_fn = getattr(_stepimg_mod, "bind_steps", None)   # ⇦ NUOVO
+bind_steps_cached_fn = getattr(_stepimg_mod, "bind_steps_cached", None)
+step_count_fn        = getattr(_stepimg_mod, "step_count", lambda keys: 0)
+StepList             = getattr(_stepimg_mod, "StepList", None)
 
 # Directories for templates and exports (ensure existence)
 _BASE_DIR        = Path(__file__).resolve().parent
@@ -57,6 +64,24 @@ _text_mod = _safe("template_builder.services.text")
 extract_placeholders_fn = getattr(_text_mod, "extract_placeholders", lambda src: set())
 smart_paste_fn          = getattr(_text_mod, "smart_paste", lambda raw: [raw] if isinstance(raw, str) else [str(x) for x in raw])
 
+# Persistent template catalog (placeholders, image groups, loops per template)
+_catalog_mod = _safe("template_builder.services.catalog")
+TemplateCatalog          = getattr(_catalog_mod, "TemplateCatalog", None)
+classify_image_groups_fn = getattr(_catalog_mod, "classify_image_groups", None)
+_model_mod = _safe("template_builder.model")
+Recipe                   = getattr(_model_mod, "Recipe", None)
+_field_model_mod = _safe("template_builder.field_model")
+FieldModel               = getattr(_field_model_mod, "FieldModel", None)
+_autosave_mod = _safe("template_builder.services.autosave")
+AutosaveJournal          = getattr(_autosave_mod, "AutosaveJournal", None)
+_history_mod = _safe("template_builder.services.history")
+BackgroundCompactor      = getattr(_history_mod, "BackgroundCompactor", None)
+_search_mod = _safe("template_builder.services.search")
+RecipeIndex              = getattr(_search_mod, "RecipeIndex", None)
+install_save_hook_fn     = getattr(_search_mod, "install_save_hook", None)
+_watcher_mod = _safe("template_builder.services.watcher")
+TemplateWatcher          = getattr(_watcher_mod, "TemplateWatcher", None)
+
 class TemplateBuilderApp:
     """Modern, modular controller for Template Builder."""
     _SHORTCUTS: List[Tuple[str, str]] = [
@@ -66,13 +91,15 @@ class TemplateBuilderApp:
         ("<Command-s>", "quick_save"),   # macOS
         ("<Command-z>", "edit_undo"),
         ("<Command-y>", "edit_redo"),
+        ("<Control-o>", "open_recipe_dialog"),
+        ("<Command-o>", "open_recipe_dialog"),
     ]
 
     def __init__(self, *, enable_gui: bool | None = None) -> None:
         self.enable_gui = self._display_available() if enable_gui is None else enable_gui
         self.root = tk.Tk() if self.enable_gui and tk else None
         self._undo = UndoRedoStack()
-        self._state: Dict[str, Any] = {}
+        self._state = {}
         # Dynamic fields and image lists
         self.fields: Dict[str, Any] = {}
         self.img_desc = self.img_rec = self.img_step = self.img_other = None
@@ -80,6 +107,22 @@ class TemplateBuilderApp:
         # Image columns variables
         self.cols_desc = None
         self.cols_rec = None
+        self.catalog = None
+        self.template_entry = None
+        self._template_names: List[str] = []
+        self._tabs: Dict[str, Any] = {}
+        self._tab_inner: Dict[str, Any] = {}
+        self._panels: Dict[str, Any] = {}   # field tab -> VirtualFieldPanel
+        self._layout: Optional[Dict[str, Any]] = None
+        # Values of every field (also for tabs whose widgets are not built yet)
+        self.model = FieldModel() if FieldModel else None
+        self._built_tabs: set = set()
+        self._preview_hold = 0          # > 0 while a batch of widget updates runs
+        self._preview_pending = False
+        self.autosave = None
+        self._history_gc = None
+        self.search_index = None
+        self._search_hook = None
 
         if self.root:
             # Apply dark theme if available
@@ -94,10 +137,128 @@ class TemplateBuilderApp:
             self._bind_global_shortcuts()
             # Load templates and auto-select first
             self._load_templates()
+            self._start_autosave()
+            if BackgroundCompactor is not None:
+                self._history_gc = BackgroundCompactor().start()
+            self._start_search_index()
+            self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+
+    # ------------------------------------------------------------------ autosave
+    def _start_autosave(self) -> None:
+        """Restore the previous session from the journal, then journal every field edit."""
+        if AutosaveJournal is None or self.model is None:
+            return
+        try:
+            self.autosave = AutosaveJournal()
+            restored = self.autosave.replay()
+        except Exception:
+            self.autosave = None
+            return
+        if restored:
+            self._state = restored
+            self._apply_state_to_widgets()
+        self.model.observe(self._autosave_field)
+
+    # ------------------------------------------------------------------ search
+    def _start_search_index(self) -> None:
+        """Open the recipe index, keep it updated on save, catch up in background."""
+        if RecipeIndex is None:
+            return
+        try:
+            self.search_index = RecipeIndex()
+        except Exception:
+            return
+        if callable(install_save_hook_fn):
+            self._search_hook = install_save_hook_fn(self.search_index)
+        threading.Thread(target=self.search_index.refresh, name="search-refresh", daemon=True).start()
+
+    def search_recipes(self, query: str, limit: int = 50) -> List[Any]:
+        """Ranked saved recipes matching *query* (``SearchHit`` list)."""
+        if self.search_index is None:
+            return []
+        try:
+            return self.search_index.search(query, limit)
+        except Exception:
+            return []
+
+    def open_recipe_dialog(self, *_: Any) -> None:
+        """Search-as-you-type dialog over saved recipes; double-click opens one."""
+        if not self.root or not tk:
+            return
+        win = tk.Toplevel(self.root)
+        win.title("Apri ricetta")
+        win.geometry("640x420")
+        query = ttk.Entry(win)
+        query.pack(fill="x", padx=8, pady=8)
+        listbox = tk.Listbox(win, activestyle="dotbox")
+        listbox.pack(fill="both", expand=True, padx=8, pady=(0, 8))
+        hits: List[Any] = []
+
+        def refresh(_event: Any = None) -> None:
+            hits[:] = self.search_recipes(query.get())
+            listbox.delete(0, tk.END)
+            for hit in hits:
+                listbox.insert(tk.END, f"{hit.title or Path(hit.path).name}  —  {Path(hit.path).name}")
+
+        def open_selected(_event: Any = None) -> None:
+            sel = listbox.curselection()
+            if sel:
+                self.load_recipe(hits[sel[0]].path)
+                win.destroy()
+
+        query.bind("<KeyRelease>", refresh, add="+")
+        listbox.bind("<Double-Button-1>", open_selected, add="+")
+        listbox.bind("<Return>", open_selected, add="+")
+        query.focus_set()
+
+    def _autosave_field(self, key: str) -> None:
+        if self.autosave is not None:
+            self.autosave.record(key, self.model.get(key, None))
+
+    def _on_close(self) -> None:
+        if self._history_gc is not None:
+            self._history_gc.stop()
+        if self.autosave is not None:
+            try:
+                self.autosave.close()
+                self.autosave.discard()     # clean exit: nothing to recover
+            except Exception:
+                pass
+        self._close_search_index()
+        if self.root:
+            self.root.destroy()
+
+    def _close_search_index(self) -> None:
+        """Detach the save hook and close the index (the global hook list would keep it alive)."""
+        if self._search_hook is not None and unregister_save_hook_fn is not None:
+            unregister_save_hook_fn(self._search_hook)
+        self._search_hook = None
+        if self.search_index is not None:
+            try:
+                self.search_index.close()
+            except Exception:
+                pass
+            self.search_index = None
+
+    @property
+    def _state(self) -> Any:
+        """Current recipe state: a plain dict with JSON-native values."""
+        return self._recipe
+
+    @_state.setter
+    def _state(self, value: Any) -> None:
+        if Recipe is not None and isinstance(value, Recipe):
+            value = value.to_dict()
+        self._recipe = value if type(value) is dict else dict(value)
 
     def quick_save(self, *_: Any) -> None:
-        """Save current state to history (JSON)."""
+        """Save current state to history (JSON) and restart the journal from it."""
         quick_save_fn(self._state)
+        if self.autosave is not None:
+            try:
+                self.autosave.checkpoint(self._state)
+            except Exception:
+                pass
 
     def edit_undo(self, *_: Any) -> None:
         """Alias for undo (for menu/shortcuts)."""
@@ -112,14 +273,12 @@ class TemplateBuilderApp:
         if new_state is not None:
             self._state = new_state
             self._apply_state_to_widgets()
-            self.update_preview()
 
     def redo(self, *_: Any) -> None:
         new_state = self._undo.redo()
         if new_state is not None:
             self._state = new_state
             self._apply_state_to_widgets()
-            self.update_preview()
 
     def load_recipe(self, path: os.PathLike | str) -> None:
         """Load a saved recipe (JSON state file)."""
@@ -127,12 +286,30 @@ class TemplateBuilderApp:
             self._state = load_recipe_fn(path)
             self._undo.push(self._state)
             self._apply_state_to_widgets()
-            self.update_preview()
         except (FileNotFoundError, OSError, ValueError, TypeError):
             self._state = {}
 
+    @contextmanager
+    def _batch_updates(self) -> Iterator[None]:
+        """Hold preview requests (e.g. widget on_change) and render once at the end.
+
+        Requests made during the batch are coalesced in ``_preview_pending``;
+        a batch that requested none renders nothing.
+        """
+        self._preview_hold += 1
+        try:
+            yield
+        finally:
+            self._preview_hold -= 1
+            if not self._preview_hold and self._preview_pending:
+                self._preview_pending = False
+                self.update_preview()
+
     def update_preview(self) -> None:
         """Render current state into preview (no-op if head-less)."""
+        if self._preview_hold:
+            self._preview_pending = True
+            return
         if hasattr(self, "preview_engine") and self.preview_engine:
             html: Optional[str] = None
             # Use Jinja engine if available and template loaded
@@ -152,18 +329,16 @@ class TemplateBuilderApp:
         placeholders = set()
         if getattr(self, "template_src", None):
             placeholders = set(extract_placeholders_fn(self.template_src))
+        elif self.template_entry is not None:
+            placeholders = set(self.template_entry.placeholders)
 
-        # individua i gruppi immagini (gruppi con SRC+ALT)
-        img_grps = {
-            ph[:-4]
-            for ph in placeholders
-            if ph.endswith("_SRC") and f"{ph[:-4]}_ALT" in placeholders
-        }
-
-        # suddividi i gruppi nelle categorie (solo per compatibilità futura)
-        desc_groups  = {g for g in img_grps if "DESC"   in g.upper()}
-        rec_groups   = {g for g in img_grps if "REC"    in g.upper()}
-        other_groups = img_grps - desc_groups - rec_groups
+        # individua i gruppi immagini (gruppi con SRC+ALT) e suddividili
+        # nelle categorie (solo per compatibilità futura)
+        if callable(classify_image_groups_fn):
+            desc, rec, other = classify_image_groups_fn(placeholders)
+        else:
+            desc = rec = other = []
+        desc_groups, rec_groups, other_groups = set(desc), set(rec), set(other)
 
         state_keys = set(self._state.keys())
         audit_lines: List[str] = []
@@ -201,6 +376,7 @@ class TemplateBuilderApp:
         self.nb = ttk.Notebook(self.root)
         self.nb.pack(fill="both", expand=True)
         bind_mousewheel(self.nb)
+        self.nb.bind("<<NotebookTabChanged>>", self._on_tab_changed, add="+")
         # Top bar for template selection and save
         top = ttk.Frame(self.root); top.pack(fill="x", padx=8, pady=(4, 0))
         ttk.Label(top, text="Template:").pack(side="left")
@@ -237,6 +413,11 @@ class TemplateBuilderApp:
         edit_menu.add_command(label="Audit Segnaposti", accelerator="F11",
                               command=self.audit_placeholders)
         self.root.bind_all("<F11>", lambda e: self.audit_placeholders(), add="+")
+        file_menu = tk.Menu(menubar, tearoff=False)
+        file_menu.add_command(label="Apri ricetta…", accelerator="Ctrl+O",
+                              command=self.open_recipe_dialog)
+        file_menu.add_command(label="Salva", accelerator="Ctrl+S", command=self.quick_save)
+        menubar.add_cascade(label="File", menu=file_menu)
         menubar.add_cascade(label="Edit", menu=edit_menu)
         self.root.config(menu=menubar)
         self._menu_edit = edit_menu
@@ -254,10 +435,32 @@ class TemplateBuilderApp:
         if not hasattr(self, "template_var"):
             return
         try:
-            files = sorted(p.name for p in TEMPLATE_FOLDER.glob("*.html"))
+            if self.catalog is None and TemplateCatalog:
+                self.catalog = TemplateCatalog(TEMPLATE_FOLDER)
+            if self.catalog is not None:
+                self.catalog.refresh()
+                files = self.catalog.names(partials=False)
+            else:
+                files = sorted(p.name for p in TEMPLATE_FOLDER.glob("*.html"))
         except Exception:
             files = []
-        # Update dropdown/combobox options
+        self._set_template_choices(files)
+        self._start_template_watcher()
+        if files:
+            # Reload template on selection change
+            try:
+                self.template_var.trace_add("write", lambda *_: self.reload_template())
+            except Exception:
+                try:  # fallback for older tkinter
+                    self.template_var.trace("w", lambda *_: self.reload_template())
+                except Exception:
+                    pass
+            self.template_var.set(files[0])
+        else:
+            self.status.config(text="Nessun template trovato", foreground="#d9534f")
+    def _set_template_choices(self, files: List[str]) -> None:
+        """Update dropdown/combobox options."""
+        self._template_names = list(files)
         try:
             menu_widget = self.cbo["menu"]
         except Exception:
@@ -272,27 +475,16 @@ class TemplateBuilderApp:
                     self.cbo.configure(values=files)
                 except Exception:
                     pass
-        if files:
-            # Reload template on selection change
-            try:
-                self.template_var.trace_add("write", lambda *_: self.reload_template())
-            except Exception:
-                try:  # fallback for older tkinter
-                    self.template_var.trace("w", lambda *_: self.reload_template())
-                except Exception:
-                    pass
-            self.template_var.set(files[0])
-        else:
-            self.status.config(text="Nessun template trovato", foreground="#d9534f")
-    def reload_template(self) -> None:
-        """Load the selected template file and rebuild UI fields."""
-        # Clear existing tabs and state
-        for tab_id in list(self.nb.tabs()):
-            self.nb.forget(tab_id)
-        self.fields.clear()
-        self.img_desc = self.img_rec = self.img_step = self.img_other = None
-        self.preview_engine = None
 
+    def reload_template(self) -> None:
+        """Load the selected template and sync UI fields with its placeholders.
+
+        Values live in the field model, so those of placeholders shared with
+        the previous template survive the switch.  Only tabs whose keys or
+        image groups changed are synced, and only if already built: their
+        virtual panels rebind the recycled slots to the new keys, so no field
+        widget is created or destroyed.
+        """
         template_name = self.template_var.get()
         if not template_name:
             return
@@ -301,45 +493,185 @@ class TemplateBuilderApp:
             show_error("Errore", f"Template '{template_name}' non trovato")
             return
         self.template_path = tpl_path
-        try:
-            template_src = tpl_path.read_text(encoding="utf-8")
-        except Exception as e:
-            show_error("Errore", f"Impossibile leggere il template: {e}")
+        layout = self._template_layout(template_name)
+        if layout is None:
             return
-        placeholders = extract_placeholders_fn(template_src)
-        if not isinstance(placeholders, set):
-            placeholders = set(placeholders)
-
-        # Identify image placeholder groups (with both _SRC and _ALT)
-        img_groups = {
-            tag[:-4] for tag in placeholders
-            if tag.endswith("_SRC") and f"{tag[:-4]}_ALT" in placeholders
-        }
-        desc_groups = sorted(g for g in img_groups if "DESC" in g.upper())
-        rec_groups  = sorted(g for g in img_groups if any(r in g.upper() for r in ("REC", "RECIPE")))
-        other_groups= sorted(set(img_groups) - set(desc_groups) - set(rec_groups))
-
-        # Create tabs for fields
-        prod_tab   = self._make_scrollable(self._add_tab("Product"))
-        recipe_tab = self._make_scrollable(self._add_tab("Recipe"))
-        other_tab  = self._make_scrollable(self._add_tab("Other"))
-        images_tab = self._make_scrollable(self._add_tab("Images"))
-
-        # Create input fields for each non-image placeholder
+
+        if not self._tabs:
+            # First template: create the (empty) tab set once; contents are
+            # built on the first visit of each tab (see _ensure_tab_built)
+            for title in (*self._FIELD_TABS, "Images", "Preview"):
+                self._tabs[title] = self._add_tab(title)
+            if self.model is not None:
+                # column defaults of the Images tab spinboxes
+                for key, default in (("COLS_DESC", 2), ("COLS_REC", 1)):
+                    self.model.set(key, self.model.get(key, None) or default)
+        self._apply_layout(layout)
+        self._ensure_tab_built(self._selected_tab())
+
+        # Initial preview update
+        self.detail_frame.pack_forget()
+        self.update_preview()
+
+    # ------------------------------------------------------------------ layout
+    _FIELD_TABS: Tuple[str, ...] = ("Product", "Recipe", "Other")
+
+    @staticmethod
+    def _field_slot(key: str) -> Tuple[str, str]:
+        """(tab, auto_format mode) for a non-image placeholder."""
+        if key.startswith(("TITLE", "PROD")) or "DESC" in key.upper():
+            return "Product", "p"
+        if key.startswith(("RECIPE", "STEP", "TIME", "INGREDIENT")):
+            return "Recipe", "ul"
+        return "Other", "p"
+
+    def _template_layout(self, template_name: str) -> Optional[Dict[str, Any]]:
+        """Keys per field tab + image groups, from the catalog (or the file)."""
+        self.template_src = None
+        entry = None
+        if self.catalog is not None:
+            try:
+                entry = self.catalog.get(template_name)
+            except Exception:
+                entry = None
+        self.template_entry = entry
+        if entry is not None and entry.deps:
+            # include the placeholders of included partials / extended layouts
+            placeholders = set(self.catalog.placeholders_of(template_name))
+            groups = (classify_image_groups_fn(placeholders)
+                      if callable(classify_image_groups_fn) else ([], [], []))
+        elif entry is not None:
+            placeholders = set(entry.placeholders)
+            groups = (entry.desc_groups, entry.rec_groups, entry.other_groups)
+        else:
+            try:
+                template_src = (TEMPLATE_FOLDER / template_name).read_text(encoding="utf-8")
+            except Exception as e:
+                show_error("Errore", f"Impossibile leggere il template: {e}")
+                return None
+            self.template_src = template_src
+            placeholders = set(extract_placeholders_fn(template_src))
+            groups = (classify_image_groups_fn(placeholders)
+                      if callable(classify_image_groups_fn) else ([], [], []))
+        layout: Dict[str, Any] = {title: [] for title in self._FIELD_TABS}
         for key in sorted(placeholders):
-            if key.endswith("_SRC") or key.endswith("_ALT") or key in self.fields:
+            if key.endswith("_SRC") or key.endswith("_ALT"):
                 continue
-            if key.startswith(("TITLE", "PROD")) or "DESC" in key.upper():
-                parent, mode = prod_tab, "p"
-            elif key.startswith(("RECIPE", "STEP", "TIME", "INGREDIENT")):
-                parent, mode = recipe_tab, "ul"
+            layout[self._field_slot(key)[0]].append(key)
+        layout["Images"] = tuple(tuple(g) for g in groups)
+        layout["placeholders"] = frozenset(placeholders)
+        return layout
+
+    def _apply_layout(self, new: Dict[str, Any]) -> None:
+        """Sync only the tabs whose keys or image groups differ from the current layout.
+
+        The field model is always updated; widgets only for tabs already built.
+        """
+        old = self._layout or {}
+        for title in self._FIELD_TABS:
+            if new[title] != old.get(title):
+                if self.model is not None:
+                    for key in old.get(title, ()):
+                        self.model.undefine(key)
+                    for key in new[title]:
+                        self.model.define(key, title, self._field_slot(key)[1])
+                if title in self._built_tabs:
+                    self._sync_field_tab(title, new[title])
+        if new["Images"] != old.get("Images") and "Images" in self._built_tabs:
+            self._sync_image_groups(*new["Images"])
+        self._layout = new
+
+    # ------------------------------------------------------------------ lazy tabs
+    _IMAGE_KEYS: Tuple[Tuple[str, str], ...] = (
+        ("IMAGES_DESC", "img_desc"), ("IMAGES_REC", "img_rec"), ("IMAGES_STEP", "img_step"),
+    )
+
+    def _selected_tab(self) -> str:
+        try:
+            return self.nb.tab(self.nb.select(), "text")
+        except Exception:
+            return ""
+
+    def _on_tab_changed(self, _event: Any = None) -> None:
+        self._ensure_tab_built(self._selected_tab())
+
+    def _ensure_tab_built(self, title: str) -> None:
+        """Build the contents of *title* on its first visit, from the model."""
+        if title in self._built_tabs or title not in self._tabs or self._layout is None:
+            return
+        self._built_tabs.add(title)
+        if title in self._FIELD_TABS:
+            self._panels[title] = self._make_field_panel(self._tabs[title])
+            self._sync_field_tab(title, self._layout[title])
+        elif title == "Images":
+            self._tab_inner[title] = self._make_scrollable(self._tabs[title])
+            self._build_images_tab()
+            self._sync_image_groups(*self._layout["Images"])
+            self._load_images_from_model()
+        elif title == "Preview":
+            self._build_preview_tab(self._tabs[title])
+            self.update_preview()
+
+    def _load_images_from_model(self, keys: Optional[Set[str]] = None) -> None:
+        """Fill the Images tab widgets from the model (only *keys* if given)."""
+        if self.model is None:
+            return
+        for key in ("HERO_IMAGE_SRC", "HERO_IMAGE_ALT"):
+            if keys is None or key in keys:
+                self._set_widget_value(self.fields.get(key), self.model.get(key), clear=keys is not None)
+        for key, attr in self._IMAGE_KEYS:
+            urls = self.model.get(key, None)
+            rep = getattr(self, attr, None)
+            if (keys is None or key in keys) and urls and hasattr(rep, "set_urls"):
+                rep.set_urls(list(urls))
+        for key, var in (("COLS_DESC", self.cols_desc), ("COLS_REC", self.cols_rec)):
+            val = self.model.get(key, None)
+            if (keys is None or key in keys) and val:
+                try:
+                    var.set(int(val))
+                except Exception:
+                    pass
+
+    @staticmethod
+    def _widget_value(widget: Any) -> str:
+        return (widget.get_value() if hasattr(widget, "get_value") else
+                widget.get_raw()   if hasattr(widget, "get_raw") else
+                widget.get().strip())
+
+    @staticmethod
+    def _set_widget_value(widget: Any, val: Any, clear: bool = False) -> None:
+        """Write *val* into *widget*; empty values are skipped unless *clear*."""
+        if widget is None or not (val or clear):
+            return
+        try:
+            if hasattr(widget, "set_value"):
+                widget.set_value(str(val))
+            elif hasattr(widget, "text"):  # multi-line text widget
+                widget.text.delete("1.0", _tk.END)
+                widget.text.insert("1.0", str(val))
             else:
-                parent, mode = other_tab, "p"
-            ttk.Label(parent, text=key).pack(anchor="w", padx=6, pady=2)
-            fld = (PlaceholderMultiTextField(parent, placeholder=f"{{{{{key}}}}}", mode=mode, on_change=self.update_preview)
-                   if PlaceholderMultiTextField is not object else ttk.Entry(parent))
-            fld.pack(fill="x", padx=6, pady=(0, 4))
-            self.fields[key] = fld
+                widget.delete(0, _tk.END)
+                widget.insert(0, str(val))
+        except Exception:
+            pass
+
+    def _sync_field_tab(self, title: str, keys: List[str]) -> None:
+        """Show *keys* in the field panel of *title* (slots are reused, values kept in the model)."""
+        panel = self._panels.get(title)
+        if panel is not None:
+            panel.set_keys(keys)
+
+    def _make_field_panel(self, parent: Any) -> Any:
+        """Virtualized field list: only rows in view have widgets."""
+        if VirtualFieldPanel is None or self.model is None:
+            return None
+        panel = VirtualFieldPanel(parent, self.model, on_change=self.update_preview)
+        panel.pack(fill="both", expand=True)
+        return panel
+
+    def _build_images_tab(self) -> None:
+        """Build hero entry, image repeaters and column controls (once)."""
+        images_tab = self._tab_inner["Images"]
 
         # Hero image (single)
         lf_hero = ttk.LabelFrame(images_tab, text="Hero Image")
@@ -357,57 +689,14 @@ class TemplateBuilderApp:
         self.fields["HERO_IMAGE_ALT"] = e_hero_alt
 
         # Image repeater fields
-        lf_desc = ttk.LabelFrame(images_tab, text="Description Images")
-        lf_desc.pack(fill="x", padx=6, pady=4)
-        self.img_desc = SortableImageRepeaterField(lf_desc) if SortableImageRepeaterField is not object else ttk.Frame(lf_desc)
-        self.img_desc.pack(fill="x", padx=6, pady=(0, 4))
-        for grp in desc_groups:
-            try:
-                add = getattr(self.img_desc, "_add_row", None)
-                if callable(add):
-                    add(f"{{{{{grp}_SRC}}}}")
-            except Exception:
-                pass
-
-        lf_rec = ttk.LabelFrame(images_tab, text="Recipe Images")
-        lf_rec.pack(fill="x", padx=6, pady=4)
-        self.img_rec = SortableImageRepeaterField(lf_rec) if SortableImageRepeaterField is not object else ttk.Frame(lf_rec)
-        self.img_rec.pack(fill="x", padx=6, pady=(0, 4))
-        for grp in rec_groups:
-            try:
-                add = getattr(self.img_rec, "_add_row", None)
-                if callable(add):
-                    add(f"{{{{{grp}_SRC}}}}")
-            except Exception:
-                pass
-
-        lf_step = ttk.LabelFrame(images_tab, text="Step Images")
-        lf_step.pack(fill="x", padx=6, pady=4)
-        self.img_step = SortableImageRepeaterField(lf_step) if SortableImageRepeaterField is not object else ttk.Frame(lf_step)
-        self.img_step.pack(fill="x", padx=6, pady=(0, 4))
-        for n in range(1, 4):
-            try:
-                add = getattr(self.img_step, "_add_row", None)
-                if callable(add):
-                    add(f"{{{{STEP{n}_IMG_SRC}}}}")
-            except Exception:
-                pass
-
-        if other_groups:
-            lf_other = ttk.LabelFrame(images_tab, text="Other Images")
-            lf_other.pack(fill="x", padx=6, pady=4)
-            self.img_other = SortableImageRepeaterField(lf_other) if SortableImageRepeaterField is not object else ttk.Frame(lf_other)
-            self.img_other.pack(fill="x", padx=6, pady=(0, 4))
-            for grp in other_groups:
-                try:
-                    add = getattr(self.img_other, "_add_row", None)
-                    if callable(add):
-                        add(f"{{{{{grp}_SRC}}}}")
-                except Exception:
-                    pass
+        self.img_desc = self._image_repeater(images_tab, "Description Images")
+        self.img_rec = self._image_repeater(images_tab, "Recipe Images")
+        self.img_step = self._image_repeater(images_tab, "Step Images", on_move=self.move_step)
+        self._set_repeater_placeholders(self.img_step, [f"{{{{STEP{n}_IMG_SRC}}}}" for n in range(1, 4)])
 
         # Image columns controls
         ctrl = ttk.Frame(images_tab); ctrl.pack(fill="x", pady=6)
+        self._images_ctrl = ctrl
         ttk.Label(ctrl, text="Colonne Descrizione:").pack(side="left", padx=(0, 4))
         self.cols_desc = getattr(_tk, "IntVar", lambda **kw: type("IVar", (), {"get": (lambda self=0: 1), "set": (lambda *a, **k: None)}))()
         try: self.cols_desc.set(2)
@@ -423,8 +712,41 @@ class TemplateBuilderApp:
                   if callable(styled_spinbox) else ttk.Spinbox(ctrl, from_=1, to=4, textvariable=self.cols_rec, width=3))
         spin_r.pack(side="left")
 
-        # Preview tab with live preview
-        prev_frame = self._add_tab("Preview")
+    def _sync_image_groups(self, desc_groups: Tuple[str, ...], rec_groups: Tuple[str, ...],
+                           other_groups: Tuple[str, ...]) -> None:
+        """Update repeater placeholders; create/destroy 'Other Images' as needed."""
+        self._set_repeater_placeholders(self.img_desc, [f"{{{{{g}_SRC}}}}" for g in desc_groups])
+        self._set_repeater_placeholders(self.img_rec, [f"{{{{{g}_SRC}}}}" for g in rec_groups])
+        if other_groups and self.img_other is None:
+            self.img_other = self._image_repeater(self._tab_inner["Images"], "Other Images",
+                                                  before=self._images_ctrl)
+        elif not other_groups and self.img_other is not None:
+            self.img_other.master.destroy()
+            self.img_other = None
+        if self.img_other is not None:
+            self._set_repeater_placeholders(self.img_other, [f"{{{{{g}_SRC}}}}" for g in other_groups])
+
+    @staticmethod
+    def _set_repeater_placeholders(rep: Any, placeholders: List[str]) -> None:
+        setter = getattr(rep, "set_placeholders", None)
+        if callable(setter):
+            try:
+                setter(placeholders)
+            except Exception:
+                pass
+
+    def _image_repeater(self, parent: Any, title: str, before: Any = None, **kw: Any) -> Any:
+        lf = ttk.LabelFrame(parent, text=title)
+        if before is not None:
+            lf.pack(fill="x", padx=6, pady=4, before=before)
+        else:
+            lf.pack(fill="x", padx=6, pady=4)
+        rep = SortableImageRepeaterField(lf, **kw) if SortableImageRepeaterField is not object else ttk.Frame(lf)
+        rep.pack(fill="x", padx=6, pady=(0, 4))
+        return rep
+
+    def _build_preview_tab(self, prev_frame: Any) -> None:
+        """Preview tab with live preview."""
         if PreviewEngine:
             self.preview_engine = PreviewEngine(prev_frame)
             try:
@@ -440,8 +762,51 @@ class TemplateBuilderApp:
                 txt.insert("1.0", "<Preview non disponibile>")
                 txt.pack(fill="both", expand=True)
 
-        # Initial preview update
-        self.detail_frame.pack_forget()
+    # ------------------------------------------------------------------ hot reload
+    _WATCH_INTERVAL_MS = 1000
+
+    def _start_template_watcher(self) -> None:
+        if not self.root or self.catalog is None or TemplateWatcher is None:
+            return
+        try:
+            self._watcher = TemplateWatcher(self.catalog)
+        except Exception:
+            return
+        self.root.after(self._WATCH_INTERVAL_MS, self._poll_templates)
+
+    def _poll_templates(self) -> None:
+        """Tk timer: pick up template edits made while the GUI is open."""
+        try:
+            changed = self._watcher.poll()
+        except Exception:
+            changed = []
+        if changed:
+            names = self.catalog.names(partials=False)
+            if set(names) != set(self._template_names):
+                self._set_template_choices(names)
+            current = self.template_var.get()
+            if current in changed and current in self.catalog:
+                self._on_template_file_changed(current)
+        if self.root:
+            self.root.after(self._WATCH_INTERVAL_MS, self._poll_templates)
+
+    def _on_template_file_changed(self, template_name: str) -> None:
+        """Refresh after an on-disk edit of the current template.
+
+        Same placeholder set → only the preview is re-rendered (the template
+        was already recompiled by the watcher); otherwise only the tabs whose
+        keys or image groups changed are synced (see ``_apply_layout``).
+        """
+        old = getattr(self, "_layout", None)
+        new = self._template_layout(template_name)
+        if new is None:
+            return
+        if old is None or not self._tabs:
+            self.reload_template()
+            return
+        if new["placeholders"] != old["placeholders"]:
+            self._apply_layout(new)
+        self._layout = new
         self.update_preview()
 
     def _add_tab(self, title: str) -> Any:
@@ -469,40 +834,50 @@ class TemplateBuilderApp:
             self.detail_frame.pack(fill="x")
             self.detail_label.pack(fill="x", padx=8, pady=2)
 
+    def _apply_state_to_model(self) -> Set[str]:
+        """Copy state values into the field model; returns the keys that changed."""
+        if self.model is None:
+            return set(self._state)
+        changed: Set[str] = set()
+        for key, val in self._state.items():
+            if (key in self.model or key in dict(self._IMAGE_KEYS)
+                    or key.startswith(("HERO_IMAGE_", "COLS_"))):
+                if self.model.set(key, "" if val is None else val):
+                    changed.add(key)
+        return changed
+
     def _apply_state_to_widgets(self) -> None:
-        """Sync GUI fields from internal state (no-op if head-less)."""
+        """Sync GUI fields from internal state in one batch (no-op if head-less).
+
+        Changes are detected against the field model (no Tk reads); only the
+        widgets showing a changed key are rewritten, and a single preview is
+        rendered at the end.
+        """
         if not self.enable_gui or not self.root:
             return
-        for key, widget in self.fields.items():
-            val = self._state.get(key, "")
-            try:
-                current = (widget.get_value() if hasattr(widget, "get_value") else
-                           widget.get_raw()   if hasattr(widget, "get_raw") else
-                           widget.get().strip())
-            except Exception:
-                current = ""
-            if val is None:
-                val = ""
-            if isinstance(val, list):
-                # Skip list types (images, etc.)
-                continue
-            if val and val != current:
-                try:
-                    if hasattr(widget, "text"):  # multi-line text widget
-                        widget.text.delete("1.0", _tk.END)
-                        widget.text.insert("1.0", str(val))
-                    else:
-                        widget.delete(0, _tk.END)
-                        widget.insert(0, str(val))
-                except Exception:
-                    pass
+        with self._batch_updates():
+            self.update_preview()   # widgets refreshed below may ask again: one render
+            changed = self._apply_state_to_model()
+            if not changed:
+                return
+            for panel in self._panels.values():
+                if panel is not None:
+                    panel.refresh(changed)
+            if "Images" in self._built_tabs:
+                self._load_images_from_model(changed)
 
     def _collect(self) -> Dict[str, Any]:
         """Collect current inputs into context dict."""
         data: Dict[str, Any] = {}
-        # Text fields
+        model = self.model
+        # Text fields of the field panels (edits are stored in the model)
+        if model is not None:
+            data.update(model.collect())
+        # Remaining widgets (hero image entries)
         for k, w in self.fields.items():
             try:
+                if model is not None:
+                    model.set(k, self._widget_value(w))
                 if hasattr(w, "render_html"):
                     data[k] = w.render_html()
                 elif hasattr(w, "get_value"):
@@ -513,44 +888,81 @@ class TemplateBuilderApp:
                     data[k] = w.get().strip()
             except Exception:
                 data[k] = ""
-        # Image lists and columns
-        data["IMAGES_DESC"] = (self.img_desc.get_urls()
-                               if self.img_desc and hasattr(self.img_desc, "get_urls") else [])
-        data["IMAGES_REC"]  = (self.img_rec.get_urls()
-                               if self.img_rec and hasattr(self.img_rec, "get_urls") else [])
-        data["IMAGES_STEP"] = (self.img_step.get_urls()
-                               if self.img_step and hasattr(self.img_step, "get_urls") else [])
-        data["COLS_DESC"]   = int(self.cols_desc.get()) if self.cols_desc else 1
-        data["COLS_REC"]    = int(self.cols_rec.get()) if self.cols_rec else 1
-
-        # ───────── StepImage binding & ALT placeholder ─────────
+        # Image lists and columns (model values until the Images tab is built)
+        for key, attr in self._IMAGE_KEYS:
+            rep = getattr(self, attr, None)
+            if rep and hasattr(rep, "get_urls"):
+                data[key] = rep.get_urls()
+                if model is not None:
+                    model.set(key, list(data[key]))
+            else:
+                data[key] = list(model.get(key, None) or []) if model is not None else []
+        for key, var in (("COLS_DESC", self.cols_desc), ("COLS_REC", self.cols_rec)):
+            if var:
+                data[key] = int(var.get())
+            else:
+                data[key] = int(model.get(key, None) or 1) if model is not None else 1
+
+        self._bind_steps(data)
+        return data
+
+    def _bind_steps(self, data: Dict[str, Any]) -> None:
+        """Add STEPS and STEPn_IMG_ALT to *data* (one pass, any number of steps).
+
+        Texts are the raw values of the live step fields (falling back to the
+        state for head-less use); bound lists are memoized on (texts, images).
+        """
+        if not callable(bind_steps_cached_fn):
+            data["STEPS"] = []
+            return
+        model = self.model
+        live = model is not None and any(k.startswith("STEP") for k in model)
+        source: Any = model if live else self._state
+        n = step_count_fn(source)
+        texts = tuple(str(source.get(f"STEP{i}", "") or "") for i in range(1, n + 1))
+        images = tuple(data["IMAGES_STEP"] or self._state.get("IMAGES_STEP", []) or ())
         try:
-            from template_builder.step_image import bind_steps
-            txts = [data.get(f"STEP{i}", "") for i in range(1, 10)]
-            steps = bind_steps(txts, data["IMAGES_STEP"])
-            data["STEPS"] = [s.to_dict() for s in steps]
-            for s in steps:
-                data[f"STEP{s.order}_IMG_ALT"] = s.alt
+            steps = bind_steps_cached_fn(texts, images)
         except Exception:
-            # se modulo mancante, ignora (modalità headless)
-            pass
-        # ───────── StepImage binding & ALT placeholder (Batch-2 F5) ─────────
-        if callable(bind_steps_fn):
-            try:
-                txts  = [self._state.get(f"STEP{i}", "") for i in range(1, 10)]
-                images = data["IMAGES_STEP"] or list(self._state.get("IMAGES_STEP", []))
-                steps  = bind_steps_fn(txts, images)
-                # Serializza in dict (JSON-safe)
-                data["STEPS"] = [s.to_dict() for s in steps]
-                # Propaga ALT per placeholder legacy
-                for s in steps:
-                    data[f"STEP{s.order}_IMG_ALT"] = s.alt
-            except Exception:
-                data["STEPS"] = []
-        else:
             data["STEPS"] = []
-        # ────────────────────────────────────────────────────────────────────        
-        return data
+            return
+        # Serializza in dict (JSON-safe); ALT propagati per i placeholder legacy
+        data["STEPS"] = [s.to_dict() for s in steps]
+        for s in steps:
+            data[f"STEP{s.order}_IMG_ALT"] = s.alt
+
+    def move_step(self, src: int, dst: int) -> None:
+        """Move step *src* to position *dst* (0-based); text and photo move together.
+
+        ``STEPn`` texts and ``IMAGES_STEP`` are reordered as the parallel
+        columns of a ``StepList``; the result is written to the state and
+        synced to the model/widgets in one batch (one preview).
+        """
+        if StepList is None:
+            return
+        model = self.model
+        live = model is not None and any(k.startswith("STEP") for k in model)
+        source: Any = model if live else self._state
+        n = step_count_fn(source)
+        rep = getattr(self, "img_step", None)
+        if hasattr(rep, "get_urls"):
+            images = list(rep.get_urls())
+        else:
+            images = list((model.get("IMAGES_STEP", None) if model is not None else None)
+                          or self._state.get("IMAGES_STEP", None) or ())
+        steps = StepList([str(source.get(f"STEP{i}", "") or "") for i in range(1, n + 1)], images)
+        steps.move(src, dst)
+        for i, text in enumerate(steps.texts, start=1):
+            if i <= n or text:
+                self._state[f"STEP{i}"] = text
+        images = list(steps.images)
+        while images and not images[-1]:
+            images.pop()
+        self._state["IMAGES_STEP"] = images
+        if self.enable_gui and self.root:
+            self._apply_state_to_widgets()
+        else:
+            self._apply_state_to_model()
 
     def _render_html(self) -> Optional[str]:
         """Simple fallback HTML using TITLE/BODY (if present)."""
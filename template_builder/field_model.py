@@ -0,0 +1,126 @@
+# template_builder/field_model.py
+"""
+Field model for the builder GUI.
+
+Holds the value of every placeholder field, grouped by notebook tab, so the
+controller can work with tabs whose widgets have not been built yet (lazy
+tabs) and rebuild widgets from stored values.  No Tk dependency: widgets
+push their edits here and read their initial content from here.
+
+Edits mark their key *dirty*; :meth:`FieldModel.collect` re-formats only
+dirty keys and reuses the cached HTML of the others, so the cost of a
+preview per keystroke is proportional to the fields actually changed.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+from .services import text as text_service
+
+
+class FieldModel:
+    """Values of the placeholder fields, with their tab and auto_format mode.
+
+    Values are kept when a key is undefined (e.g. on template switch), so
+    switching back to a template restores what the user typed.
+    """
+
+    def __init__(self) -> None:
+        self._values: Dict[str, Any] = {}
+        self._specs: Dict[str, tuple[str, str]] = {}   # key -> (tab, mode)
+        self._html: Dict[str, str] = {}                # key -> formatted value
+        self._dirty: Set[str] = set()
+        self._last: Optional[Dict[str, Any]] = None    # previous collect() result
+        self._observers: List[Callable[[str], None]] = []
+
+    # ---------- schema ---------- #
+    def define(self, key: str, tab: str, mode: str = "p") -> None:
+        if self._specs.get(key, (None, mode))[1] != mode:
+            self._html.pop(key, None)
+        self._specs[key] = (tab, mode)
+        self._values.setdefault(key, "")
+        self._last = None
+
+    def undefine(self, key: str) -> None:
+        if self._specs.pop(key, None) is not None:
+            self._last = None
+
+    def keys(self, tab: Optional[str] = None) -> List[str]:
+        if tab is None:
+            return list(self._specs)
+        return [k for k, (t, _) in self._specs.items() if t == tab]
+
+    def tab_of(self, key: str) -> Optional[str]:
+        spec = self._specs.get(key)
+        return spec[0] if spec else None
+
+    def mode_of(self, key: str) -> str:
+        spec = self._specs.get(key)
+        return spec[1] if spec else "p"
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._specs
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._specs)
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    # ---------- values ---------- #
+    def get(self, key: str, default: Any = "") -> Any:
+        return self._values.get(key, default)
+
+    def set(self, key: str, value: Any) -> bool:
+        """Store *value*; returns True (and marks *key* dirty) if it changed."""
+        if self._values.get(key) == value:
+            return False
+        self._values[key] = value
+        self.mark_dirty(key)
+        return True
+
+    # ---------- dirty tracking ---------- #
+    def mark_dirty(self, key: str) -> None:
+        self._html.pop(key, None)
+        self._dirty.add(key)
+        for callback in list(self._observers):
+            callback(key)
+
+    def dirty(self) -> Set[str]:
+        return set(self._dirty)
+
+    def observe(self, callback: Callable[[str], None]) -> None:
+        """Call ``callback(key)`` whenever a key becomes dirty."""
+        self._observers.append(callback)
+
+    def unobserve(self, callback: Callable[[str], None]) -> None:
+        if callback in self._observers:
+            self._observers.remove(callback)
+
+    def render(self, key: str) -> str:
+        """HTML for a text key, as the field widget's render_html() would produce."""
+        html = self._html.get(key)
+        if html is not None:
+            return html
+        value = self._values.get(key, "")
+        if not isinstance(value, str):
+            return value
+        html = self._html[key] = text_service.auto_format(value, mode=self.mode_of(key))
+        return html
+
+    def collect(self) -> Dict[str, Any]:
+        """Rendered values of the defined keys, recomputing only dirty ones.
+
+        Returns a new dict; values of unchanged keys are the very objects of
+        the previous result.
+        """
+        if self._last is None:
+            data = {k: self.render(k) for k in self._specs}
+        else:
+            data = dict(self._last)
+            for key in self._dirty:
+                if key in self._specs:
+                    data[key] = self.render(key)
+        self._dirty.clear()
+        self._last = data
+        return dict(data)
@@ -1,10 +1,211 @@
-"""Registro filtri Jinja2 – STUB."""
+"""Registro dei filtri Jinja2 del progetto.
+
+I filtri sono registrati con :func:`register_filter` e installati da
+:func:`install_filters` nell'Environment condiviso di
+:func:`template_builder.services.storage.get_environment` (il codice legacy
+modificava ``jinja2.defaults.DEFAULT_FILTERS`` per tutto il processo).
+
+I filtri *puri* (stesso input → stesso output, nessun accesso al contesto)
+sono memoizzati: ``'…' | from_json`` su una stringa costante viene
+analizzato una volta per input distinto, non a ogni render.  I risultati
+memoizzati sono immutabili (liste → tuple, dict → mapping read-only) perché
+condivisi tra i render.
+"""
+from __future__ import annotations
+
+import functools
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from markupsafe import Markup, escape
+
 try:
     from jinja2 import pass_context
 except ImportError:  # pragma: no cover
     from jinja2 import contextfilter as pass_context  # type: ignore
 
-@pass_context
-def steps_bind(ctx, raw):  # pylint: disable=unused-argument
-    """Stub legacy filter – restituisce l'input invariato."""
+from .model import _freeze
+
+__all__ = [
+    "FILTERS",
+    "register_filter",
+    "install_filters",
+    "steps_bind",
+    "from_json",
+    "nl2br",
+    "lines",
+]
+
+FILTERS: Dict[str, Callable[..., Any]] = {}
+
+_PLACEHOLDER_RGX = re.compile(r"^\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}$")
+
+
+def _hashable(value: Any) -> Optional[Hashable]:
+    """Chiave di cache per *value* (``None`` se non rappresentabile).
+
+    Ogni elemento è etichettato col proprio tipo, anche dentro tuple, liste,
+    insiemi e dict: ``1``, ``True`` e ``1.0`` (uguali per ``==``/``hash``)
+    danno chiavi distinte.
+    """
+    if isinstance(value, (list, tuple)):
+        parts = [_hashable(v) for v in value]
+        return None if any(p is None for p in parts) else (type(value), tuple(parts))
+    if isinstance(value, (set, frozenset)):
+        parts = [_hashable(v) for v in value]
+        return None if any(p is None for p in parts) else (type(value), frozenset(parts))
+    if isinstance(value, dict) or hasattr(value, "items"):
+        try:
+            items = [(_hashable(k), _hashable(v)) for k, v in value.items()]
+        except TypeError:
+            return None
+        if any(k is None or v is None for k, v in items):
+            return None
+        return ("map", frozenset(items))
+    try:
+        hash(value)
+    except TypeError:
+        return None
+    return (type(value), value)
+
+
+def _memoize(func: Callable[..., Any], maxsize: int) -> Callable[..., Any]:
+    """LRU sui risultati di *func*, con chiave ricavata anche da liste/dict."""
+    cache: "OrderedDict[Hashable, Any]" = OrderedDict()
+    lock = threading.Lock()
+    stats = {"hits": 0, "misses": 0}
+
+    @functools.wraps(func)
+    def wrapper(*args: Any) -> Any:
+        key = _hashable(args)
+        if key is None:            # input non rappresentabile: niente cache
+            return func(*args)
+        with lock:
+            if key in cache:
+                cache.move_to_end(key)
+                stats["hits"] += 1
+                return cache[key]
+        result = _freeze(func(*args))
+        with lock:
+            stats["misses"] += 1
+            cache[key] = result
+            if len(cache) > maxsize:
+                cache.popitem(last=False)
+        return result
+
+    def cache_clear() -> None:
+        with lock:
+            cache.clear()
+            stats.update(hits=0, misses=0)
+
+    wrapper.cache_info = lambda: dict(stats, size=len(cache))   # type: ignore[attr-defined]
+    wrapper.cache_clear = cache_clear                             # type: ignore[attr-defined]
+    return wrapper
+
+
+def register_filter(
+    name: Optional[str] = None, *, pure: bool = False, maxsize: int = 256,
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decoratore: registra un filtro; ``pure=True`` ne memoizza i risultati."""
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        registered = _memoize(func, maxsize) if pure else func
+        FILTERS[name or func.__name__] = registered
+        return registered
+    return decorator
+
+
+def install_filters(env: Any) -> Any:
+    """Installa i filtri registrati in *env* (senza toccare i default globali)."""
+    env.filters.update(FILTERS)
+    return env
+
+
+# ---------------------------------------------------------------------------
+# Filtri
+# ---------------------------------------------------------------------------
+
+def _resolve_legacy(ctx: Any, raw: Any) -> Any:
+    """``'{{NOME}}'`` (sostituzione letterale dei template legacy) → ``ctx[NOME]``."""
+    if isinstance(raw, str):
+        m = _PLACEHOLDER_RGX.match(raw.strip())
+        if m:
+            return ctx.get(m.group(1), "")
     return raw
+
+
+_parse_json = _memoize(json.loads, 256)
+
+
+@register_filter()
+@pass_context
+def from_json(ctx: Any, raw: Any) -> Any:
+    """Stringa JSON → dati; liste/dict già decodificati passano invariati.
+
+    Stringhe vuote o non valide danno una lista vuota, come il template legacy
+    si aspettava in assenza di step.
+    """
+    raw = _resolve_legacy(ctx, raw)
+    if not isinstance(raw, (str, bytes)):
+        return raw if raw is not None else ()
+    text = raw.strip()
+    if not text:
+        return ()
+    try:
+        return _parse_json(text)
+    except ValueError:
+        return ()
+
+
+@functools.lru_cache(maxsize=128)
+def _bind(lines_: tuple, images: tuple) -> tuple:
+    steps = []
+    for i, txt in enumerate(lines_):
+        src = alt = ""
+        if i < len(images):
+            item = images[i]
+            if isinstance(item, (list, tuple)):      # (src, alt)
+                src = item[0] if item else ""
+                alt = item[1] if len(item) > 1 else ""
+            elif hasattr(item, "get"):               # {"src": …, "alt": …}
+                src = item.get("src", "")
+                alt = item.get("alt", "")
+            elif isinstance(item, str):
+                src = item
+        steps.append(_freeze({"text": txt, "img": src, "alt": alt}))
+    return tuple(steps)
+
+
+@register_filter()
+@pass_context
+def steps_bind(ctx: Any, raw: Any) -> Any:
+    """``RECIPE_STEPS_TEXT`` (una riga per step) → step ``{text, img, alt}``
+    abbinati in ordine alle foto di ``IMAGES_STEP``."""
+    raw = _resolve_legacy(ctx, raw)
+    if isinstance(raw, (list, tuple)):
+        texts = tuple(str(t).strip() for t in raw if str(t).strip())
+    else:
+        text = (raw or "").strip()
+        # apici prodotti dalla sostituzione letterale dei template legacy
+        if text[:1] in {"'", '"'} and text[-1:] == text[:1]:
+            text = text[1:-1]
+        texts = tuple(ln.strip() for ln in text.splitlines() if ln.strip())
+    images = _freeze(list(ctx.get("IMAGES_STEP") or ()))
+    try:
+        return _bind(texts, images)
+    except TypeError:   # immagini non hashable
+        return _bind.__wrapped__(texts, images)
+
+
+@register_filter(pure=True)
+def lines(value: Any) -> List[str]:
+    """Righe non vuote di un testo multilinea (es. ingredienti)."""
+    return [ln.strip() for ln in str(value or "").splitlines() if ln.strip()]
+
+
+@register_filter()
+def nl2br(value: Any) -> Markup:
+    """A capo → ``<br>``; il testo delle righe viene escapato."""
+    return Markup("<br>").join(escape(ln.strip()) for ln in str(value or "").splitlines())
@@ -0,0 +1,124 @@
+"""Cache dei frammenti di template: tag ``{% cache %}`` + store LRU limitato.
+
+Nei template le sezioni con espressioni che cambiano di rado (gallerie di
+immagini, elenchi generati da filtri) si racchiudono in::
+
+    {% cache "galleria-desc", IMAGES_DESC, COLS_DESC %} … {% endcache %}
+
+Il markup puramente letterale non va racchiuso: Jinja lo compila già in una
+scrittura costante e la cache aggiungerebbe solo una ricerca.
+
+Il primo argomento è un nome, i successivi le variabili da cui il frammento
+dipende: la chiave è (template, posizione del tag, compilazione, valori).
+Il frammento viene eseguito una volta e riusato dai render successivi
+(anteprima, export in blocco) finché la chiave non cambia.  Ogni
+ricompilazione del template produce chiavi nuove, quindi una modifica al
+file non restituisce mai frammenti vecchi: quelli scaduti escono per LRU.
+"""
+from __future__ import annotations
+
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+__all__ = ["FragmentStore", "FragmentCacheExtension"]
+
+_COMPILATIONS = itertools.count(1)
+
+
+def _freeze(value: Any) -> Hashable:
+    """Versione hashable di un argomento di ``{% cache %}``."""
+    if isinstance(value, (str, int, float, bool, type(None))):
+        return value
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(repr(v) for v in value))
+    return repr(value)
+
+
+class FragmentStore:
+    """Frammenti renderizzati, limitati per numero e per dimensione (LRU).
+
+    La dimensione è quella codificata in UTF-8, cioè i byte effettivi
+    dell'HTML prodotto.
+    """
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 4 * 1024 * 1024) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[Hashable, Tuple[str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key: Hashable, value: str) -> None:
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return  # troppo grande: non scaccia tutto il resto
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._data[key] = (value, size)
+            self.nbytes += size
+            while len(self._data) > self.max_entries or self.nbytes > self.max_bytes:
+                _, (_, dropped) = self._data.popitem(last=False)
+                self.nbytes -= dropped
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class FragmentCacheExtension(Extension):
+    """Tag ``{% cache nome[, var …] %}…{% endcache %}``.
+
+    Lo store è ``environment.fragment_store`` (uno per Environment).
+    """
+
+    tags = {"cache"}
+
+    def __init__(self, environment: Any) -> None:
+        super().__init__(environment)
+        environment.extend(fragment_store=FragmentStore())
+
+    def parse(self, parser: Any) -> nodes.Node:
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        site = nodes.Const(f"{parser.name}:{lineno}:{next(_COMPILATIONS)}")
+        call = self.call_method("_cached", [site, nodes.List(args)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _cached(self, site: str, parts: list, caller: Callable[[], str]) -> str:
+        store: FragmentStore = self.environment.fragment_store
+        key: Tuple[Hashable, ...] = (site, _freeze(parts))
+        html = store.get(key)
+        if html is None:
+            html = caller()
+            store.put(key, html)
+        return html
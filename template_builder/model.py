@@ -11,15 +11,22 @@ P5 – strutture pensate per cicli Jinja (liste, tuple, dict).
 """
 from __future__ import annotations
 
+import sys
+from collections.abc import Mapping, MutableMapping
 from dataclasses import dataclass, field
 from html import escape
-from typing import List, Dict
+from types import MappingProxyType
+from typing import Any, Iterator, List, Dict, Optional
 
+# Dataclass con __slots__ (niente __dict__ per istanza: meno memoria, accesso
+# agli attributi più rapido).  ``slots=True`` esiste da Python 3.10; su 3.9
+# le classi restano dataclass normali.
+_slotted = dataclass(slots=True) if sys.version_info >= (3, 10) else dataclass
 
 # ────────────────────────────────────────────────
 # HERO SECTION
 # ────────────────────────────────────────────────
-@dataclass
+@_slotted
 class Hero:
     title: str = ""
     img: str = ""
@@ -51,7 +58,7 @@ class Hero:
 # ────────────────────────────────────────────────
 # STEP IMAGE
 # ────────────────────────────────────────────────
-@dataclass
+@_slotted
 class StepImage:
     img: str = ""
     alt: str = ""
@@ -85,7 +92,7 @@ class StepImage:
 # ────────────────────────────────────────────────
 # GALLERY ROW  (max 3 images)
 # ────────────────────────────────────────────────
-@dataclass
+@_slotted
 class GalleryRow:
     images: List[StepImage] = field(default_factory=list)
 
@@ -109,3 +116,97 @@ class GalleryRow:
             alt = si.alt or "{{ IMG_ALT }}"
             parts.append(f'<img src="{escape(src)}" alt="{escape(alt)}">')
         return "\n".join(parts)
+
+
+# ────────────────────────────────────────────────
+# RECIPE STATE  (stato dell'editor, undo/redo, storage)
+# ────────────────────────────────────────────────
+def _freeze(value: Any) -> Any:
+    """list → tuple, dict → mapping read-only (ricorsivo); il resto invariato."""
+    if isinstance(value, (list, tuple)):
+        return tuple(v if type(v) is str else _freeze(v) for v in value)
+    if isinstance(value, Mapping):
+        return MappingProxyType({sys.intern(str(k)): _freeze(v) for k, v in value.items()})
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """Inverso di _freeze: strutture JSON-safe (list/dict)."""
+    if isinstance(value, tuple):
+        return [v if type(v) is str else _thaw(v) for v in value]
+    if isinstance(value, MappingProxyType):
+        return {k: _thaw(v) for k, v in value.items()}
+    return value
+
+
+class Recipe(MutableMapping):
+    """
+    Istantanea di una ricetta: placeholder → valore.
+
+    Si usa come un dict, ma le chiavi sono *interned* e i valori sono
+    immutabili (liste → tuple, dict annidati → mapping read-only): copiare
+    uno stato (undo/redo) è una copia superficiale e il confronto tra due
+    stati si risolve quasi sempre per identità dei valori.
+
+    È una forma di conservazione interna: le API pubbliche (``load_recipe``,
+    ``undo``/``redo``, lo stato dell'editor) restituiscono dict semplici,
+    ottenuti con :meth:`to_dict`.
+    """
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Optional[Mapping[str, Any]] = None) -> None:
+        self._data: Dict[str, Any] = {}
+        if data:
+            intern = sys.intern
+            self._data = {
+                intern(str(k)): (v if type(v) is str else _freeze(v))
+                for k, v in data.items()
+            }
+
+    # ---------- Serialization ---------- #
+    @classmethod
+    def from_dict(cls, d: Mapping[str, Any]) -> "Recipe":
+        return d.copy() if isinstance(d, Recipe) else cls(d)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Dict JSON-safe (tuple → list)."""
+        return {k: (v if type(v) is str else _thaw(v)) for k, v in self._data.items()}
+
+    def copy(self) -> "Recipe":
+        new = Recipe.__new__(Recipe)
+        new._data = self._data.copy()
+        return new
+
+    # ---------- Mapping ---------- #
+    def __getitem__(self, key: str) -> Any:
+        return self._data[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._data[sys.intern(str(key))] = value if type(value) is str else _freeze(value)
+
+    def __delitem__(self, key: str) -> None:
+        del self._data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._data.get(key, default)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Recipe):
+            return self._data == other._data
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]  # mutabile
+
+    def __repr__(self) -> str:
+        return f"Recipe({self.to_dict()!r})"
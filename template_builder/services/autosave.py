@@ -0,0 +1,216 @@
+"""template_builder.services.autosave
+
+Salvataggio automatico della sessione con journal *write-ahead*.
+
+Ogni modifica di un campo è accodata da :meth:`AutosaveJournal.record`
+(solo un ``append`` su una deque: microsecondi sul thread Tk).  Un thread in
+background scrive i record accumulati in ``session.wal`` (una riga JSON
+``[chiave, valore]`` per modifica) con un solo ``fsync`` per lotto.  Superata
+una soglia di record il journal viene compattato in uno snapshot completo
+(``session.json``, temp-file + ``os.replace``) e troncato.
+
+All'avvio :meth:`AutosaveJournal.replay` ricostruisce lo stato dallo
+snapshot più i record del journal; una riga troncata da un crash viene
+ignorata e rimossa dal file prima di accodare nuovi record.  Dopo un
+salvataggio esplicito :meth:`AutosaveJournal.checkpoint` riparte dallo stato
+salvato; a una chiusura regolare :meth:`AutosaveJournal.discard` elimina i
+file, così il replay avviene solo dopo un'uscita anomala.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from . import storage
+
+__all__ = ["AutosaveJournal"]
+
+_DELETED = None   # valore registrato per una chiave rimossa
+
+
+class AutosaveJournal:
+    """Journal di autosave nella cartella *folder*.
+
+    Parametri
+    ---------
+    folder:
+        Cartella dei file ``session.wal`` / ``session.json``
+        (default ``~/.template_builder/autosave``).
+    flush_interval:
+        Secondi tra due scritture del thread in background.
+    compact_every:
+        Numero di record oltre il quale il journal è compattato.
+    fsync:
+        ``False`` disattiva ``os.fsync`` (test, dischi lenti).
+    """
+
+    def __init__(
+        self,
+        folder: os.PathLike | str | None = None,
+        *,
+        flush_interval: float = 0.5,
+        compact_every: int = 1000,
+        fsync: bool = True,
+    ) -> None:
+        self.folder = Path(folder) if folder is not None else storage.data_dir("autosave")
+        self.journal_path = self.folder / "session.wal"
+        self.snapshot_path = self.folder / "session.json"
+        self.flush_interval = flush_interval
+        self.compact_every = max(1, int(compact_every))
+        self.fsync = fsync
+        self._queue: Deque[Tuple[str, Any]] = deque()
+        self._lock = threading.Lock()          # serializza l'accesso ai file
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._state: Dict[str, Any] = {}       # copia lato writer (per lo snapshot)
+        self._records = 0                      # record nel journal dall'ultima compattazione
+        self._loaded = False
+
+    # ------------------------------------------------------------------ API
+    def record(self, key: str, value: Any) -> None:
+        """Accoda la modifica di *key* (``None`` = chiave rimossa)."""
+        self._queue.append((key, value))
+        if self._thread is None and not self._stopping:
+            self.start()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        """Ferma il thread e scrive i record ancora in coda."""
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def replay(self) -> Dict[str, Any]:
+        """Stato della sessione precedente (snapshot + journal)."""
+        with self._lock:
+            self._load_locked()
+            return dict(self._state)
+
+    def flush(self) -> int:
+        """Scrive i record in coda; restituisce quanti ne ha scritti."""
+        with self._lock:
+            return self._flush_locked()
+
+    def compact(self) -> None:
+        """Scrive subito lo snapshot completo e svuota il journal."""
+        with self._lock:
+            self._flush_locked()
+            self._compact_locked()
+
+    def checkpoint(self, state: Dict[str, Any]) -> None:
+        """Sostituisce la sessione con *state* (snapshot nuovo, journal vuoto)."""
+        with self._lock:
+            self._queue.clear()
+            self._state = dict(state)
+            self._loaded = True
+            self.folder.mkdir(parents=True, exist_ok=True)
+            self._compact_locked()
+
+    def discard(self) -> None:
+        """Dimentica la sessione (file e record in coda)."""
+        with self._lock:
+            self._queue.clear()
+            self._state.clear()
+            self._records = 0
+            self._loaded = True
+            for path in (self.journal_path, self.snapshot_path):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    # ------------------------------------------------------------------ interni
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError:
+                pass  # disco pieno/non scrivibile: si riprova al giro successivo
+
+    def _apply(self, key: str, value: Any) -> None:
+        if value is _DELETED:
+            self._state.pop(key, None)
+        else:
+            self._state[key] = value
+
+    def _load_locked(self) -> None:
+        if self._loaded:
+            return
+        codec = storage.get_json_codec()
+        state: Dict[str, Any] = {}
+        try:
+            snap = codec.loads(self.snapshot_path.read_bytes())
+            if isinstance(snap, dict):
+                state = snap
+        except (OSError, ValueError):
+            pass
+        self._state = state
+        self._records = 0
+        try:
+            raw = self.journal_path.read_bytes()
+        except OSError:
+            raw = b""
+        end = raw.rfind(b"\n") + 1
+        if end < len(raw):
+            # coda troncata da un crash: va tolta, altrimenti il prossimo
+            # append si attaccherebbe a lei e il record andrebbe perso
+            try:
+                os.truncate(self.journal_path, end)
+            except OSError:
+                pass
+        for line in raw[:end].splitlines():
+            try:
+                key, value = codec.loads(line)
+            except (ValueError, TypeError):
+                continue  # riga troncata da un crash
+            self._apply(key, value)
+            self._records += 1
+        self._loaded = True
+
+    def _flush_locked(self) -> int:
+        if not self._queue:
+            return 0
+        self._load_locked()
+        dumps = storage.get_json_codec().dumps
+        lines = []
+        popleft = self._queue.popleft
+        while self._queue:
+            key, value = popleft()
+            if isinstance(value, tuple):
+                value = list(value)
+            lines.append(dumps([key, value]))
+            self._apply(key, value)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        with self.journal_path.open("ab") as fh:
+            fh.write(b"\n".join(lines) + b"\n")
+            fh.flush()
+            if self.fsync:
+                os.fsync(fh.fileno())
+        self._records += len(lines)
+        if self._records >= self.compact_every:
+            self._compact_locked()
+        return len(lines)
+
+    def _compact_locked(self) -> None:
+        self._load_locked()
+        storage.atomic_write(
+            self.snapshot_path, storage.get_json_codec().dumps(self._state),
+            fsync="dir" if self.fsync else "none",
+        )
+        with self.journal_path.open("wb"):
+            pass  # troncato: i record sono nello snapshot
+        self._records = 0
@@ -0,0 +1,324 @@
+"""template_builder.services.catalog
+
+Indice persistente dei template HTML.
+
+Per ogni file ``*.html`` della cartella template l'indice memorizza
+placeholder, gruppi immagine (DESC/REC/altro), cicli Jinja usati
+(``IMAGES_DESC``, ``RECIPE_STEPS``, ``INGREDIENTI`` …), dimensione ed esito
+della compilazione, più i template referenziati (``{% include %}``,
+``{% extends %}``, ``{% import %}``) ricavati dall'AST Jinja.  Da questi
+archi il catalogo ricava il grafo delle dipendenze inverse
+(:meth:`TemplateCatalog.dependents`), usato per invalidare la cache,
+ricaricare a caldo ed esportare solo i template toccati da un partial.
+I partial condivisi vivono nella stessa cartella con un nome che inizia
+per ``_`` (es. ``_header.html``) e non compaiono tra i template
+selezionabili.  L'indice è salvato in JSON sotto
+``~/.template_builder`` ed è aggiornato in modo *incrementale*: i file con
+``mtime``/dimensione invariati non vengono riletti; quelli toccati ma con
+hash identico non vengono rianalizzati.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:  # pragma: no cover – la CI non installa jinja2
+    from jinja2 import meta as _jinja_meta  # type: ignore
+except ModuleNotFoundError:
+    _jinja_meta = None  # type: ignore[assignment]
+
+from .storage import TEMPLATE_EXTENSIONS, Environment, atomic_write, data_dir
+from .text import extract_placeholders
+
+__all__ = [
+    "CATALOG_VERSION",
+    "TemplateEntry",
+    "TemplateCatalog",
+    "classify_image_groups",
+    "analyze_template",
+]
+
+CATALOG_VERSION = 2      # 2: aggiunte le dipendenze (deps)
+
+_FOR_RGX = re.compile(r"\{%-?\s*for\s+[^%]*?\s+in\s+([A-Za-z_][A-Za-z0-9_]*)")
+
+
+# ---------------------------------------------------------------------------
+# Analisi di un singolo template
+# ---------------------------------------------------------------------------
+
+def classify_image_groups(placeholders: Iterable[str]) -> Tuple[List[str], List[str], List[str]]:
+    """Suddivide i gruppi immagine (``X_SRC`` + ``X_ALT``) in (desc, rec, other)."""
+    phs = set(placeholders)
+    groups = {
+        tag[:-4] for tag in phs
+        if tag.endswith("_SRC") and f"{tag[:-4]}_ALT" in phs
+    }
+    desc = sorted(g for g in groups if "DESC" in g.upper())
+    rec = sorted(g for g in groups if "REC" in g.upper())
+    other = sorted(groups - set(desc) - set(rec))
+    return desc, rec, other
+
+
+@dataclass
+class TemplateEntry:
+    """Metadati di un template, serializzabili in JSON."""
+
+    name: str
+    size: int = 0
+    mtime_ns: int = 0
+    sha1: str = ""
+    placeholders: List[str] = field(default_factory=list)
+    desc_groups: List[str] = field(default_factory=list)
+    rec_groups: List[str] = field(default_factory=list)
+    other_groups: List[str] = field(default_factory=list)
+    loops: List[str] = field(default_factory=list)
+    compile_status: str = "unknown"     # ok | error | unknown (senza Jinja2)
+    compile_error: str = ""
+    deps: List[str] = field(default_factory=list)   # template referenziati direttamente
+
+    def to_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, object]) -> "TemplateEntry":
+        known = {k: d[k] for k in cls.__dataclass_fields__ if k in d}
+        return cls(**known)  # type: ignore[arg-type]
+
+    @property
+    def placeholder_set(self) -> Set[str]:
+        return set(self.placeholders)
+
+    @property
+    def is_partial(self) -> bool:
+        return self.name.startswith("_")
+
+
+_PARSER_ENV = None
+
+
+def _parser_env():
+    """Environment (con le estensioni del progetto) usato solo per il parsing."""
+    global _PARSER_ENV
+    if _PARSER_ENV is None:
+        _PARSER_ENV = Environment(extensions=list(TEMPLATE_EXTENSIONS))
+    return _PARSER_ENV
+
+
+def analyze_template(name: str, src: str) -> TemplateEntry:
+    """Analizza il sorgente *src* (senza stat/hash, compilati dal catalogo)."""
+    placeholders = sorted(extract_placeholders(src))
+    desc, rec, other = classify_image_groups(placeholders)
+    entry = TemplateEntry(
+        name=name,
+        placeholders=placeholders,
+        desc_groups=desc,
+        rec_groups=rec,
+        other_groups=other,
+        loops=sorted(set(_FOR_RGX.findall(src))),
+    )
+    if Environment is not None:
+        try:
+            ast = _parser_env().parse(src)
+            entry.compile_status = "ok"
+            if _jinja_meta is not None:
+                # None = nome calcolato a runtime, non analizzabile staticamente
+                entry.deps = sorted({r for r in _jinja_meta.find_referenced_templates(ast)
+                                     if isinstance(r, str)})
+        except Exception as exc:  # TemplateSyntaxError e simili
+            entry.compile_status = "error"
+            entry.compile_error = str(exc)
+    return entry
+
+
+# ---------------------------------------------------------------------------
+# Catalogo
+# ---------------------------------------------------------------------------
+
+class TemplateCatalog:
+    """Indice incrementale dei template di *folder*, persistito su disco."""
+
+    def __init__(self, folder: os.PathLike | str, *, index_path: os.PathLike | str | None = None) -> None:
+        self.folder = Path(folder).resolve()
+        if index_path is None:
+            tag = hashlib.sha1(str(self.folder).encode("utf-8")).hexdigest()[:12]
+            index_path = data_dir(f"catalog_{tag}.json")
+        self.index_path = Path(index_path)
+        self._entries: Dict[str, TemplateEntry] = {}
+        self._dirty = False
+        self._reverse: Optional[Dict[str, Set[str]]] = None   # dep -> chi lo usa
+        self._load()
+
+    # ------------------------------------------------------------------ persistenza
+    def _load(self) -> None:
+        try:
+            raw = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if not isinstance(raw, dict) or raw.get("version") != CATALOG_VERSION:
+            return
+        for name, d in (raw.get("entries") or {}).items():
+            try:
+                self._entries[name] = TemplateEntry.from_dict(d)
+            except TypeError:
+                continue
+
+    def save(self) -> None:
+        """Scrive l'indice (file temporaneo + ``os.replace``) se modificato."""
+        if not self._dirty:
+            return
+        payload = {
+            "version": CATALOG_VERSION,
+            "folder": str(self.folder),
+            "entries": {n: e.to_dict() for n, e in sorted(self._entries.items())},
+        }
+        try:
+            atomic_write(self.index_path, json.dumps(payload, ensure_ascii=False), fsync="none")
+            self._dirty = False
+        except OSError:
+            pass  # indice non scrivibile: resta valido in memoria
+
+    # ------------------------------------------------------------------ refresh
+    def _update(self, name: str, st: os.stat_result) -> bool:
+        """Aggiorna la voce *name*; True se il contenuto è cambiato."""
+        old = self._entries.get(name)
+        if old and old.mtime_ns == st.st_mtime_ns and old.size == st.st_size:
+            return False
+        data = (self.folder / name).read_bytes()
+        digest = hashlib.sha1(data).hexdigest()
+        if old and old.sha1 == digest:
+            old.mtime_ns, old.size = st.st_mtime_ns, st.st_size
+            self._dirty = True
+            return False
+        entry = analyze_template(name, data.decode("utf-8", errors="replace"))
+        entry.size, entry.mtime_ns, entry.sha1 = st.st_size, st.st_mtime_ns, digest
+        self._entries[name] = entry
+        self._dirty = True
+        self._reverse = None
+        return True
+
+    def refresh(self) -> List[str]:
+        """Riallinea l'indice alla cartella; restituisce i template cambiati.
+
+        Sono inclusi i nuovi template e quelli rimossi.
+        """
+        changed: List[str] = []
+        seen: Set[str] = set()
+        try:
+            with os.scandir(self.folder) as it:
+                files = [e for e in it if e.name.endswith(".html") and e.is_file()]
+        except OSError:
+            files = []
+        for e in files:
+            seen.add(e.name)
+            try:
+                if self._update(e.name, e.stat()):
+                    changed.append(e.name)
+            except OSError:
+                continue
+        for name in set(self._entries) - seen:
+            del self._entries[name]
+            self._dirty = True
+            self._reverse = None
+            changed.append(name)
+        self.save()
+        return sorted(changed)
+
+    def refresh_one(self, name: str) -> bool:
+        """Verifica un solo template (un ``stat``); True se è cambiato."""
+        try:
+            st = (self.folder / name).stat()
+        except OSError:
+            if self._entries.pop(name, None) is not None:
+                self._dirty = True
+                self._reverse = None
+                self.save()
+                return True
+            return False
+        changed = self._update(name, st)
+        self.save()
+        return changed
+
+    # ------------------------------------------------------------------ query
+    def names(self, *, partials: bool = True) -> List[str]:
+        """Nomi indicizzati; ``partials=False`` esclude i partial (``_*.html``)."""
+        return sorted(n for n, e in self._entries.items() if partials or not e.is_partial)
+
+    def get(self, name: str, *, check: bool = True) -> Optional[TemplateEntry]:
+        """Voce di *name*; con ``check`` verifica prima che il file non sia cambiato."""
+        if check:
+            self.refresh_one(name)
+        return self._entries.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ------------------------------------------------------------------ dipendenze
+    def dependencies(self, name: str, *, recursive: bool = False) -> List[str]:
+        """Template usati da *name* (diretti o, con *recursive*, l'intera chiusura).
+
+        Un riferimento a un file fuori dall'indice compare ma non viene seguito.
+        """
+        entry = self._entries.get(name)
+        if entry is None:
+            return []
+        if not recursive:
+            return list(entry.deps)
+        seen: Set[str] = set()
+        todo = list(entry.deps)
+        while todo:
+            dep = todo.pop()
+            if dep in seen or dep == name:
+                continue
+            seen.add(dep)
+            sub = self._entries.get(dep)
+            if sub is not None:
+                todo.extend(sub.deps)
+        return sorted(seen)
+
+    def _reverse_graph(self) -> Dict[str, Set[str]]:
+        if self._reverse is None:
+            reverse: Dict[str, Set[str]] = {}
+            for n, e in self._entries.items():
+                for dep in e.deps:
+                    reverse.setdefault(dep, set()).add(n)
+            self._reverse = reverse
+        return self._reverse
+
+    def dependents(self, name: str) -> List[str]:
+        """Template che usano *name*, direttamente o tramite altri partial."""
+        reverse = self._reverse_graph()
+        seen: Set[str] = set()
+        todo = list(reverse.get(name, ()))
+        while todo:
+            n = todo.pop()
+            if n in seen or n == name:
+                continue
+            seen.add(n)
+            todo.extend(reverse.get(n, ()))
+        return sorted(seen)
+
+    def affected(self, names: Iterable[str]) -> List[str]:
+        """*names* più tutti i template che ne dipendono (da ricompilare/riesportare)."""
+        out: Set[str] = set()
+        for n in names:
+            out.add(n)
+            out.update(self.dependents(n))
+        return sorted(out)
+
+    def placeholders_of(self, name: str) -> List[str]:
+        """Placeholder di *name* e dei template che include/estende."""
+        phs: Set[str] = set()
+        for n in [name, *self.dependencies(name, recursive=True)]:
+            entry = self._entries.get(n)
+            if entry is not None:
+                phs.update(entry.placeholders)
+        return sorted(phs)
@@ -0,0 +1,295 @@
+"""template_builder.services.export
+
+Export incrementale di un catalogo di inserzioni, guidato da un *manifest*.
+
+Come in un build system, per ogni file HTML prodotto il manifest
+(``.export-manifest.json`` nella cartella di output) registra le impronte
+degli input:
+
+* la ricetta (file JSON);
+* il template, più i template che include/estende (``{% include %}``,
+  ``{% extends %}``, ``{% import %}``), dal grafo del catalogo;
+* le immagini locali citate dalla ricetta;
+* la versione del renderer (pacchetto + Jinja2).
+
+Un output è rigenerato solo se una di queste impronte cambia o se il file
+non esiste più.  Le impronte dei file sono ricordate insieme a
+``mtime``/dimensione: in un secondo export senza modifiche non si rilegge
+né si decodifica nessun file, si fa solo uno ``stat``.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set
+
+from . import storage
+from .catalog import TemplateCatalog
+from .images import is_image_path
+
+__all__ = [
+    "MANIFEST_NAME",
+    "RENDERER_VERSION",
+    "ExportJob",
+    "ExportReport",
+    "jobs_from_folder",
+    "template_dependencies",
+    "export_incremental",
+]
+
+MANIFEST_NAME = ".export-manifest.json"
+_MANIFEST_VERSION = 1
+
+
+def _renderer_version() -> str:
+    try:
+        from importlib.metadata import version
+        pkg = version("template_builder")
+    except Exception:
+        pkg = "0"
+    try:
+        import jinja2
+        jinja = jinja2.__version__
+    except ImportError:  # pragma: no cover
+        jinja = "-"
+    return f"template_builder/{pkg} jinja2/{jinja} export/{_MANIFEST_VERSION}"
+
+
+RENDERER_VERSION = _renderer_version()
+
+
+@dataclass(frozen=True)
+class ExportJob:
+    recipe: Path          # file JSON della ricetta
+    template: Path        # template HTML
+    output: Path          # file HTML da produrre
+
+
+@dataclass
+class ExportReport:
+    rendered: List[str] = field(default_factory=list)
+    skipped: int = 0
+    errors: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    def __str__(self) -> str:
+        return (f"{len(self.rendered)} rigenerati, {self.skipped} invariati, "
+                f"{len(self.errors)} errori in {self.elapsed:.2f}s")
+
+
+def jobs_from_folder(
+    recipes: os.PathLike | str, template: os.PathLike | str, out_dir: os.PathLike | str,
+) -> List[ExportJob]:
+    """Un job per ogni ``*.json`` di *recipes* → ``out_dir/<nome>.html``."""
+    recipes, out_dir = Path(recipes), Path(out_dir)
+    template = Path(template)
+    return [
+        ExportJob(p, template, out_dir / f"{p.stem}.html")
+        for p in sorted(recipes.glob("*.json"))
+        if not p.name.startswith(".")
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Impronte dei file (memorizzate per mtime/dimensione)
+# ---------------------------------------------------------------------------
+
+class _FileHasher:
+    """sha1 dei file, ricalcolato solo se ``mtime``/dimensione cambiano."""
+
+    def __init__(self, known: Optional[Dict[str, List[Any]]] = None) -> None:
+        self.known: Dict[str, List[Any]] = dict(known or {})
+        self._seen: Dict[str, str] = {}
+
+    def digest(self, path: os.PathLike | str) -> str:
+        key = os.fspath(path)
+        cached = self._seen.get(key)
+        if cached is not None:
+            return cached
+        try:
+            st = os.stat(key)
+        except OSError:
+            digest = "missing"
+        else:
+            prev = self.known.get(key)
+            if prev and prev[0] == st.st_mtime_ns and prev[1] == st.st_size:
+                digest = prev[2]
+            else:
+                with open(key, "rb") as fh:
+                    digest = hashlib.sha1(fh.read()).hexdigest()
+                self.known[key] = [st.st_mtime_ns, st.st_size, digest]
+        self._seen[key] = digest
+        return digest
+
+
+# ---------------------------------------------------------------------------
+# Dipendenze
+# ---------------------------------------------------------------------------
+
+def template_dependencies(
+    template: os.PathLike | str, catalog: Optional[TemplateCatalog] = None,
+) -> List[Path]:
+    """*template* e i template che include/estende, ricorsivamente.
+
+    Usa il grafo delle dipendenze del :class:`TemplateCatalog` della cartella
+    (persistito: nessun parsing se i file non sono cambiati).  Il catalogo
+    indicizza solo i template di primo livello: i partial in sottocartelle
+    (``inc/a.html`` che include ``inc/b.html``) e i template fuori dal
+    catalogo, o senza catalogo, si seguono analizzando direttamente l'AST
+    Jinja.
+    """
+    template = Path(template)
+    root = template.parent
+    if catalog is None or template.name not in catalog:
+        return sorted(root / n for n in _ast_dependencies(root, [template.name]))
+    names = {template.name, *catalog.dependencies(template.name, recursive=True)}
+    names |= _ast_dependencies(root, [n for n in names if n not in catalog])
+    return sorted(root / n for n in names)
+
+
+def _ast_dependencies(root: Path, names: Iterable[str]) -> Set[str]:
+    """Chiusura di *names* (relativi a *root*, come per il loader) sull'AST."""
+    env = storage.get_environment(root)
+    from jinja2 import meta
+
+    seen: Set[str] = set()
+    todo = list(names)
+    while todo:
+        name = todo.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        try:
+            src = (root / name).read_text(encoding="utf-8")
+            refs = meta.find_referenced_templates(env.parse(src))
+        except Exception:    # file mancante o sintassi errata: conta solo il file
+            continue
+        todo.extend(r for r in refs if isinstance(r, str))   # None = nome dinamico
+    return seen
+
+
+def _local_images(value: Any, base: Path, out: Set[str]) -> Set[str]:
+    if isinstance(value, str):
+        if "://" not in value and not value.startswith("data:") and is_image_path(value):
+            path = Path(value)
+            out.add(os.fspath(path if path.is_absolute() else base / path))
+    elif isinstance(value, Mapping):
+        for v in value.values():
+            _local_images(v, base, out)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            _local_images(v, base, out)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def _load_manifest(path: Path) -> Dict[str, Any]:
+    try:
+        raw = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(raw, dict) or raw.get("version") != _MANIFEST_VERSION:
+        return {}
+    return raw
+
+
+def _catalog_path(manifest_path: Path, folder: Path) -> Path:
+    """Indice del catalogo di *folder*, accanto al manifest (non nella home)."""
+    tag = hashlib.sha1(os.fspath(folder.resolve()).encode("utf-8")).hexdigest()[:12]
+    return manifest_path.with_name(f".catalog-{tag}.json")
+
+
+def _up_to_date(prev: Optional[Dict[str, Any]], recipe: str, template: str,
+                output: Path, hasher: _FileHasher) -> bool:
+    if not prev or prev.get("renderer") != RENDERER_VERSION:
+        return False
+    if prev.get("recipe") != recipe or prev.get("template") != template:
+        return False
+    if not output.exists():
+        return False
+    return all(hasher.digest(p) == d for p, d in (prev.get("images") or {}).items())
+
+
+def export_incremental(
+    jobs: Iterable[ExportJob],
+    *,
+    manifest_path: os.PathLike | str | None = None,
+    force: bool = False,
+    fsync: str = "none",
+) -> ExportReport:
+    """Renderizza i *jobs* i cui input sono cambiati rispetto al manifest.
+
+    Il manifest predefinito è ``MANIFEST_NAME`` nella cartella di output del
+    primo job.  ``force`` rigenera tutto (e riscrive il manifest).
+    """
+    started = time.perf_counter()
+    jobs = list(jobs)
+    report = ExportReport()
+    if not jobs:
+        return report
+    manifest_path = Path(manifest_path) if manifest_path else jobs[0].output.parent / MANIFEST_NAME
+    manifest = _load_manifest(manifest_path)
+    outputs: Dict[str, Any] = dict(manifest.get("outputs") or {})
+    hasher = _FileHasher(manifest.get("files"))
+    tpl_sigs: Dict[Path, str] = {}
+    catalogs: Dict[Path, TemplateCatalog] = {}
+    live: Set[str] = set()        # file le cui impronte restano nel manifest
+
+    def template_sig(template: Path) -> str:
+        sig = tpl_sigs.get(template)
+        if sig is None:
+            h = hashlib.sha1()
+            folder = template.parent
+            if folder not in catalogs:
+                catalogs[folder] = TemplateCatalog(folder, index_path=_catalog_path(manifest_path, folder))
+                catalogs[folder].refresh()
+            for dep in template_dependencies(template, catalogs[folder]):
+                live.add(os.fspath(dep))
+                h.update(f"{dep.name}\0{hasher.digest(dep)}\0".encode("utf-8"))
+            sig = tpl_sigs[template] = h.hexdigest()
+        return sig
+
+    try:
+        for job in jobs:
+            out_key = os.fspath(job.output)
+            live.add(os.fspath(job.recipe))
+            recipe_sig = hasher.digest(job.recipe)
+            tpl_sig = template_sig(Path(job.template))
+            if not force and _up_to_date(outputs.get(out_key), recipe_sig, tpl_sig, job.output, hasher):
+                report.skipped += 1
+                continue
+            try:
+                ctx = storage.load_recipe(job.recipe)
+                images = sorted(_local_images(ctx, Path(job.recipe).parent, set()))
+                storage.export_html(ctx, job.template, save_to=job.output, fsync=fsync)
+            except Exception as exc:   # un'inserzione rotta non ferma il catalogo
+                report.errors[out_key] = str(exc)
+                outputs.pop(out_key, None)
+                continue
+            outputs[out_key] = {
+                "recipe": recipe_sig,
+                "template": tpl_sig,
+                "images": {p: hasher.digest(p) for p in images},
+                "renderer": RENDERER_VERSION,
+            }
+            report.rendered.append(out_key)
+    finally:
+        for entry in outputs.values():
+            live.update(entry.get("images") or ())
+        payload = {
+            "version": _MANIFEST_VERSION,
+            "renderer": RENDERER_VERSION,
+            "outputs": outputs,
+            "files": {k: v for k, v in hasher.known.items() if k in live},
+        }
+        storage.atomic_write(manifest_path, json.dumps(payload, ensure_ascii=False), fsync="file")
+        report.elapsed = time.perf_counter() - started
+    return report
+
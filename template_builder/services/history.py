@@ -0,0 +1,339 @@
+"""template_builder.services.history
+
+Retention, compattazione e garbage collection della cartella storia.
+
+Le istantanee ``recipe_*.json`` scritte da :func:`storage.quick_save` sono
+classificate secondo una :class:`RetentionPolicy`:
+
+* più recenti di ``keep_all_hours`` → restano file singoli;
+* fino a ``hourly_hours`` → la più recente di ogni ora;
+* fino a ``daily_days`` → la più recente di ogni giorno;
+* più vecchie → eliminate.
+
+Le istantanee conservate fuori dalla finestra "tutte" sono impacchettate in
+archivi ``pack_*.tar.gz``; l'indice ``packs.json`` dice in quale archivio si
+trova ciascun file, così :func:`storage.load_recipe` continua ad aprire il
+percorso originale (vedi :func:`read_packed`).
+"""
+from __future__ import annotations
+
+import io
+import json
+import os
+import re
+import tarfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import storage
+
+__all__ = [
+    "RetentionPolicy",
+    "Snapshot",
+    "CompactionReport",
+    "list_history",
+    "plan_retention",
+    "compact_history",
+    "read_packed",
+    "BackgroundCompactor",
+]
+
+_INDEX_NAME = "packs.json"
+_GC_LOCK = threading.Lock()      # una compattazione per processo alla volta
+_INDEX_VERSION = 1
+_NAME_RGX = re.compile(r"recipe_(\d{8}-\d{6})(?:-\d+)?\.json$")
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    keep_all_hours: float = 6
+    hourly_hours: float = 24
+    daily_days: float = 30
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    name: str
+    ts: float                     # epoch (dal nome del file, altrimenti mtime)
+    size: int
+    archive: Optional[str] = None  # None = file singolo nella cartella
+
+
+@dataclass
+class CompactionReport:
+    kept: int = 0
+    packed: int = 0
+    deleted: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    archives: List[str] = field(default_factory=list)
+
+    @property
+    def reclaimed(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+    def __str__(self) -> str:
+        return (f"{self.kept} conservate, {self.packed} impacchettate, "
+                f"{self.deleted} eliminate – recuperati {self.reclaimed} byte")
+
+
+# ---------------------------------------------------------------------------
+# Indice degli archivi
+# ---------------------------------------------------------------------------
+
+def _folder(folder: os.PathLike | str | None) -> Path:
+    return Path(folder) if folder is not None else storage._HISTORY_DIR
+
+
+def _load_index(folder: Path) -> Dict[str, Dict[str, object]]:
+    try:
+        raw = json.loads((folder / _INDEX_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(raw, dict) or raw.get("version") != _INDEX_VERSION:
+        return {}
+    return dict(raw.get("members") or {})
+
+
+def _save_index(folder: Path, members: Dict[str, Dict[str, object]]) -> None:
+    payload = {"version": _INDEX_VERSION, "members": dict(sorted(members.items()))}
+    storage.atomic_write(folder / _INDEX_NAME, json.dumps(payload), fsync="file")
+
+
+def _read_member(tar: tarfile.TarFile, name: str) -> Optional[bytes]:
+    """Contenuto del membro *name*; ``None`` se manca o non è un file regolare."""
+    try:
+        member = tar.extractfile(name)
+    except KeyError:            # voce di packs.json non presente nell'archivio
+        return None
+    return member.read() if member is not None else None
+
+
+def read_packed(path: os.PathLike | str) -> bytes:
+    """Contenuto di un'istantanea impacchettata (``FileNotFoundError`` se assente,
+    anche quando l'indice cita un membro che l'archivio non contiene)."""
+    path = Path(path)
+    info = _load_index(path.parent).get(path.name)
+    if not info or not info.get("archive"):
+        raise FileNotFoundError(path)
+    with tarfile.open(path.parent / str(info["archive"]), "r:gz") as tar:
+        data = _read_member(tar, path.name)
+    if data is None:
+        raise FileNotFoundError(path)
+    return data
+
+
+# ---------------------------------------------------------------------------
+# Elenco e pianificazione
+# ---------------------------------------------------------------------------
+
+def _timestamp_of(name: str, fallback: float) -> float:
+    m = _NAME_RGX.match(name)
+    if not m:
+        return fallback
+    try:
+        return time.mktime(time.strptime(m.group(1), "%Y%m%d-%H%M%S"))
+    except ValueError:
+        return fallback
+
+
+def list_history(folder: os.PathLike | str | None = None) -> List[Snapshot]:
+    """Istantanee (file singoli e impacchettate), dalla più recente."""
+    folder = _folder(folder)
+    snaps: Dict[str, Snapshot] = {}
+    for name, info in _load_index(folder).items():
+        snaps[name] = Snapshot(name, float(info.get("ts", 0)), int(info.get("size", 0)),
+                               str(info["archive"]))
+    try:
+        with os.scandir(folder) as it:
+            for e in it:
+                if e.name.startswith("recipe_") and e.name.endswith(".json") and e.is_file():
+                    st = e.stat()
+                    # un file singolo prevale su una copia impacchettata
+                    snaps[e.name] = Snapshot(e.name, _timestamp_of(e.name, st.st_mtime), st.st_size)
+    except OSError:
+        pass
+    return sorted(snaps.values(), key=lambda s: (s.ts, s.name), reverse=True)
+
+
+def plan_retention(
+    snaps: List[Snapshot], policy: RetentionPolicy, now: Optional[float] = None
+) -> Dict[str, str]:
+    """Decisione per ogni istantanea: ``"keep"``, ``"pack"`` o ``"drop"``."""
+    now = time.time() if now is None else now
+    decisions: Dict[str, str] = {}
+    seen_buckets = set()
+    for snap in sorted(snaps, key=lambda s: (s.ts, s.name), reverse=True):
+        age = now - snap.ts
+        if age <= policy.keep_all_hours * 3600:
+            decisions[snap.name] = "keep"
+            continue
+        if age <= policy.hourly_hours * 3600:
+            bucket = ("h", int(snap.ts // 3600))
+        elif age <= policy.daily_days * 86400:
+            bucket = ("d", time.strftime("%Y%m%d", time.localtime(snap.ts)))
+        else:
+            decisions[snap.name] = "drop"
+            continue
+        decisions[snap.name] = "drop" if bucket in seen_buckets else "pack"
+        seen_buckets.add(bucket)
+    return decisions
+
+
+# ---------------------------------------------------------------------------
+# Compattazione
+# ---------------------------------------------------------------------------
+
+def _tar_bytes(members: Dict[str, bytes]) -> bytes:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def _disk_usage(folder: Path) -> int:
+    total = 0
+    try:
+        with os.scandir(folder) as it:
+            for e in it:
+                if e.is_file() and (e.name.startswith(("recipe_", "pack_")) or e.name == _INDEX_NAME):
+                    total += e.stat().st_size
+    except OSError:
+        pass
+    return total
+
+
+def compact_history(
+    folder: os.PathLike | str | None = None,
+    policy: RetentionPolicy = RetentionPolicy(),
+    *,
+    now: Optional[float] = None,
+    dry_run: bool = False,
+) -> CompactionReport:
+    """Applica *policy* alla cartella storia e restituisce il resoconto.
+
+    Lettura delle istantanee, compressione e scrittura degli archivi
+    avvengono *fuori* dal lock della cartella (gli archivi nuovi hanno nomi
+    unici, nessuno li legge finché l'indice non li cita): il lock è tenuto
+    solo per aggiornare ``packs.json`` e cancellare i file sostituiti, così
+    un ``quick_save`` concorrente non attende la compressione.
+    """
+    folder = _folder(folder)
+    report = CompactionReport(bytes_before=_disk_usage(folder))
+    with _GC_LOCK:
+        snaps = list_history(folder)
+        decisions = plan_retention(snaps, policy, now)
+        index = _load_index(folder)
+        loose_pack = [s for s in snaps if s.archive is None and decisions[s.name] == "pack"]
+        loose_drop = [s for s in snaps if s.archive is None and decisions[s.name] == "drop"]
+        packed_drop = [s for s in snaps if s.archive is not None and decisions[s.name] == "drop"]
+        report.kept = sum(1 for d in decisions.values() if d == "keep")
+        report.packed = len(loose_pack)
+        report.deleted = len(loose_drop) + len(packed_drop)
+        if dry_run:
+            report.bytes_after = report.bytes_before
+            return report
+
+        # 1. nuovo archivio con i file singoli da impacchettare
+        packed: Dict[str, Dict[str, object]] = {}
+        members: Dict[str, bytes] = {}
+        for s in loose_pack:
+            try:
+                members[s.name] = (folder / s.name).read_bytes()
+            except FileNotFoundError:
+                continue
+        if members:
+            target = storage.write_unique(folder, f"pack_{storage.timestamp()}", ".tar.gz",
+                                          _tar_bytes(members), fsync="file")
+            report.archives.append(target.name)
+            packed = {s.name: {"archive": target.name, "ts": s.ts, "size": s.size}
+                      for s in loose_pack if s.name in members}
+
+        # 2. archivi esistenti senza le istantanee scadute (riscritti con un nome nuovo);
+        #    le voci dell'indice che l'archivio non contiene più vengono tolte
+        dropped = {s.name for s in packed_drop}
+        replaced: Dict[str, Optional[str]] = {}      # archivio vecchio -> nuovo (None = nessuno)
+        for archive in sorted({str(s.archive) for s in packed_drop}):
+            remaining = [n for n, i in index.items() if i.get("archive") == archive and n not in dropped]
+            data: Dict[str, bytes] = {}
+            if remaining:
+                try:
+                    with tarfile.open(folder / archive, "r:gz") as tar:
+                        for n in remaining:
+                            content = _read_member(tar, n)
+                            if content is not None:
+                                data[n] = content
+                except FileNotFoundError:
+                    pass
+            dropped.update(n for n in remaining if n not in data)
+            if not data:
+                replaced[archive] = None
+                continue
+            new = storage.write_unique(folder, f"pack_{storage.timestamp()}", ".tar.gz",
+                                       _tar_bytes(data), fsync="file")
+            report.archives.append(new.name)
+            replaced[archive] = new.name
+
+        # 3. sotto il lock: solo indice e cancellazioni (un crash lascia solo duplicati)
+        with storage.dir_lock(folder, True):
+            index = _load_index(folder)
+            for name in dropped:
+                if index.get(name, {}).get("archive") in replaced:
+                    del index[name]
+            for info in index.values():
+                if replaced.get(str(info["archive"])):
+                    info["archive"] = replaced[str(info["archive"])]
+            index.update(packed)
+            _save_index(folder, index)
+            for s in loose_drop:
+                (folder / s.name).unlink(missing_ok=True)
+            for name in packed:
+                (folder / name).unlink(missing_ok=True)
+            still_used = {str(i["archive"]) for i in index.values()}
+            for archive in replaced:
+                if archive not in still_used:
+                    (folder / archive).unlink(missing_ok=True)
+    report.bytes_after = _disk_usage(folder)
+    return report
+
+
+class BackgroundCompactor:
+    """Esegue :func:`compact_history` ogni *interval* secondi su un thread daemon."""
+
+    def __init__(
+        self,
+        interval: float = 3600,
+        policy: RetentionPolicy = RetentionPolicy(),
+        folder: os.PathLike | str | None = None,
+    ) -> None:
+        self.interval = interval
+        self.policy = policy
+        self.folder = folder
+        self.last_report: Optional[CompactionReport] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "BackgroundCompactor":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="history-gc", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.last_report = compact_history(self.folder, self.policy)
+            except (OSError, tarfile.TarError, KeyError, AttributeError):
+                pass  # riprova al giro successivo: il thread non deve morire
@@ -37,6 +37,11 @@ __all__ = [
     # legacy compat
     "validate_url",
     "fetch_metadata",
+    # bulk ingestion
+    "IMAGE_EXTENSIONS",
+    "is_image_path",
+    "expand_image_paths",
+    "probe_metadata",
 ]
 
 # ---------------------------------------------------------------------------
@@ -212,3 +217,96 @@ def fetch_metadata(path: os.PathLike | str) -> Dict[str, int | str]:
             "height": img.height,
             "format": img.format or "",
         }
+
+
+# ---------------------------------------------------------------------------
+# Ingestione massiva (drag & drop di cartelle / migliaia di file)
+# ---------------------------------------------------------------------------
+
+IMAGE_EXTENSIONS = frozenset(
+    {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp", ".tif", ".tiff", ".svg", ".avif"}
+)
+
+
+def is_image_path(path: os.PathLike | str) -> bool:
+    """True se l'estensione di *path* è tra :data:`IMAGE_EXTENSIONS`."""
+    return os.path.splitext(os.fspath(path))[1].lower() in IMAGE_EXTENSIONS
+
+
+def expand_image_paths(
+    paths: Iterable[os.PathLike | str], *, recursive: bool = True
+) -> List[str]:
+    """Espande le cartelle in *paths* nei file immagine contenuti.
+
+    * I file espliciti non immagine vengono scartati; gli URL restano invariati.
+    * Le cartelle sono visitate con ``os.scandir`` (ordine alfabetico,
+      sottocartelle incluse se ``recursive``); i file nascosti sono ignorati.
+    * Ogni cartella reale è visitata una sola volta, così i link simbolici
+      ciclici non causano ricorsione infinita.
+    * I duplicati vengono rimossi mantenendo il primo.
+    """
+    out: List[str] = []
+    seen: set[str] = set()
+    visited: set[str] = set()
+
+    def _emit(p: str) -> None:
+        if p not in seen:
+            seen.add(p)
+            out.append(p)
+
+    def _walk(folder: str) -> None:
+        real = os.path.realpath(folder)
+        if real in visited:
+            return
+        visited.add(real)
+        try:
+            with os.scandir(folder) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            return
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            if is_dir:
+                if recursive:
+                    _walk(entry.path)
+            elif is_image_path(entry.name):
+                _emit(entry.path)
+
+    for raw in paths:
+        p = os.fspath(raw)
+        if "://" in p:
+            _emit(p)
+        elif os.path.isdir(p):
+            _walk(p)
+        elif is_image_path(p):
+            _emit(p)
+    return out
+
+
+def probe_metadata(path: os.PathLike | str) -> Dict[str, int | str]:
+    """Metadati economici di un file immagine, pensato per i worker in background.
+
+    Restituisce sempre ``bytes`` e ``format``; ``width``/``height`` solo se
+    Pillow è installato (Pillow legge l'header, non decodifica i pixel).
+    In caso di file illeggibile è presente la chiave ``error``.
+    """
+    path = os.fspath(path)
+    meta: Dict[str, int | str] = {
+        "format": os.path.splitext(path)[1].lstrip(".").upper(),
+    }
+    try:
+        meta["bytes"] = os.stat(path).st_size
+    except OSError as exc:
+        meta["error"] = exc.strerror or str(exc)
+        return meta
+    if Image is not None:
+        try:
+            meta.update(fetch_metadata(path))
+        except Exception as exc:  # file corrotto / formato non supportato
+            meta["error"] = str(exc)
+    return meta
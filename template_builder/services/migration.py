@@ -0,0 +1,176 @@
+"""template_builder.services.migration
+
+Migrazione in blocco delle ricette v1 / batch-1 allo schema v2.
+
+:func:`storage.load_recipe` sa leggere i vecchi formati, ma li migra a ogni
+apertura e non li riscrive mai.  :func:`migrate_tree` percorre una cartella
+(ricorsivamente), migra i file in processi worker paralleli e li riscrive
+con :func:`storage.atomic_write`, lasciando accanto una copia dell'originale
+(``<nome>.json.v1.bak``).  Il risultato è un :class:`MigrationReport`.
+
+Sono considerati solo i file ``*.json`` che sembrano ricette: i file di
+servizio (``packs.json``, snapshot di autosave, indici) e i dizionari le cui
+chiavi non sono placeholder vengono saltati.  Le istantanee già
+impacchettate negli archivi della storia non sono toccate.
+"""
+from __future__ import annotations
+
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from . import storage
+
+__all__ = [
+    "FileResult",
+    "MigrationReport",
+    "iter_recipe_files",
+    "migrate_file",
+    "migrate_tree",
+]
+
+BACKUP_SUFFIX = ".v1.bak"
+_SKIP_NAMES = {"packs.json", "session.json"}
+_KEY_RGX = re.compile(r"(?:[A-Z0-9_]+|__\w+)$")
+_PARALLEL_MIN = 8   # sotto questa soglia i processi costano più del lavoro
+
+
+@dataclass(frozen=True)
+class FileResult:
+    path: str
+    status: str                   # "migrated" | "current" | "skipped" | "error"
+    detail: str = ""
+
+
+@dataclass
+class MigrationReport:
+    root: str
+    dry_run: bool = False
+    results: List[FileResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def _count(self, status: str) -> int:
+        return sum(1 for r in self.results if r.status == status)
+
+    @property
+    def migrated(self) -> int:
+        return self._count("migrated")
+
+    @property
+    def current(self) -> int:
+        return self._count("current")
+
+    @property
+    def skipped(self) -> int:
+        return self._count("skipped")
+
+    @property
+    def errors(self) -> List[FileResult]:
+        return [r for r in self.results if r.status == "error"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "root": self.root,
+            "dry_run": self.dry_run,
+            "elapsed": round(self.elapsed, 3),
+            "migrated": self.migrated,
+            "current": self.current,
+            "skipped": self.skipped,
+            "errors": len(self.errors),
+            "files": [r.__dict__ for r in self.results],
+        }
+
+    def __str__(self) -> str:
+        verb = "da migrare" if self.dry_run else "migrate"
+        return (f"{self.migrated} {verb}, {self.current} già v2, {self.skipped} saltati, "
+                f"{len(self.errors)} errori in {self.elapsed:.2f}s")
+
+
+def iter_recipe_files(root: os.PathLike | str) -> Iterator[Path]:
+    """File ``*.json`` sotto *root* candidati alla migrazione (ordinati)."""
+    root = Path(root)
+    if root.is_file():
+        yield root
+        return
+    for path in sorted(root.rglob("*.json")):
+        if path.name in _SKIP_NAMES or path.name.startswith("."):
+            continue
+        if path.is_file():
+            yield path
+
+
+def _looks_like_recipe(data: Dict[str, Any]) -> bool:
+    body = data.get("data") if "data" in data else data
+    return isinstance(body, dict) and bool(body) and all(
+        isinstance(k, str) and _KEY_RGX.match(k) for k in body
+    )
+
+
+def migrate_file(path: os.PathLike | str, *, backup: bool = True, dry_run: bool = False) -> FileResult:
+    """Migra un singolo file (eseguita nei processi worker)."""
+    path = Path(path)
+    try:
+        raw = path.read_bytes()
+        data = storage.get_json_codec().loads(raw)
+    except (OSError, ValueError) as exc:
+        return FileResult(str(path), "error", str(exc))
+    version = storage.recipe_schema(data)
+    if version == storage.SCHEMA_VERSION:
+        return FileResult(str(path), "current")
+    if version is None or not _looks_like_recipe(data):
+        return FileResult(str(path), "skipped", "non è una ricetta")
+    source = "v1" if "data" in data else "batch-1"
+    if dry_run:
+        return FileResult(str(path), "migrated", source)
+    try:
+        payload = {
+            "created": data.get("created") or time.strftime(
+                "%Y%m%d-%H%M%S", time.localtime(path.stat().st_mtime)),
+            "schema": storage.SCHEMA_VERSION,
+            "data": storage._upgrade(data),
+        }
+        if backup:
+            bak = path.with_name(path.name + BACKUP_SUFFIX)
+            if not bak.exists():               # non sovrascrive l'originale di un giro precedente
+                storage.atomic_write(bak, raw, fsync="file")
+        storage.atomic_write(path, storage.get_json_codec().dumps(payload, pretty=True), fsync="file")
+    except (OSError, ValueError, TypeError) as exc:
+        return FileResult(str(path), "error", str(exc))
+    return FileResult(str(path), "migrated", source)
+
+
+def migrate_tree(
+    root: os.PathLike | str,
+    *,
+    workers: Optional[int] = None,
+    backup: bool = True,
+    dry_run: bool = False,
+) -> MigrationReport:
+    """Migra tutte le ricette sotto *root*.
+
+    *workers* è il numero di processi (default ``os.cpu_count()``); ``1``
+    esegue tutto nel processo corrente.
+    """
+    started = time.perf_counter()
+    report = MigrationReport(str(root), dry_run=dry_run)
+    files = list(iter_recipe_files(root))
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(files) >= _PARALLEL_MIN:
+        chunksize = max(1, len(files) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=min(workers, len(files))) as pool:
+            report.results = list(pool.map(
+                _migrate_worker, [(str(f), backup, dry_run) for f in files], chunksize=chunksize,
+            ))
+    else:
+        report.results = [migrate_file(f, backup=backup, dry_run=dry_run) for f in files]
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def _migrate_worker(args: tuple) -> FileResult:
+    path, backup, dry_run = args
+    return migrate_file(path, backup=backup, dry_run=dry_run)
@@ -0,0 +1,342 @@
+"""template_builder.services.search
+
+Indice full-text delle ricette salvate.
+
+Per ogni ricetta della cartella storia (file singoli e istantanee
+impacchettate da :mod:`.history`) sono indicizzati quattro campi ricavati
+dai placeholder: titolo (``*TITLE*``, ``*NAME*``), descrizione (``*DESC*``,
+``*INTRO*``), ingredienti (``*INGREDIENT*``) e testi degli step
+(``STEPn``, ``*STEPS_TEXT*``, ``STEPS[].TEXT``).
+
+L'indice vive in un database SQLite: con FTS5 (disponibile nella quasi
+totalità delle build di Python) le query sono ordinate con ``bm25``;
+altrimenti si usa una tabella di termini (indice invertito "a mano") con un
+punteggio tf·idf.  L'aggiornamento è incrementale: :meth:`RecipeIndex.refresh`
+reindicizza solo i file con dimensione/data cambiate e
+:func:`install_save_hook` aggiunge ogni ricetta salvata con ``quick_save``.
+"""
+from __future__ import annotations
+
+import math
+import os
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from . import storage
+
+__all__ = [
+    "SearchHit",
+    "RecipeIndex",
+    "recipe_fields",
+    "install_save_hook",
+]
+
+FIELDS = ("title", "description", "ingredients", "steps")
+_WEIGHTS = (10.0, 4.0, 2.0, 1.0)
+_TAG_RGX = re.compile(r"<[^>]+>")
+_WORD_RGX = re.compile(r"\w+", re.UNICODE)
+_STEP_RGX = re.compile(r"STEP\d+$")
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    path: str
+    title: str
+    score: float
+    snippet: str = ""
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, str):
+        return _TAG_RGX.sub(" ", value)
+    if isinstance(value, (list, tuple)):
+        return " ".join(_text(v) for v in value)
+    return ""
+
+
+def recipe_fields(state: Mapping[str, Any]) -> Tuple[str, str, str, str]:
+    """Testo (senza HTML) di titolo, descrizione, ingredienti e step."""
+    parts: Dict[str, List[str]] = {f: [] for f in FIELDS}
+    for key in sorted(state):
+        if key.endswith(("_SRC", "_ALT")):
+            continue
+        up = key.upper()
+        if "TITLE" in up or up.endswith("NAME"):
+            field = "title"
+        elif "INGREDIENT" in up:
+            field = "ingredients"
+        elif _STEP_RGX.match(up) or "STEPS_TEXT" in up:
+            field = "steps"
+        elif "DESC" in up or "INTRO" in up:
+            field = "description"
+        else:
+            continue
+        parts[field].append(_text(state[key]))
+    for step in state.get("STEPS") or ():
+        if isinstance(step, Mapping):
+            parts["steps"].append(_text(step.get("TEXT", "")))
+    return tuple(" ".join(" ".join(p).split()) for p in parts.values())  # type: ignore[return-value]
+
+
+def _tokens(text: str) -> List[str]:
+    return [w.lower() for w in _WORD_RGX.findall(text)]
+
+
+def _fts5_available(conn: sqlite3.Connection) -> bool:
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._probe USING fts5(x)")
+        conn.execute("DROP TABLE temp._probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+class RecipeIndex:
+    """Indice full-text persistente (SQLite) della cartella storia.
+
+    Parametri
+    ---------
+    db_path:
+        File del database (default ``~/.template_builder/search.sqlite``);
+        ``":memory:"`` per un indice volatile.
+    folder:
+        Cartella delle ricette (default la cartella storia).
+    use_fts5:
+        ``False`` forza l'indice invertito di riserva (utile nei test).
+    """
+
+    def __init__(
+        self,
+        db_path: os.PathLike | str | None = None,
+        *,
+        folder: os.PathLike | str | None = None,
+        use_fts5: bool = True,
+    ) -> None:
+        self.db_path = str(db_path) if db_path is not None else str(storage.data_dir("search.sqlite"))
+        self.folder = Path(folder) if folder is not None else None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.uses_fts5 = use_fts5 and _fts5_available(self._conn)
+        self._init_schema()
+
+    # ------------------------------------------------------------------ schema
+    def _init_schema(self) -> None:
+        c = self._conn
+        if self.db_path != ":memory:":
+            c.execute("PRAGMA journal_mode=WAL")
+        c.execute(
+            "CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, path TEXT UNIQUE,"
+            " sig TEXT, title TEXT)"
+        )
+        if self.uses_fts5:
+            c.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS fts USING fts5("
+                + ", ".join(FIELDS) + ", tokenize='unicode61 remove_diacritics 2')"
+            )
+        else:
+            c.execute("CREATE TABLE IF NOT EXISTS terms (term TEXT, doc INTEGER, field INTEGER, tf INTEGER)")
+            c.execute("CREATE INDEX IF NOT EXISTS terms_term ON terms(term)")
+            c.execute("CREATE INDEX IF NOT EXISTS terms_doc ON terms(doc)")
+        c.commit()
+
+    def close(self) -> None:
+        """Chiude il database; un ``refresh`` in corso su un altro thread si ferma."""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._conn.close()
+
+    # ------------------------------------------------------------------ scrittura
+    def _delete(self, doc_id: int) -> None:
+        c = self._conn
+        if self.uses_fts5:
+            c.execute("DELETE FROM fts WHERE rowid = ?", (doc_id,))
+        else:
+            c.execute("DELETE FROM terms WHERE doc = ?", (doc_id,))
+        c.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+
+    def _insert(self, path: str, sig: str, fields: Tuple[str, str, str, str]) -> None:
+        c = self._conn
+        row = c.execute("SELECT id FROM docs WHERE path = ?", (path,)).fetchone()
+        if row:
+            self._delete(row[0])
+        cur = c.execute("INSERT INTO docs (path, sig, title) VALUES (?, ?, ?)", (path, sig, fields[0]))
+        doc_id = cur.lastrowid
+        if self.uses_fts5:
+            c.execute("INSERT INTO fts (rowid, " + ", ".join(FIELDS) + ") VALUES (?, ?, ?, ?, ?)",
+                      (doc_id, *fields))
+        else:
+            rows = []
+            for f, text in enumerate(fields):
+                counts: Dict[str, int] = {}
+                for tok in _tokens(text):
+                    counts[tok] = counts.get(tok, 0) + 1
+                rows.extend((t, doc_id, f, n) for t, n in counts.items())
+            c.executemany("INSERT INTO terms VALUES (?, ?, ?, ?)", rows)
+
+    def add(self, path: os.PathLike | str, state: Mapping[str, Any], sig: str = "") -> None:
+        """Indicizza (o reindicizza) la ricetta *state* salvata in *path*."""
+        path = str(path)
+        if not sig:
+            try:
+                st = os.stat(path)
+                sig = f"{st.st_mtime_ns}:{st.st_size}"
+            except OSError:
+                sig = "?"
+        fields = recipe_fields(state)
+        with self._lock:
+            if self._closed:
+                return
+            self._insert(path, sig, fields)
+            self._conn.commit()
+
+    def remove(self, path: os.PathLike | str) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            row = self._conn.execute("SELECT id FROM docs WHERE path = ?", (str(path),)).fetchone()
+            if row:
+                self._delete(row[0])
+                self._conn.commit()
+
+    def refresh(self, folder: os.PathLike | str | None = None, *, batch: int = 50) -> int:
+        """Allinea l'indice alla cartella; restituisce i documenti (re)indicizzati.
+
+        Lettura e analisi dei file avvengono fuori dal lock dell'indice, che
+        è preso solo per le scritture SQL (a lotti di *batch* documenti):
+        ``add`` dal salvataggio e ``search`` dal dialogo non restano bloccati
+        durante il riallineamento iniziale.
+        """
+        from .history import list_history
+
+        folder = Path(folder) if folder is not None else (self.folder or storage._HISTORY_DIR)
+        current: Dict[str, str] = {}
+        for snap in list_history(folder):
+            path = folder / snap.name
+            if snap.archive is None:
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                sig = f"{st.st_mtime_ns}:{st.st_size}"
+            else:
+                sig = f"{snap.archive}:{snap.size}"
+            current[str(path)] = sig
+        prefix = str(folder) + os.sep
+        with self._lock:
+            if self._closed:
+                return 0
+            known = {p: (i, s) for i, p, s in self._conn.execute("SELECT id, path, sig FROM docs")
+                     if p.startswith(prefix)}
+            for path, (doc_id, _) in known.items():
+                if path not in current:
+                    self._delete(doc_id)
+            self._conn.commit()
+
+        changed = 0
+        pending: List[Tuple[str, str, Tuple[str, str, str, str]]] = []
+
+        def write_pending() -> bool:
+            with self._lock:
+                if self._closed:
+                    return False
+                for item in pending:
+                    self._insert(*item)
+                self._conn.commit()
+            pending.clear()
+            return True
+
+        for path, sig in current.items():
+            if known.get(path, (None, None))[1] == sig:
+                continue
+            try:
+                fields = recipe_fields(storage.load_recipe(path))
+            except (OSError, ValueError, TypeError):
+                continue
+            pending.append((path, sig, fields))
+            changed += 1
+            if len(pending) >= batch and not write_pending():
+                return changed
+        if pending:
+            write_pending()
+        return changed
+
+    # ------------------------------------------------------------------ query
+    def __len__(self) -> int:
+        with self._lock:
+            return 0 if self._closed else self._count()
+
+    def _count(self) -> int:
+        # chiamare con self._lock acquisito (il lock non è rientrante)
+        return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def search(self, query: str, limit: int = 20) -> List[SearchHit]:
+        """Ricette che contengono tutte le parole di *query* (anche come prefisso),
+        dalla più rilevante."""
+        words = _tokens(query)
+        if not words:
+            return []
+        with self._lock:
+            if self._closed:
+                return []
+            if self.uses_fts5:
+                return self._search_fts5(words, limit)
+            return self._search_terms(words, limit)
+
+    def _search_fts5(self, words: List[str], limit: int) -> List[SearchHit]:
+        match = " ".join('"' + w.replace('"', '""') + '"*' for w in words)
+        weights = ", ".join(str(w) for w in _WEIGHTS)
+        rows = self._conn.execute(
+            f"SELECT d.path, d.title, bm25(fts, {weights}) AS score,"
+            " snippet(fts, -1, '[', ']', '…', 12)"
+            " FROM fts JOIN docs d ON d.id = fts.rowid"
+            " WHERE fts MATCH ? ORDER BY score LIMIT ?",
+            (match, limit),
+        ).fetchall()
+        return [SearchHit(p, t, -s, snip) for p, t, s, snip in rows]
+
+    def _search_terms(self, words: List[str], limit: int) -> List[SearchHit]:
+        c = self._conn
+        n_docs = max(1, self._count())
+        scores: Optional[Dict[int, float]] = None
+        for word in words:
+            per_doc: Dict[int, float] = {}
+            rows = c.execute(
+                "SELECT doc, field, tf FROM terms WHERE term >= ? AND term < ?",
+                (word, word + "\uffff"),
+            ).fetchall()
+            df = len({doc for doc, _, _ in rows}) or 1
+            idf = math.log(1 + n_docs / df)
+            for doc, field, tf in rows:
+                per_doc[doc] = per_doc.get(doc, 0.0) + _WEIGHTS[field] * tf * idf
+            if scores is None:
+                scores = per_doc
+            else:
+                scores = {d: s + per_doc[d] for d, s in scores.items() if d in per_doc}
+            if not scores:
+                return []
+        best = sorted((scores or {}).items(), key=lambda kv: kv[1], reverse=True)[:limit]
+        hits = []
+        for doc, score in best:
+            path, title = c.execute("SELECT path, title FROM docs WHERE id = ?", (doc,)).fetchone()
+            hits.append(SearchHit(path, title, score))
+        return hits
+
+
+def install_save_hook(index: RecipeIndex) -> Callable[[Any, Mapping[str, Any]], None]:
+    """Indicizza ogni ricetta salvata da :func:`storage.quick_save`.
+
+    Restituisce l'hook, da passare a :func:`storage.unregister_save_hook`
+    prima di chiudere l'indice.
+    """
+    def hook(path: Any, state: Mapping[str, Any]) -> None:
+        index.add(path, state)
+
+    storage.register_save_hook(hook)
+    return hook
+
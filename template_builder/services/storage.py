@@ -8,11 +8,23 @@ lazy‑import) ma gli altri helper continueranno a funzionare – questo rende
 il pacchetto installabile senza dipendenze pesanti.
 """
 
+import itertools
 import json
 import os
+import tempfile
+import threading
 import time
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Set
+
+try:  # lock advisory solo su POSIX
+    import fcntl  # type: ignore
+except ImportError:  # pragma: no cover – Windows
+    fcntl = None  # type: ignore[assignment]
+
+from ..model import Recipe
 
 # ---------------------------------------------------------------------------
 # Tentativo opzionale di import Jinja2
@@ -23,11 +35,33 @@ try:  # pragma: no cover – la CI non installa jinja2
 except ModuleNotFoundError:  # fallback leggero
     Environment = FileSystemLoader = select_autoescape = None  # type: ignore[misc,assignment]
 
+try:  # backend JSON veloce opzionale
+    import orjson  # type: ignore
+except ModuleNotFoundError:
+    orjson = None  # type: ignore[assignment]
+
 __all__ = [
     "load_recipe",
+    "recipe_schema",
     "quick_save",
     "export_html",
+    "render_many",
+    "RenderResult",
     "UndoRedoStack",
+    "JsonCodec",
+    "get_json_codec",
+    "set_json_codec",
+    "atomic_write",
+    "write_unique",
+    "dir_lock",
+    "timestamp",
+    "data_dir",
+    "FSYNC_POLICIES",
+    "register_save_hook",
+    "unregister_save_hook",
+    "get_environment",
+    "compile_template",
+    "invalidate_template",
 ]
 
 # ---------------------------------------------------------------------------
@@ -39,47 +73,284 @@ SCHEMA_VERSION = 2                # ← nuovo
 _HISTORY_DIR   = _BASE_DIR / "history"
 _HISTORY_DIR.mkdir(parents=True, exist_ok=True)
 
+
+def data_dir(*parts: str) -> Path:
+    """Percorso nella cartella dati dell'utente (``~/.template_builder``).
+
+    Il percorso non viene creato: ci pensa chi ci scrive.
+    """
+    return _BASE_DIR.joinpath(*parts)
+
+
+# ---------------------------------------------------------------------------
+# Scritture atomiche
+# ---------------------------------------------------------------------------
+
+FSYNC_POLICIES = ("none", "file", "dir")
+_LOCK_NAME = ".storage.lock"
+
+
+class _FolderLock:
+    """Stato del lock di una cartella: RLock tra thread + flock tra processi."""
+
+    __slots__ = ("rlock", "depth", "fh")
+
+    def __init__(self) -> None:
+        self.rlock = threading.RLock()
+        self.depth = 0          # annidamento nel thread che possiede il lock
+        self.fh: Any = None     # file di lock aperto (solo al livello esterno)
+
+
+_FOLDER_LOCKS: Dict[str, _FolderLock] = {}
+_FOLDER_LOCKS_GUARD = threading.Lock()
+
+
+@contextmanager
+def dir_lock(folder: Path, enabled: bool) -> Iterator[None]:
+    """Lock esclusivo sulla cartella (``fcntl.flock`` su ``.storage.lock``).
+
+    Serializza le scritture di più processi (worker batch, due GUI) e dei
+    thread del processo corrente; senza ``fcntl`` resta il solo lock tra
+    thread.  C'è un lock per cartella (cartelle diverse non si bloccano a
+    vicenda) ed è rientrante: un ``dir_lock`` annidato sulla stessa
+    cartella nello stesso thread non si blocca e prende ``flock`` una volta.
+    """
+    if not enabled:
+        yield
+        return
+    key = os.path.realpath(folder)
+    with _FOLDER_LOCKS_GUARD:
+        state = _FOLDER_LOCKS.get(key)
+        if state is None:
+            state = _FOLDER_LOCKS[key] = _FolderLock()
+    with state.rlock:
+        state.depth += 1
+        try:
+            if state.depth == 1 and fcntl is not None:
+                fh = open(os.path.join(key, _LOCK_NAME), "a+b")
+                try:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+                except BaseException:
+                    fh.close()
+                    raise
+                state.fh = fh
+            yield
+        finally:
+            state.depth -= 1
+            if state.depth == 0 and state.fh is not None:
+                fh, state.fh = state.fh, None
+                try:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+                finally:
+                    fh.close()
+
+
+def _fsync_dir(folder: Path) -> None:
+    try:
+        fd = os.open(folder, os.O_RDONLY)
+    except OSError:  # pragma: no cover – Windows non apre cartelle
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(
+    path: os.PathLike | str,
+    data: bytes | str,
+    *,
+    fsync: str = "file",
+    lock: bool = False,
+    encoding: str = "utf-8",
+) -> Path:
+    """Scrive *data* in *path* via file temporaneo + ``os.replace``.
+
+    I lettori vedono il file vecchio o quello nuovo, mai uno parziale.
+    *fsync*: ``"none"`` (nessun fsync), ``"file"`` (fsync del contenuto
+    prima del rename), ``"dir"`` (anche della cartella, rename durevole).
+    *lock*: serializza con un lock advisory sulla cartella di destinazione.
+    """
+    if fsync not in FSYNC_POLICIES:
+        raise ValueError(f"fsync deve essere uno di {FSYNC_POLICIES}, non {fsync!r}")
+    path = Path(path)
+    if isinstance(data, str):
+        data = data.encode(encoding)
+    folder = path.parent
+    folder.mkdir(parents=True, exist_ok=True)
+    with dir_lock(folder, lock):
+        tmp = _write_temp(folder, path.name, data, fsync)
+        try:
+            os.replace(tmp, path)
+        except BaseException:
+            _unlink_quiet(tmp)
+            raise
+        if fsync == "dir":
+            _fsync_dir(folder)
+    return path
+
+
+def _unlink_quiet(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _write_temp(folder: Path, name: str, data: bytes, fsync: str) -> str:
+    """File temporaneo ``.name.*.tmp`` in *folder* con *data* (già scritto)."""
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+            fh.flush()
+            if fsync != "none":
+                os.fsync(fh.fileno())
+    except BaseException:
+        _unlink_quiet(tmp)
+        raise
+    return tmp
+
+
+def write_unique(
+    folder: Path, stem: str, suffix: str, data: bytes, *, fsync: str = "file", lock: bool = False,
+) -> Path:
+    """Scrive *data* nel primo nome libero ``stem[-n]suffix`` di *folder*.
+
+    Il contenuto è scritto in un file temporaneo e pubblicato con
+    ``os.link``, che fallisce se il nome esiste già: il file finale compare
+    solo completo, mai vuoto o parziale.  Dove gli hard link non sono
+    supportati si ripiega su un nome con pid + contatore e ``os.replace``.
+    """
+    if fsync not in FSYNC_POLICIES:
+        raise ValueError(f"fsync deve essere uno di {FSYNC_POLICIES}, non {fsync!r}")
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    tmp = _write_temp(folder, stem + suffix, data, fsync)
+    try:
+        with dir_lock(folder, lock):
+            n = 0
+            while True:
+                target = folder / (f"{stem}{suffix}" if n == 0 else f"{stem}-{n}{suffix}")
+                try:
+                    os.link(tmp, target)
+                    break
+                except FileExistsError:
+                    n += 1
+                except OSError:  # pragma: no cover – FS senza hard link
+                    target = folder / f"{stem}-{os.getpid()}-{next(_UNIQUE_IDS)}{suffix}"
+                    os.replace(tmp, target)
+                    break
+    finally:
+        _unlink_quiet(tmp)
+    if fsync == "dir":
+        _fsync_dir(folder)
+    return target
+
+
+_UNIQUE_IDS = itertools.count(1)
+
+# ---------------------------------------------------------------------------
+# Codec JSON (orjson se installato, altrimenti json della stdlib)
+# ---------------------------------------------------------------------------
+
+class JsonCodec:
+    """Coppia ``dumps``/``loads`` su *bytes* UTF-8."""
+
+    def __init__(self, name: str, dumps: Any, loads: Any) -> None:
+        self.name = name
+        self._dumps = dumps
+        self.loads = loads
+
+    def dumps(self, obj: Any, *, pretty: bool = False) -> bytes:
+        return self._dumps(obj, pretty)
+
+    def __repr__(self) -> str:
+        return f"<JsonCodec {self.name}>"
+
+
+def _std_dumps(obj: Any, pretty: bool) -> bytes:
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+_CODECS: Dict[str, JsonCodec] = {"json": JsonCodec("json", _std_dumps, json.loads)}
+if orjson is not None:  # pragma: no cover – dipende dall'ambiente
+    _CODECS["orjson"] = JsonCodec(
+        "orjson",
+        lambda obj, pretty: orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0),
+        orjson.loads,
+    )
+_codec: JsonCodec = _CODECS.get("orjson", _CODECS["json"])
+
+
+def get_json_codec() -> JsonCodec:
+    """Codec usato da ``quick_save``/``load_recipe``."""
+    return _codec
+
+
+def set_json_codec(codec: str | JsonCodec) -> JsonCodec:
+    """Seleziona il codec per nome (``"json"``, ``"orjson"``) o istanza; restituisce il precedente."""
+    global _codec
+    previous = _codec
+    if isinstance(codec, str):
+        if codec not in _CODECS:
+            raise ValueError(f"Codec JSON non disponibile: {codec!r}")
+        codec = _CODECS[codec]
+    _codec = codec
+    return previous
+
+
 # ---------------------------------------------------------------------------
 # Undo / Redo stack
 # ---------------------------------------------------------------------------
 
 class UndoRedoStack:
-    """Stack con indice corrente."""
+    """Stack con indice corrente.
+
+    Internamente gli stati sono :class:`~template_builder.model.Recipe`
+    (valori immutabili): push di un ``Recipe`` è una copia superficiale e
+    gli stati condividono i valori non modificati, quindi sono anche la
+    forma più compatta in memoria.  ``undo``/``redo`` restituiscono un dict
+    semplice con liste e dict JSON-native, modificabile dal chiamante.
+    """
 
     def __init__(self) -> None:
-        self._stack: List[Dict[str, Any]] = []
+        self._stack: List[Recipe] = []
         self._idx: int = -1
 
-    def push(self, state: Dict[str, Any]) -> None:
+    def push(self, state: Mapping[str, Any]) -> None:
         if self._idx < len(self._stack) - 1:
             self._stack = self._stack[: self._idx + 1]
-        self._stack.append(json.loads(json.dumps(state)))
+        self._stack.append(Recipe.from_dict(state))
         self._idx += 1
 
     def undo(self) -> Optional[Dict[str, Any]]:
         if self._idx > 0:
             self._idx -= 1
-            return json.loads(json.dumps(self._stack[self._idx]))
+            return self._stack[self._idx].to_dict()
         return None
 
     def redo(self) -> Optional[Dict[str, Any]]:
         if self._idx < len(self._stack) - 1:
             self._idx += 1
-            return json.loads(json.dumps(self._stack[self._idx]))
+            return self._stack[self._idx].to_dict()
         return None
 
 # ---------------------------------------------------------------------------
 # File helpers
 # ---------------------------------------------------------------------------
 
-def _timestamp() -> str:
+def timestamp() -> str:
+    """Marca temporale usata nei nomi dei file (``YYYYmmdd-HHMMSS``)."""
     return time.strftime("%Y%m%d-%H%M%S")
 
 
 def _migrate_v1_to_v2(old: Dict[str, Any]) -> Dict[str, Any]:
     """Porta un JSON v1 al nuovo schema v2 (aggiunge STEPS e ALT)."""
-    from template_builder.step_image import bind_steps
-    texts  = [old.get(f"STEP{i}", "") for i in range(1, 10)]
+    from template_builder.step_image import bind_steps, step_count
+    texts  = [old.get(f"STEP{i}", "") for i in range(1, step_count(old) + 1)]
     images = old.get("IMAGES_STEP", [])
     steps  = bind_steps(texts, images)
     old["STEPS"] = [s.to_dict() for s in steps]
@@ -89,35 +360,85 @@ def _migrate_v1_to_v2(old: Dict[str, Any]) -> Dict[str, Any]:
     return old
 
 
-def load_recipe(path: os.PathLike | str) -> Dict[str, Any]:
-    path = Path(path)
-    with path.open("r", encoding="utf-8") as fh:
-        data = json.load(fh)
-    # v2: oggetto con chiave schema
-    if isinstance(data, dict) and data.get("schema") == SCHEMA_VERSION:
+def recipe_schema(data: Any) -> Optional[int]:
+    """Versione dello schema di un JSON ricetta già decodificato.
+
+    ``2`` = v2, ``1`` = v1 (``{"data": …}``) o batch-1 (dizionario piatto),
+    ``None`` = non è una ricetta.
+    """
+    if not isinstance(data, dict):
+        return None
+    if data.get("schema") == SCHEMA_VERSION and isinstance(data.get("data"), dict):
+        return SCHEMA_VERSION
+    if "schema" in data:
+        return None
+    if "data" in data:
+        return 1 if isinstance(data["data"], dict) else None
+    return 1
+
+
+def _upgrade(data: Any) -> Dict[str, Any]:
+    """Dati della ricetta (migrati a v2 se necessario) da un JSON decodificato."""
+    version = recipe_schema(data)
+    if version == SCHEMA_VERSION:
         return data["data"]
     # v1 legacy → migrazione
-    if isinstance(data, dict) and "data" in data:
-        migrated = _migrate_v1_to_v2(data["data"])
-        return migrated
+    if version == 1 and "data" in data:
+        return _migrate_v1_to_v2(data["data"])
     # fallback: formato batch-1 puro
-    if isinstance(data, dict):
+    if version == 1:
         return _migrate_v1_to_v2(data)
     raise ValueError("Recipe JSON non riconosciuto")
 
 
-def quick_save(state: Dict[str, Any]) -> Path:
+def load_recipe(path: os.PathLike | str) -> Dict[str, Any]:
+    """Dati della ricetta in *path* (migrati a v2 se serve), come dict JSON-native."""
+    path = Path(path)
+    try:
+        raw = path.read_bytes()
+    except FileNotFoundError:
+        # istantanea compattata dalla retention: si legge dall'archivio
+        from .history import read_packed
+        try:
+            raw = read_packed(path)
+        except (KeyError, AttributeError) as exc:   # indice e archivio incoerenti
+            raise FileNotFoundError(path) from exc
+    return _upgrade(_codec.loads(raw))
+
+
+def quick_save(state: Mapping[str, Any], *, fsync: str = "file", lock: bool = True) -> Path:
+    """Salva *state* nella storia; più salvataggi nello stesso secondo
+    (anche da processi diversi) ottengono file distinti."""
     _HISTORY_DIR.mkdir(parents=True, exist_ok=True)
-    target = _HISTORY_DIR / f"recipe_{_timestamp()}.json"
     payload = {
-        "created": _timestamp(),
+        "created": timestamp(),
         "schema":  SCHEMA_VERSION,
-        "data":    state,
+        "data":    state.to_dict() if isinstance(state, Recipe) else state,
     }
-    with target.open("w", encoding="utf-8") as fh:
-        json.dump(payload, fh, ensure_ascii=False, indent=2)
+    data = _codec.dumps(payload, pretty=True)
+    target = write_unique(_HISTORY_DIR, f"recipe_{timestamp()}", ".json", data,
+                           fsync=fsync, lock=lock)
+    for hook in list(_SAVE_HOOKS):
+        try:
+            hook(target, state)
+        except Exception:
+            pass  # un hook (es. indice di ricerca) non deve far fallire il salvataggio
     return target
 
+
+_SAVE_HOOKS: List[Any] = []
+
+
+def register_save_hook(hook: Any) -> None:
+    """``hook(path, state)`` viene chiamato dopo ogni ``quick_save`` riuscito."""
+    if hook not in _SAVE_HOOKS:
+        _SAVE_HOOKS.append(hook)
+
+
+def unregister_save_hook(hook: Any) -> None:
+    if hook in _SAVE_HOOKS:
+        _SAVE_HOOKS.remove(hook)
+
 # ---------------------------------------------------------------------------
 # HTML export (lazy import)
 # ---------------------------------------------------------------------------
@@ -129,19 +450,159 @@ def _ensure_jinja2() -> None:
         )
 
 
+# Estensioni Jinja2 caricate in ogni Environment (anche per il solo parsing
+# nel catalogo): ``{% cache %}`` per i frammenti riusabili.
+TEMPLATE_EXTENSIONS = ("template_builder.fragments.FragmentCacheExtension",)
+
+_ENVIRONMENTS: Dict[str, Any] = {}
+_ENV_LOCK = threading.Lock()
+
+
+def get_environment(folder: os.PathLike | str) -> Any:
+    """Environment Jinja2 condiviso per la cartella *folder* (uno per cartella).
+
+    L'Environment mantiene la cache dei template compilati: con
+    ``auto_reload`` un file modificato viene ricompilato al primo uso.
+    I frammenti ``{% cache %}`` sono in ``env.fragment_store``; i filtri del
+    progetto (:mod:`template_builder.filters`) sono installati qui.
+    """
+    _ensure_jinja2()
+    key = str(Path(folder).resolve())
+    with _ENV_LOCK:
+        env = _ENVIRONMENTS.get(key)
+        if env is None:
+            env = _ENVIRONMENTS[key] = Environment(
+                loader=FileSystemLoader(key),
+                autoescape=select_autoescape(["html", "htm"]),
+                auto_reload=True,
+                cache_size=1000,
+                extensions=list(TEMPLATE_EXTENSIONS),
+            )
+            from ..filters import install_filters
+            install_filters(env)
+        return env
+
+
+def compile_template(template_path: os.PathLike | str) -> Any:
+    """Template compilato (dalla cache dell'Environment della sua cartella)."""
+    template_path = Path(template_path)
+    return get_environment(template_path.parent).get_template(template_path.name)
+
+
+def invalidate_template(template_path: os.PathLike | str) -> None:
+    """Rimuove dalla cache il solo template *template_path*."""
+    template_path = Path(template_path)
+    key = str(template_path.parent.resolve())
+    with _ENV_LOCK:
+        env = _ENVIRONMENTS.get(key)
+    if env is None or env.cache is None:
+        return
+    for cache_key in list(env.cache.keys()):
+        if cache_key[1] == template_path.name:
+            try:
+                del env.cache[cache_key]
+            except KeyError:
+                pass
+
+
 def export_html(ctx: Dict[str, Any], template_path: os.PathLike, **env_kw) -> str:
     """Renderizza html via Jinja2 se disponibile, altrimenti solleva errore."""
     _ensure_jinja2()
-    template_path = Path(template_path)
-    env = Environment(
-        loader=FileSystemLoader(str(template_path.parent)),
-        autoescape=select_autoescape(["html", "htm"]),
-    )
-    tpl = env.get_template(template_path.name)  # type: ignore[arg-type]
+    tpl = compile_template(template_path)
     html_str = tpl.render(**ctx)
 
     save_to: Path | None = env_kw.get("save_to")  # type: ignore[arg-type]
     if save_to:
-        save_to = Path(save_to)
-        save_to.write_text(html_str, encoding="utf-8")
+        atomic_write(
+            save_to, html_str,
+            fsync=env_kw.get("fsync", "file"), lock=env_kw.get("lock", False),
+        )
     return html_str
+
+
+@dataclass
+class RenderResult:
+    """Esito di un template in :func:`render_many`."""
+
+    template: Path
+    html: str = ""
+    seconds: float = 0.0
+    path: Optional[Path] = None      # file scritto (se richiesto)
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+def _prepare_context(ctx: Mapping[str, Any]) -> Dict[str, Any]:
+    """Contesto di render (dict semplice), calcolato una volta sola."""
+    return ctx.to_dict() if isinstance(ctx, Recipe) else dict(ctx)
+
+
+def _output_names(templates: List[Path]) -> Dict[Path, str]:
+    """Nome del file di output per ogni template (chiave: percorso risolto).
+
+    ``<nome>.html`` se il nome è unico; template omonimi di cartelle diverse
+    diventano ``<cartella>-<nome>.html`` (con ``-2``, ``-3``… se serve
+    ancora).  Il confronto ignora le maiuscole (filesystem case-insensitive).
+    """
+    paths = list(dict.fromkeys(t.resolve() for t in templates))
+    stems: Dict[str, int] = {}
+    for path in paths:
+        stems[path.stem.casefold()] = stems.get(path.stem.casefold(), 0) + 1
+    names: Dict[Path, str] = {}
+    taken: Set[str] = set()
+    for path in paths:
+        base = path.stem if stems[path.stem.casefold()] == 1 else f"{path.parent.name}-{path.stem}"
+        name, n = f"{base}.html", 1
+        while name.casefold() in taken:
+            n += 1
+            name = f"{base}-{n}.html"
+        taken.add(name.casefold())
+        names[path] = name
+    return names
+
+
+def render_many(
+    ctx: Mapping[str, Any],
+    templates: List[os.PathLike | str],
+    *,
+    out_dir: os.PathLike | str | None = None,
+    workers: int = 1,
+    fsync: str = "file",
+) -> List[RenderResult]:
+    """Renderizza lo stesso *ctx* con più template (nell'ordine dato).
+
+    Il contesto è preparato una volta; ogni template viene dalla cache
+    dell'Environment della sua cartella.  Con *out_dir* ogni risultato è
+    scritto in ``out_dir/<nome template>.html``; template omonimi di
+    cartelle diverse non si sovrascrivono (vedi :func:`_output_names`).  ``workers > 1`` usa un
+    pool di thread: il render Jinja è CPU-bound (GIL), quindi conviene
+    soprattutto quando pesano le scritture su disco o il caricamento dei
+    template.  Un template che fallisce non ferma gli altri: l'errore è in
+    :attr:`RenderResult.error`.
+    """
+    _ensure_jinja2()
+    prepared = _prepare_context(ctx)
+    out = Path(out_dir) if out_dir is not None else None
+    names = _output_names([Path(t) for t in templates]) if out is not None else {}
+
+    def run(template: os.PathLike | str) -> RenderResult:
+        result = RenderResult(Path(template))
+        started = time.perf_counter()
+        try:
+            result.html = compile_template(template).render(prepared)
+            if out is not None:
+                name = names[result.template.resolve()]
+                result.path = atomic_write(out / name, result.html, fsync=fsync)
+        except Exception as exc:  # TemplateError, OSError …
+            result.error = f"{type(exc).__name__}: {exc}"
+        result.seconds = time.perf_counter() - started
+        return result
+
+    if workers > 1 and len(templates) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(workers, len(templates))) as pool:
+            return list(pool.map(run, templates))
+    return [run(t) for t in templates]
@@ -0,0 +1,158 @@
+"""template_builder.services.thumbnails
+
+Miniature per le righe dei repeater immagini.
+
+* :func:`load_thumbnail` produce un PNG ridotto di un file locale e lo salva
+  in una *derivative cache* su disco (``~/.template_builder/thumbs``) con
+  chiave ``path + mtime + size + lato``: i caricamenti successivi leggono
+  solo pochi KB.  È pensata per girare in un worker in background.
+* :class:`SizedLRU` è una cache LRU limitata per *peso* (es. byte RGBA di
+  un ``PhotoImage``) oltre che per numero di voci.
+
+Pillow è opzionale: senza Pillow ``load_thumbnail`` restituisce ``None`` e
+le righe restano senza anteprima.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Generic, Hashable, Optional, TypeVar
+
+from .images import Image, is_image_path
+from .storage import atomic_write, data_dir
+
+__all__ = [
+    "THUMB_SIZE",
+    "thumbnail_cache_path",
+    "load_thumbnail",
+    "SizedLRU",
+]
+
+THUMB_SIZE = 48
+
+V = TypeVar("V")
+
+
+# ---------------------------------------------------------------------------
+# Derivative cache su disco
+# ---------------------------------------------------------------------------
+
+def thumbnail_cache_path(
+    src: os.PathLike | str, *, size: int = THUMB_SIZE, cache_dir: Path | None = None
+) -> Optional[Path]:
+    """Path della miniatura in cache per *src* (``None`` se *src* non esiste)."""
+    src = os.path.abspath(os.fspath(src))
+    try:
+        st = os.stat(src)
+    except OSError:
+        return None
+    key = f"{src}|{st.st_mtime_ns}|{st.st_size}|{size}".encode("utf-8", "surrogatepass")
+    digest = hashlib.sha1(key).hexdigest()
+    return (cache_dir or data_dir("thumbs")) / digest[:2] / f"{digest}.png"
+
+
+def load_thumbnail(
+    src: os.PathLike | str, *, size: int = THUMB_SIZE, cache_dir: Path | None = None
+) -> Optional[bytes]:
+    """PNG (bytes) di lato massimo *size* per il file immagine *src*.
+
+    Restituisce ``None`` per URL remoti, file mancanti/non immagine o se
+    Pillow non è installato.  La miniatura viene scritta in cache in modo
+    atomico (file temporaneo + ``os.replace``).
+    """
+    src = os.fspath(src)
+    if "://" in src or not is_image_path(src):
+        return None
+    target = thumbnail_cache_path(src, size=size, cache_dir=cache_dir)
+    if target is None:
+        return None
+    try:
+        return target.read_bytes()
+    except OSError:
+        pass
+    if Image is None:
+        return None
+    try:
+        with Image.open(src) as img:  # type: ignore[union-attr]
+            img.draft("RGB", (size, size))     # decodifica ridotta per i JPEG
+            img.thumbnail((size, size))
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA")
+            buf = io.BytesIO()
+            img.save(buf, format="PNG")
+    except Exception:
+        return None
+    data = buf.getvalue()
+    try:
+        atomic_write(target, data, fsync="none")
+    except OSError:
+        pass  # cache non scrivibile: la miniatura resta valida in memoria
+    return data
+
+
+# ---------------------------------------------------------------------------
+# LRU limitata per peso
+# ---------------------------------------------------------------------------
+
+class SizedLRU(Generic[V]):
+    """Cache LRU con tetto sul peso totale (``max_weight``) e sul numero voci.
+
+    *weigher* calcola il peso di un valore (default: 1 per voce).  Un valore
+    più pesante dell'intero tetto non viene memorizzato.
+    """
+
+    def __init__(
+        self,
+        max_weight: int,
+        *,
+        max_entries: int | None = None,
+        weigher: Callable[[V], int] | None = None,
+    ) -> None:
+        self.max_weight = max(1, int(max_weight))
+        self.max_entries = max_entries
+        self._weigher = weigher or (lambda _v: 1)
+        self._data: "OrderedDict[Hashable, tuple[V, int]]" = OrderedDict()
+        self.weight = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        hit = self._data.get(key)
+        if hit is None:
+            return default
+        self._data.move_to_end(key)
+        return hit[0]
+
+    def put(self, key: Hashable, value: V) -> bool:
+        """Inserisce *value*; restituisce False se troppo pesante per la cache."""
+        w = max(0, int(self._weigher(value)))
+        self.pop(key)
+        if w > self.max_weight:
+            return False
+        self._data[key] = (value, w)
+        self.weight += w
+        while self._data and (
+            self.weight > self.max_weight
+            or (self.max_entries is not None and len(self._data) > self.max_entries)
+        ):
+            _, (_, old_w) = self._data.popitem(last=False)
+            self.weight -= old_w
+        return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        hit = self._data.pop(key, None)
+        if hit is None:
+            return default
+        self.weight -= hit[1]
+        return hit[0]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.weight = 0
@@ -0,0 +1,266 @@
+"""template_builder.services.validation
+
+Validazione *asincrona* di URL / path immagine.
+
+Il validator sincrono :func:`template_builder.services.images.validate_url`
+resta disponibile, ma chiamato dal main-thread Tk blocca la UI non appena il
+controllo diventa reale (HEAD HTTP, ``stat`` su filesystem).  Questo modulo
+fornisce :class:`ImageUrlValidator`, che esegue i controlli su un
+thread-pool e ne memorizza l'esito:
+
+* cache per-URL con TTL distinti per esiti positivi e negativi;
+* richieste identiche in corso condividono lo stesso ``Future``;
+* connessioni HTTP keep-alive riutilizzate (una per host e per worker);
+* limite di concorrenza globale (``max_workers``) e per host.
+
+Nessun thread viene avviato all'import: il pool nasce al primo ``submit``.
+"""
+from __future__ import annotations
+
+import http.client
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, NamedTuple, Optional
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
+
+from ..infrastructure.validators import ImageValidationError
+from .images import validate_url
+
+__all__ = [
+    "ValidationResult",
+    "ImageUrlValidator",
+    "get_default_validator",
+]
+
+
+class ValidationResult(NamedTuple):
+    """Esito di una validazione: ``ok`` + motivo leggibile in caso di errore."""
+
+    ok: bool
+    reason: str = ""
+
+
+# ---------------------------------------------------------------------------
+# Validator
+# ---------------------------------------------------------------------------
+
+class ImageUrlValidator:
+    """Valida URL ``http(s)://`` e path locali su un pool di thread.
+
+    Parametri
+    ---------
+    max_workers:
+        Numero massimo di validazioni concorrenti.
+    max_per_host:
+        Numero massimo di richieste HTTP simultanee verso lo stesso host.
+    ttl / negative_ttl:
+        Durata (secondi) in cache di esiti positivi / negativi.
+    timeout:
+        Timeout socket per le richieste HTTP.
+    max_entries:
+        Dimensione massima della cache (LRU).
+    clock:
+        Sorgente del tempo monotono (iniettabile nei test).
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: int = 4,
+        max_per_host: int = 2,
+        ttl: float = 300.0,
+        negative_ttl: float = 30.0,
+        timeout: float = 5.0,
+        max_entries: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_workers = max(1, int(max_workers))
+        self.max_per_host = max(1, int(max_per_host))
+        self.ttl = float(ttl)
+        self.negative_ttl = float(negative_ttl)
+        self.timeout = float(timeout)
+        self.max_entries = max(1, int(max_entries))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, tuple[float, ValidationResult]]" = OrderedDict()
+        self._pending: Dict[str, Future] = {}
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._local = threading.local()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    # ------------------------------------------------------------------ cache
+    def cached(self, url: str) -> Optional[ValidationResult]:
+        """Esito in cache per *url* (``None`` se assente o scaduto)."""
+        with self._lock:
+            hit = self._cache.get(url)
+            if hit is None:
+                return None
+            expires, result = hit
+            if expires <= self._clock():
+                del self._cache[url]
+                return None
+            self._cache.move_to_end(url)
+            return result
+
+    def invalidate(self, url: Optional[str] = None) -> None:
+        """Rimuove *url* dalla cache (o l'intera cache se ``None``)."""
+        with self._lock:
+            if url is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(url, None)
+
+    def _store(self, url: str, result: ValidationResult) -> None:
+        ttl = self.ttl if result.ok else self.negative_ttl
+        with self._lock:
+            self._cache[url] = (self._clock() + ttl, result)
+            self._cache.move_to_end(url)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    # ------------------------------------------------------------------ API
+    def check(self, url: str) -> ValidationResult:
+        """Validazione *sincrona* con cache (usata dai worker e dai test)."""
+        url = (url or "").strip()
+        result = self.cached(url)
+        if result is None:
+            result = self._check_uncached(url)
+            self._store(url, result)
+        return result
+
+    def submit(self, url: str) -> "Future[ValidationResult]":
+        """Accoda la validazione di *url* e restituisce un ``Future``.
+
+        Su cache-hit il ``Future`` è già completato; richieste concorrenti
+        per lo stesso URL condividono un'unica validazione.
+        """
+        url = (url or "").strip()
+        result = self.cached(url)
+        if result is not None:
+            done: Future = Future()
+            done.set_result(result)
+            return done
+        with self._lock:
+            fut = self._pending.get(url)
+            if fut is not None:
+                return fut
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="img-validate",
+                )
+            fut = self._executor.submit(self.check, url)
+            self._pending[url] = fut
+        fut.add_done_callback(lambda _f, u=url: self._forget(u))
+        return fut
+
+    def _forget(self, url: str) -> None:
+        with self._lock:
+            self._pending.pop(url, None)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Ferma il pool e chiude le connessioni del thread corrente."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+        for conn in getattr(self._local, "conns", {}).values():
+            conn.close()
+
+    # ------------------------------------------------------------------ checks
+    def _check_uncached(self, url: str) -> ValidationResult:
+        try:
+            validate_url(url)
+        except ImageValidationError as exc:
+            return ValidationResult(False, str(exc))
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme in ("http", "https"):
+            return self._check_http(scheme, parts.netloc, parts)
+        if scheme == "file":
+            return self._check_file(url2pathname(parts.path))
+        if scheme == "data":
+            ok = url[5:].lower().startswith("image/")
+            return ValidationResult(ok, "" if ok else "Data URI non immagine")
+        return self._check_file(os.path.expanduser(url))
+
+    @staticmethod
+    def _check_file(path: str) -> ValidationResult:
+        try:
+            st = os.stat(path)
+        except OSError as exc:
+            return ValidationResult(False, f"File non trovato: {exc.strerror or exc}")
+        if not os.path.isfile(path):
+            return ValidationResult(False, "Il path non è un file")
+        if st.st_size == 0:
+            return ValidationResult(False, "File vuoto")
+        return ValidationResult(True)
+
+    def _host_slot(self, netloc: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            slot = self._host_slots.get(netloc)
+            if slot is None:
+                slot = self._host_slots[netloc] = threading.BoundedSemaphore(self.max_per_host)
+            return slot
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get((scheme, netloc))
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = conns[(scheme, netloc)] = cls(netloc, timeout=self.timeout)
+        return conn
+
+    def _drop_connection(self, scheme: str, netloc: str) -> None:
+        conn = getattr(self._local, "conns", {}).pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def _check_http(self, scheme: str, netloc: str, parts) -> ValidationResult:
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        with self._host_slot(netloc):
+            # un secondo tentativo copre le connessioni keep-alive chiuse dal server
+            for attempt in (1, 2):
+                conn = self._connection(scheme, netloc)
+                try:
+                    conn.request("HEAD", target, headers={"User-Agent": "template-builder"})
+                    resp = conn.getresponse()
+                    resp.read()
+                    status, ctype = resp.status, resp.getheader("Content-Type", "")
+                    if resp.will_close:
+                        self._drop_connection(scheme, netloc)
+                    break
+                except (http.client.HTTPException, OSError) as exc:
+                    self._drop_connection(scheme, netloc)
+                    if attempt == 2:
+                        return ValidationResult(False, f"Errore di rete: {exc}")
+        if status >= 400:
+            return ValidationResult(False, f"HTTP {status}")
+        if ctype and not ctype.lower().startswith("image/"):
+            return ValidationResult(False, f"Contenuto non immagine ({ctype})")
+        return ValidationResult(True)
+
+
+# ---------------------------------------------------------------------------
+# Istanza condivisa
+# ---------------------------------------------------------------------------
+
+_DEFAULT: Optional[ImageUrlValidator] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_default_validator() -> ImageUrlValidator:
+    """Validator condiviso da tutti i widget (creato al primo utilizzo)."""
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        if _DEFAULT is None:
+            _DEFAULT = ImageUrlValidator()
+        return _DEFAULT
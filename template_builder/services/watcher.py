@@ -0,0 +1,140 @@
+"""template_builder.services.watcher
+
+Rilevamento delle modifiche ai template mentre la GUI è aperta.
+
+:class:`TemplateWatcher` è pensato per essere interrogato periodicamente dal
+main-loop Tk (``after``): ``poll()`` non blocca mai.  Su Linux usa
+``inotify`` (via ``ctypes``, nessuna dipendenza esterna) e legge solo gli
+eventi accumulati; altrove, o se inotify non è disponibile, ripiega sul
+polling a ``stat`` del :class:`~template_builder.services.catalog.TemplateCatalog`.
+
+Per ogni template cambiato aggiorna la voce del catalogo e ricompila solo
+quel template, e quelli che lo includono/estendono, nella cache
+dell'Environment Jinja2.
+"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import List, Optional, Set
+
+from . import storage
+from .catalog import TemplateCatalog
+
+__all__ = ["TemplateWatcher"]
+
+# costanti da <sys/inotify.h>
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT_HDR = struct.Struct("iIII")
+
+
+def _inotify_open(folder: Path) -> Optional[int]:
+    """File descriptor inotify non bloccante su *folder* (``None`` se assente)."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            return None
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE | _IN_MODIFY
+        if libc.inotify_add_watch(fd, os.fsencode(str(folder)), mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+class TemplateWatcher:
+    """Osserva la cartella di un :class:`TemplateCatalog`.
+
+    Parametri
+    ---------
+    catalog:
+        Catalogo da mantenere aggiornato.
+    use_inotify:
+        ``False`` forza il polling a ``stat`` (utile nei test).
+    """
+
+    def __init__(self, catalog: TemplateCatalog, *, use_inotify: bool = True) -> None:
+        self.catalog = catalog
+        self.folder = catalog.folder
+        self._fd = _inotify_open(self.folder) if use_inotify else None
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._fd is not None
+
+    def _drain_events(self) -> Optional[Set[str]]:
+        """Nomi toccati secondo inotify; ``None`` se serve una scansione completa."""
+        names: Set[str] = set()
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)  # type: ignore[arg-type]
+            except BlockingIOError:
+                return names
+            except OSError:
+                return None
+            if not buf:
+                return names
+            offset = 0
+            while offset + _EVENT_HDR.size <= len(buf):
+                _wd, mask, _cookie, length = _EVENT_HDR.unpack_from(buf, offset)
+                offset += _EVENT_HDR.size
+                name = buf[offset:offset + length].rstrip(b"\0").decode("utf-8", "replace")
+                offset += length
+                if mask & _IN_Q_OVERFLOW:
+                    return None
+                if name.endswith(".html"):
+                    names.add(name)
+
+    def poll(self) -> List[str]:
+        """Template aggiunti, modificati o rimossi dall'ultima chiamata,
+        più quelli che ne dipendono (vedi :meth:`TemplateCatalog.affected`).
+
+        I template modificati vengono ricompilati subito (se Jinja2 è
+        installato), così il rendering successivo non paga la compilazione.
+        """
+        if self._fd is not None:
+            touched = self._drain_events()
+            if touched is None:
+                changed = self.catalog.refresh()
+            else:
+                changed = sorted(n for n in touched if self.catalog.refresh_one(n))
+        else:
+            changed = self.catalog.refresh()
+        if changed:
+            changed = self.catalog.affected(changed)
+        for name in changed:
+            path = self.folder / name
+            storage.invalidate_template(path)
+            if name in self.catalog and storage.Environment is not None:
+                try:
+                    storage.compile_template(path)
+                except Exception:
+                    pass  # errore di sintassi: riportato da catalog.compile_status
+        return changed
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __del__(self) -> None:  # pragma: no cover – best effort
+        try:
+            self.close()
+        except Exception:
+            pass
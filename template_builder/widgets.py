@@ -6,12 +6,17 @@ PlaceholderMultiTextField, MultiTextField alias, and SortableImageRepeaterField
 """
 from __future__ import annotations
 import os
+import re
 import tkinter as tk
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, filedialog, TclError
-from typing import Any, Callable, List, Sequence, Optional
+from typing import Any, Callable, Collection, Deque, Dict, List, Sequence, Optional
 
 from .services import text as text_service
 from .services import images as image_service
+from .services import thumbnails as thumb_service
+from .services.validation import get_default_validator
 
 # ──────────────── Drag & Drop opzionale ─────────────────────────
 try:
@@ -70,31 +75,89 @@ def _apply_border(widget: tk.Widget, ok: bool) -> None:
     except TclError:
         pass
 
+# ──────────────── Background worker pool ─────────────────────────
+_BG_POOL: Optional[ThreadPoolExecutor] = None
+
+def _background_pool() -> ThreadPoolExecutor:
+    """Shared worker pool for I/O off the Tk thread (created on first use)."""
+    global _BG_POOL
+    if _BG_POOL is None:
+        _BG_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tb-bg")
+    return _BG_POOL
+
+# ──────────────── Thumbnail cache (PhotoImage) ───────────────────
+_THUMB_CACHE_BYTES = 32 * 1024 * 1024      # RGBA bytes held by cached PhotoImages
+_THUMB_CACHE: Optional[thumb_service.SizedLRU] = None
+
+def _thumb_cache() -> thumb_service.SizedLRU:
+    """Process-wide LRU of decoded thumbnails, bounded by pixel memory."""
+    global _THUMB_CACHE
+    if _THUMB_CACHE is None:
+        _THUMB_CACHE = thumb_service.SizedLRU(
+            _THUMB_CACHE_BYTES, weigher=lambda img: img.width() * img.height() * 4
+        )
+    return _THUMB_CACHE
+
 # ──────────────── PlaceholderEntry ────────────────────────────────
 class PlaceholderEntry(tk.Entry):
-    """Entry with ghost-text and get_value(), render_html()"""
-    def __init__(self, master: tk.Misc, placeholder: str = "", **kw: Any) -> None:
-        super().__init__(master, **kw)
+    """Entry with ghost-text and get_value(), render_html().
+    on_change() fires on every user edit (typing, paste, drop, insert()),
+    tracked through the entry variable; set_value() and ghost-text do not."""
+    def __init__(
+        self, master: tk.Misc, placeholder: str = "",
+        on_change: Optional[Callable[[], None]] = None, **kw: Any,
+    ) -> None:
+        self._var = kw.pop("textvariable", None) or tk.StringVar(master=master)
+        super().__init__(master, textvariable=self._var, **kw)
         self.placeholder = placeholder
+        self.on_change = on_change
         self.default_fg = self.cget("foreground") or "black"
         self._has_placeholder = False
+        self._silent = False
         self.bind("<FocusIn>", self._clear_placeholder)
         self.bind("<FocusOut>", self._add_placeholder)
         self._add_placeholder()
+        self._var.trace_add("write", self._on_write)
         _attach_tooltip(self, text_service.get_field_help(placeholder) or placeholder)
+    def _on_write(self, *_: Any) -> None:
+        if not (self._silent or self._has_placeholder) and self.on_change:
+            self.on_change()
     def _add_placeholder(self, *_: Any) -> None:
         if not self.get():
-            self.insert(0, self.placeholder)
+            self._silent = True
+            try:
+                self.insert(0, self.placeholder)
+            finally:
+                self._silent = False
             self.configure(foreground="grey")
             self._has_placeholder = True
     def _clear_placeholder(self, *_: Any) -> None:
         if self._has_placeholder:
-            self.delete(0, tk.END)
+            self._silent = True
+            try:
+                self.delete(0, tk.END)
+            finally:
+                self._silent = False
             self.configure(foreground=self.default_fg)
             self._has_placeholder = False
     def get_value(self) -> str:
         """Return actual text or empty if placeholder"""
         return "" if self._has_placeholder else self.get().strip()
+    def set_value(self, value: str, placeholder: Optional[str] = None) -> None:
+        """Replace content (and optionally the ghost-text) without firing on_change"""
+        if placeholder is not None:
+            self.placeholder = placeholder
+        self._silent = True
+        try:
+            self.delete(0, tk.END)
+            self._has_placeholder = False
+            if value:
+                self.insert(0, value)
+                self.configure(foreground=self.default_fg)
+            else:
+                self._add_placeholder()
+        finally:
+            self._silent = False
     def render_html(self) -> str:
         """Format text for HTML (paragraphs)"""
         return text_service.auto_format(self.get_value(), mode="p")
@@ -125,11 +188,53 @@ class PlaceholderSpinbox(tk.Spinbox):
         """Return actual value or empty if placeholder"""
         return "" if self._has_placeholder else self.get().strip()
 
+# ───────────── virtual scrolling ───────────────────────────────
+class _VirtualScroll:
+    """
+    Row-granular scrolling for widgets that show `visible_rows` recycled
+    slots over a model list. Hosts provide self._rows, self._top,
+    self.visible_rows, self._vsb and _sync_view().
+    """
+    def _update_scrollbar(self) -> None:
+        n = len(self._rows)
+        if n <= self.visible_rows:
+            self._vsb.pack_forget()
+            return
+        self._vsb.pack(side="right", fill="y")
+        self._vsb.set(self._top / n, (self._top + self.visible_rows) / n)
+    def _scroll_to(self, top: int) -> None:
+        top = max(0, min(top, len(self._rows) - self.visible_rows))
+        if top != self._top:
+            self._top = top
+            self._sync_view()
+    def yview(self, *args: Any) -> None:
+        """Scrollbar protocol: ('moveto', fraction) | ('scroll', n, 'units'|'pages')."""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self._scroll_to(round(float(args[1]) * len(self._rows)))
+        elif args[0] == "scroll":
+            step = self.visible_rows if args[2] == "pages" else 1
+            self._scroll_to(self._top + int(args[1]) * step)
+    def yview_scroll(self, number: int, what: str = "units") -> None:
+        self.yview("scroll", number, what)
+    def _on_wheel(self, event: tk.Event) -> str:
+        if getattr(event, "num", None) == 4:
+            delta = -1
+        elif getattr(event, "num", None) == 5:
+            delta = 1
+        else:
+            delta = -1 if getattr(event, "delta", 0) > 0 else 1
+        self.yview_scroll(delta)
+        return "break"
+
 # ───────────── PlaceholderMultiTextField ────────────────────────
 class PlaceholderMultiTextField(ttk.Frame):
     """
     Multi-line Text with placeholder, smart-paste, render_html().
     Sig: (master, placeholder, mode, on_change)
+    on_change() fires on every content change (typing, paste, drop, insert()),
+    detected with <<Modified>>; set_value() and ghost-text do not fire it.
     """
     def __init__(
         self, master: tk.Misc,
@@ -143,6 +248,7 @@ class PlaceholderMultiTextField(ttk.Frame):
         self.mode = mode
         self.on_change = on_change
         self._has_placeholder = False
+        self._silent = False
         self.text = tk.Text(self, wrap="word", height=5)
         self.scroll = ttk.Scrollbar(self, command=self.text.yview)
         self.text.configure(yscrollcommand=self.scroll.set)
@@ -150,18 +256,33 @@ class PlaceholderMultiTextField(ttk.Frame):
         self.scroll.pack(side="right", fill="y")
         self.text.bind("<FocusIn>", self._clear_placeholder, add="+")
         self.text.bind("<FocusOut>", self._add_placeholder, add="+")
-        self.text.bind("<KeyRelease>", lambda e: self.on_change() if self.on_change else None, add="+")
+        self.text.bind("<<Modified>>", self._on_modified, add="+")
         self.text.bind("<Control-v>", self._on_paste, add="+")
         self.text.bind("<Command-v>", self._on_paste, add="+")
         self._add_placeholder()
+    def _on_modified(self, *_: Any) -> None:
+        # <<Modified>> fires when the flag goes up: clear it to hear the next edit
+        if not self.text.edit_modified():
+            return
+        self.text.edit_modified(False)
+        if not (self._silent or self._has_placeholder) and self.on_change:
+            self.on_change()
+    def _quiet_edit(self, edit: Callable[[], None]) -> None:
+        """Run a programmatic edit without reporting it through on_change."""
+        self._silent = True
+        try:
+            edit()
+            self.text.edit_modified(False)   # <<Modified>> may be delivered later
+        finally:
+            self._silent = False
     def _add_placeholder(self, *_: Any) -> None:
         if not self.text.get("1.0", tk.END).strip():
-            self.text.insert("1.0", self.placeholder)
+            self._quiet_edit(lambda: self.text.insert("1.0", self.placeholder))
             self.text.configure(foreground="grey")
             self._has_placeholder = True
     def _clear_placeholder(self, *_: Any) -> None:
         if self._has_placeholder:
-            self.text.delete("1.0", tk.END)
+            self._quiet_edit(lambda: self.text.delete("1.0", tk.END))
             self.text.configure(foreground="black")
             self._has_placeholder = False
     def _on_paste(self, event: tk.Event) -> str:
@@ -178,6 +299,17 @@ class PlaceholderMultiTextField(ttk.Frame):
     def get_raw(self) -> str:
         """Return raw text or empty if placeholder"""
         return "" if self._has_placeholder else self.text.get("1.0", tk.END).strip()
+    def set_value(self, value: str, placeholder: Optional[str] = None) -> None:
+        """Replace content (and optionally ghost-text) without firing on_change"""
+        if placeholder is not None:
+            self.placeholder = placeholder
+        self._quiet_edit(lambda: self.text.delete("1.0", tk.END))
+        self._has_placeholder = False
+        if value:
+            self._quiet_edit(lambda: self.text.insert("1.0", value))
+            self.text.configure(foreground="black")
+        else:
+            self._add_placeholder()
     def render_html(self) -> str:
         """Format raw text into HTML (ul/p)"""
         return text_service.auto_format(self.get_raw(), mode=self.mode)
@@ -185,18 +317,196 @@ class PlaceholderMultiTextField(ttk.Frame):
 # Alias legacy
 MultiTextField = PlaceholderMultiTextField
 
+# ───────────── VirtualFieldPanel ────────────────────────────────
+class _FieldSlot:
+    """Recycled label + text field bound to one key at a time."""
+    __slots__ = ("frame", "label", "field", "index")
+    def __init__(self, frame: ttk.Frame, label: ttk.Label, field: PlaceholderMultiTextField) -> None:
+        self.frame = frame
+        self.label = label
+        self.field = field
+        self.index = -1
+
+class VirtualFieldPanel(_VirtualScroll, ttk.Frame):
+    """
+    Scrollable list of PlaceholderMultiTextField rows, one per key.
+    Values live in *model* (get/set/mode_of, e.g. FieldModel); only the rows
+    in the viewport have widgets, rebound while scrolling, so build time and
+    memory do not grow with the number of placeholders.
+      - set_keys(keys) / refresh()
+      - on_change() fires after an edit has been stored in the model
+    """
+    def __init__(
+        self, master: tk.Misc,
+        model: Any,
+        on_change: Optional[Callable[[], None]] = None,
+        visible_rows: int = 6,
+        **kw: Any,
+    ) -> None:
+        super().__init__(master, **kw)
+        self.model = model
+        self.on_change = on_change
+        self._rows: List[str] = []
+        self._slots: List[_FieldSlot] = []
+        self._top = 0
+        self.visible_rows = max(1, int(visible_rows))
+        self._resize_job: Optional[str] = None
+        self._resize_height = 0
+        self._fit_height: Optional[int] = None
+        self._body = ttk.Frame(self)
+        self._body.pack(fill="both", expand=True)
+        self._viewport = ttk.Frame(self._body)
+        self._viewport.pack(side="left", fill="both", expand=True)
+        self._vsb = ttk.Scrollbar(self._body, orient="vertical", command=self.yview)
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self._body.bind(seq, self._on_wheel, add="+")
+        self.bind("<Configure>", self._on_resize, add="+")
+    # ───── model ─────
+    def set_keys(self, keys: Sequence[str]) -> None:
+        """Show *keys* (in order); slots are reused, values come from the model."""
+        self._rows = list(keys)
+        self._sync_view(start=0)
+    def keys(self) -> List[str]:
+        return list(self._rows)
+    def refresh(self, keys: Optional[Collection[str]] = None) -> None:
+        """Rebind visible rows after the model was changed from outside
+        (only those showing *keys*, if given)."""
+        if keys is None:
+            self._sync_view(start=0)
+            return
+        for slot in self._slots:
+            if 0 <= slot.index < len(self._rows) and self._rows[slot.index] in keys:
+                self._bind_slot(slot, slot.index)
+    def get_field(self, key: str) -> Optional[PlaceholderMultiTextField]:
+        """Widget currently showing *key* (None if scrolled out of view)."""
+        for slot in self._slots:
+            if 0 <= slot.index < len(self._rows) and self._rows[slot.index] == key:
+                return slot.field
+        return None
+    # ───── viewport ─────
+    def _make_slot(self) -> _FieldSlot:
+        frame = ttk.Frame(self._viewport)
+        label = ttk.Label(frame)
+        label.pack(anchor="w", padx=6, pady=2)
+        field = PlaceholderMultiTextField(frame, placeholder="")
+        field.pack(fill="x", padx=6, pady=(0, 4))
+        slot = _FieldSlot(frame, label, field)
+        field.on_change = lambda: self._on_slot_edit(slot)
+        for w in (frame, label, field.text):
+            for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+                w.bind(seq, self._on_wheel, add="+")
+        return slot
+    def _on_slot_edit(self, slot: _FieldSlot) -> None:
+        if 0 <= slot.index < len(self._rows):
+            if self.model.set(self._rows[slot.index], slot.field.get_raw()) and self.on_change:
+                self.on_change()
+    def _bind_slot(self, slot: _FieldSlot, index: int) -> None:
+        key = self._rows[index]
+        slot.index = index
+        slot.label.configure(text=key)
+        slot.field.mode = self.model.mode_of(key)
+        slot.field.set_value(str(self.model.get(key) or ""), placeholder=f"{{{{{key}}}}}")
+    def _sync_view(self, start: Optional[int] = None) -> None:
+        """Same slot management as SortableImageRepeaterField._sync_view."""
+        n = len(self._rows)
+        self._top = max(0, min(self._top, n - self.visible_rows))
+        want = min(self.visible_rows, n)
+        while len(self._slots) < want:
+            self._slots.append(self._make_slot())
+        for slot in self._slots[:want]:
+            if slot.index == -1:
+                slot.frame.pack(fill="x")
+        for slot in self._slots[want:]:
+            if slot.index != -1:
+                slot.frame.pack_forget()
+                slot.index = -1
+        for pos, slot in enumerate(self._slots[:want]):
+            idx = self._top + pos
+            if slot.index != idx or (start is not None and idx >= start):
+                self._bind_slot(slot, idx)
+        self._update_scrollbar()
+    _RESIZE_DEBOUNCE_MS = 50
+    def _on_resize(self, event: tk.Event) -> None:
+        """Fit the number of slots to the height the panel was given.
+        Debounced: repacking slots emits <Configure> events of its own."""
+        self._resize_height = int(event.height)
+        if self._resize_job is None:
+            self._resize_job = self.after(self._RESIZE_DEBOUNCE_MS, self._apply_resize)
+    def _apply_resize(self) -> None:
+        self._resize_job = None
+        if not self._slots:
+            return
+        row_h = self._slots[0].frame.winfo_reqheight()
+        height = self._resize_height
+        # a height within one row of the last fit is the echo of our own
+        # repack: reacting to it is what made the slot count oscillate
+        if row_h <= 1 or (self._fit_height is not None and abs(height - self._fit_height) < row_h):
+            return
+        self._fit_height = height
+        rows = max(1, height // row_h)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self._sync_view()
+
 # ───────────── SortableImageRepeaterField ───────────────────────
-class SortableImageRepeaterField(ttk.Frame):
+class _ImageRow:
+    """Model item of SortableImageRepeaterField (no Tk state)."""
+    __slots__ = ("src", "placeholder")
+    def __init__(self, src: str = "", placeholder: str = "") -> None:
+        self.src = src
+        self.placeholder = placeholder
+
+class _RowSlot:
+    """Recycled row widgets bound to one model index at a time."""
+    __slots__ = ("frame", "thumb", "entry", "index")
+    def __init__(self, frame: ttk.Frame, thumb: tk.Label, entry: PlaceholderEntry) -> None:
+        self.frame = frame
+        self.thumb = thumb
+        self.entry = entry
+        self.index = -1
+
+class SortableImageRepeaterField(_VirtualScroll, ttk.Frame):
     """
     Manages list of image URLs:
-      - _add_row(src: str)
-      - _move_row, _del_row
-      - get_urls() -> List[str]
+      - _add_row(src: str, placeholder: str = "")
+      - _move_row, _del_row (by model index)
+      - get_urls() / set_urls()
       - Optional drag&drop if HAS_DND
+      - Thumbnails for visible rows (decoded in background, LRU-cached)
+    Rows live in a plain list (self._rows); only `visible_rows` slots of
+    widgets exist and are rebound on scroll, so reordering costs O(1) Tk calls.
+    With `on_move(src, dst)` the owner performs moves itself (e.g. the step
+    images, whose texts must follow) and pushes the new order via set_urls().
+    URL validation runs off the Tk thread (services.validation); results are
+    polled back with after() so the UI never blocks on HEAD requests or stat().
     """
-    def __init__(self, master: tk.Misc, **kw: Any) -> None:
+    _VALIDATION_POLL_MS = 50
+    _INGEST_BATCH = 250        # rows queued per idle callback
+    _THUMB_POLL_MS = 50
+    def __init__(self, master: tk.Misc, visible_rows: int = 8,
+                 on_move: Optional[Callable[[int, int], None]] = None, **kw: Any) -> None:
         super().__init__(master, **kw)
-        self._rows: List[ttk.Frame] = []
+        self.on_move = on_move
+        self._rows: List[_ImageRow] = []
+        self._slots: List[_RowSlot] = []
+        self._top = 0
+        self.visible_rows = max(1, int(visible_rows))
+        self._ingest_queue: Deque[str] = deque()
+        self._ingest_total = 0
+        self._ingest_job: Optional[str] = None
+        self._progress_frame: Optional[ttk.Frame] = None
+        self._thumb_jobs: Dict[str, Any] = {}
+        self._thumb_poll: Optional[str] = None
+        self._blank_thumb = tk.PhotoImage(
+            master=self, width=thumb_service.THUMB_SIZE, height=thumb_service.THUMB_SIZE
+        )
+        self._body = ttk.Frame(self)
+        self._body.pack(fill="x")
+        self._viewport = ttk.Frame(self._body)
+        self._viewport.pack(side="left", fill="x", expand=True)
+        self._vsb = ttk.Scrollbar(self._body, orient="vertical", command=self.yview)
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self._body.bind(seq, self._on_wheel, add="+")
         # Optional DnD
         if HAS_DND and DND_FILES:
             try:
@@ -205,64 +515,254 @@ class SortableImageRepeaterField(ttk.Frame):
             except TclError:
                 pass
     def _on_drop(self, event):
-        for p in _split_dnd_event_data(event.data):
-            self._add_row(p)
-    def _add_row(self, src: str = "") -> None:
-        row = ttk.Frame(self)
-        entry = PlaceholderEntry(row, placeholder=src)
-        entry.insert(0, src)
-        entry.pack(side="left", fill="x", expand=True, padx=2)
-        ttk.Button(row, text="↑", width=2, command=lambda: self._move_row(row, -1)).pack(side="left")
-        ttk.Button(row, text="↓", width=2, command=lambda: self._move_row(row, +1)).pack(side="left")
-        ttk.Button(row, text="✕", width=2, command=lambda: self._del_row(row)).pack(side="left")
-        entry.bind("<FocusOut>", lambda e, ent=entry: self._validate(ent), add="+")
-        entry.bind("<KeyRelease>", lambda e, ent=entry: self._debounce_validate(ent), add="+")
-        self._rows.append(row)
-        row.pack(fill="x", pady=2)
-    def _move_row(self, row: ttk.Frame, delta: int) -> None:
-        idx = self._rows.index(row)
+        self.ingest(_split_dnd_event_data(event.data))
+    # ───── bulk ingestion ─────
+    def ingest(self, paths: Sequence[str]) -> int:
+        """
+        Queue *paths* (files, folders or URLs) for batched row creation.
+        Folders are expanded to the image files they contain. Returns the
+        number of queued images.
+        """
+        files = image_service.expand_image_paths(paths)
+        if not files:
+            return 0
+        self._ingest_queue.extend(files)
+        self._ingest_total += len(files)
+        self._show_progress()
+        if self._ingest_job is None:
+            self._ingest_job = self.after_idle(self._ingest_step)
+        return len(files)
+    def _ingest_step(self) -> None:
+        self._ingest_job = None
+        batch = min(self._INGEST_BATCH, len(self._ingest_queue))
+        if batch:
+            popleft = self._ingest_queue.popleft
+            self._rows.extend(_ImageRow(popleft()) for _ in range(batch))
+            self._sync_view()
+        if self._ingest_queue:
+            self._update_progress()
+            self._ingest_job = self.after_idle(self._ingest_step)
+        else:
+            self._hide_progress()
+    def _show_progress(self) -> None:
+        if self._progress_frame is None:
+            self._progress_frame = ttk.Frame(self)
+            self._progress_bar = ttk.Progressbar(self._progress_frame, mode="determinate")
+            self._progress_bar.pack(side="left", fill="x", expand=True, padx=2)
+            self._progress_label = ttk.Label(self._progress_frame, width=14, anchor="e")
+            self._progress_label.pack(side="right")
+        self._progress_frame.pack(fill="x", pady=2)
+        self._update_progress()
+    def _update_progress(self) -> None:
+        if self._progress_frame is None:
+            return
+        done = self._ingest_total - len(self._ingest_queue)
+        self._progress_bar.configure(maximum=max(1, self._ingest_total), value=done)
+        self._progress_label.configure(text=f"{done}/{self._ingest_total}")
+    def _hide_progress(self) -> None:
+        self._ingest_total = 0
+        if self._progress_frame is not None:
+            self._progress_frame.pack_forget()
+    # ───── row model ─────
+    def _add_row(self, src: str = "", placeholder: str = "") -> None:
+        self._rows.append(_ImageRow(src, placeholder))
+        self._sync_view()
+    def _index(self, row: Any) -> int:
+        if isinstance(row, int):
+            return row
+        if isinstance(row, _RowSlot):
+            return row.index
+        return self._rows.index(row)
+    def _move_row(self, row: Any, delta: int) -> None:
+        idx = self._index(row)
         new = idx + delta
-        if 0 <= new < len(self._rows):
+        if 0 <= idx < len(self._rows) and 0 <= new < len(self._rows):
+            if self.on_move is not None:
+                self.on_move(idx, new)
+                return
             self._rows[idx], self._rows[new] = self._rows[new], self._rows[idx]
-            for r in self._rows:
-                r.pack_forget()
-                r.pack(fill="x", pady=2)
-    def _del_row(self, row: ttk.Frame) -> None:
-        row.destroy()
-        self._rows.remove(row)
+            self._refresh_indices((idx, new))
+    def _del_row(self, row: Any) -> None:
+        idx = self._index(row)
+        if 0 <= idx < len(self._rows):
+            del self._rows[idx]
+            self._sync_view(start=idx)
+    def get_urls(self) -> List[str]:
+        return [r.src for r in self._rows]
+    def set_urls(self, urls: Sequence[str]) -> None:
+        """Replace all rows (keeps placeholders of rows that remain)."""
+        old = self._rows
+        self._rows = [
+            _ImageRow(u, old[i].placeholder if i < len(old) else "")
+            for i, u in enumerate(urls)
+        ]
+        self._sync_view(start=0)
+    def set_placeholders(self, placeholders: Sequence[str]) -> None:
+        """
+        Re-seed ghost-text rows (e.g. on template switch) keeping user input:
+        filled rows stay in order and take the placeholders positionally,
+        empty rows are dropped and missing placeholders get new empty rows.
+        """
+        kept = [r for r in self._rows if r.src]
+        for i, row in enumerate(kept):
+            row.placeholder = placeholders[i] if i < len(placeholders) else ""
+        kept.extend(_ImageRow("", ph) for ph in placeholders[len(kept):])
+        self._rows = kept
+        self._sync_view(start=0)
+    # ───── viewport ─────
+    def _make_slot(self) -> _RowSlot:
+        frame = ttk.Frame(self._viewport)
+        thumb = tk.Label(frame, image=self._blank_thumb, borderwidth=0)
+        thumb.pack(side="left", padx=(0, 2))
+        entry = PlaceholderEntry(frame)
+        entry.pack(side="left", fill="x", expand=True, padx=2)
+        slot = _RowSlot(frame, thumb, entry)
+        entry.on_change = lambda: self._on_slot_edit(slot)
+        ttk.Button(frame, text="↑", width=2, command=lambda: self._move_row(slot, -1)).pack(side="left")
+        ttk.Button(frame, text="↓", width=2, command=lambda: self._move_row(slot, +1)).pack(side="left")
+        ttk.Button(frame, text="✕", width=2, command=lambda: self._del_row(slot)).pack(side="left")
+        entry.bind("<FocusOut>", lambda e: self._on_slot_commit(slot), add="+")
+        entry.bind("<Destroy>", lambda e: self._cancel_validation(entry), add="+")
+        for w in (frame, thumb, entry):
+            for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+                w.bind(seq, self._on_wheel, add="+")
+        return slot
+    def _on_slot_edit(self, slot: _RowSlot) -> None:
+        if 0 <= slot.index < len(self._rows):
+            self._rows[slot.index].src = slot.entry.get_value()
+            self._debounce_validate(slot.entry)
+    def _on_slot_commit(self, slot: _RowSlot) -> None:
+        if 0 <= slot.index < len(self._rows):
+            self._rows[slot.index].src = slot.entry.get_value()
+            self._validate(slot.entry)
+            self._show_thumb(slot)
+    def _bind_slot(self, slot: _RowSlot, index: int) -> None:
+        row = self._rows[index]
+        self._cancel_validation(slot.entry)   # pending checks were for the old row
+        slot.index = index
+        slot.entry.set_value(row.src, placeholder=row.placeholder)
+        cached = get_default_validator().cached(row.src) if row.src else None
+        if cached is None:
+            try:
+                slot.entry.configure(highlightthickness=0)
+            except TclError:
+                pass
+        else:
+            _apply_border(slot.entry, ok=cached.ok)
+        self._show_thumb(slot)
+    def _refresh_indices(self, indices: Sequence[int]) -> None:
+        """Rebind only the slots currently showing *indices*."""
+        for idx in indices:
+            pos = idx - self._top
+            if 0 <= pos < len(self._slots):
+                self._bind_slot(self._slots[pos], idx)
+    def _sync_view(self, start: Optional[int] = None) -> None:
+        """
+        Adjust the slot count to the model and rebind slots whose index is
+        >= *start* (default: only newly shown slots).
+        """
+        n = len(self._rows)
+        self._top = max(0, min(self._top, n - self.visible_rows))
+        want = min(self.visible_rows, n)
+        while len(self._slots) < want:
+            self._slots.append(self._make_slot())
+        for slot in self._slots[:want]:
+            if slot.index == -1:  # new or previously hidden (always the tail)
+                slot.frame.pack(fill="x", pady=2)
+        for slot in self._slots[want:]:
+            if slot.index != -1:
+                slot.frame.pack_forget()
+                slot.index = -1
+        for pos, slot in enumerate(self._slots[:want]):
+            idx = self._top + pos
+            if slot.index != idx or (start is not None and idx >= start):
+                self._bind_slot(slot, idx)
+        self._update_scrollbar()
+    # ───── thumbnails ─────
+    def _show_thumb(self, slot: _RowSlot) -> None:
+        """Show the cached thumbnail for the slot's row or queue its decoding."""
+        src = self._rows[slot.index].src if 0 <= slot.index < len(self._rows) else ""
+        photo = _thumb_cache().get(src) if src else None
+        slot.thumb.configure(image=photo or self._blank_thumb)
+        slot.thumb.image = photo  # keep a reference even if evicted from the LRU
+        if src and photo is None and src not in self._thumb_jobs:
+            self._thumb_jobs[src] = _background_pool().submit(thumb_service.load_thumbnail, src)
+            if self._thumb_poll is None:
+                self._thumb_poll = self.after(self._THUMB_POLL_MS, self._poll_thumbs)
+    def _poll_thumbs(self) -> None:
+        self._thumb_poll = None
+        visible: Dict[str, List[_RowSlot]] = {}     # rows may share an image
+        for s in self._slots:
+            if 0 <= s.index < len(self._rows):
+                visible.setdefault(self._rows[s.index].src, []).append(s)
+        for src, fut in list(self._thumb_jobs.items()):
+            if src not in visible:
+                # scrolled away: drop the job if it has not started yet
+                if fut.cancel() or fut.done():
+                    del self._thumb_jobs[src]
+                continue
+            if not fut.done():
+                continue
+            del self._thumb_jobs[src]
+            try:
+                data = fut.result()
+            except Exception:
+                data = None
+            if not data:
+                continue
+            try:
+                photo = tk.PhotoImage(master=self, data=data)
+            except TclError:
+                continue
+            _thumb_cache().put(src, photo)
+            for slot in visible[src]:
+                self._show_thumb(slot)
+        if self._thumb_jobs:
+            self._thumb_poll = self.after(self._THUMB_POLL_MS, self._poll_thumbs)
+    # ───── validation ─────
     def _validate(self, entry: tk.Entry) -> None:
+        """Queue background validation; the border is applied once it completes."""
+        url = entry.get_value() if hasattr(entry, "get_value") else entry.get().strip()
+        fut = get_default_validator().submit(url)
+        self._await_validation(entry, url, fut)
+    def _await_validation(self, entry: tk.Entry, url: str, fut: Any) -> None:
         try:
-            image_service.validate_url(entry.get().strip())
-            _apply_border(entry, ok=True)
-        except Exception:
-            _apply_border(entry, ok=False)
+            if not fut.done():
+                entry._poll_id = entry.after(
+                    self._VALIDATION_POLL_MS, lambda: self._await_validation(entry, url, fut)
+                )
+                return
+            current = entry.get_value() if hasattr(entry, "get_value") else entry.get().strip()
+        except TclError:  # entry destroyed while waiting
+            return
+        if current == url:  # ignore stale results (slot rebound meanwhile)
+            _apply_border(entry, ok=fut.result().ok)
     def _debounce_validate(self, entry: tk.Entry) -> None:
         if hasattr(entry, "_after_id"):
             entry.after_cancel(entry._after_id)
         entry._after_id = entry.after(300, lambda ent=entry: self._validate(ent))
-    def get_urls(self) -> List[str]:
-        return [row.winfo_children()[0].get_value() for row in self._rows]
+    @staticmethod
+    def _cancel_validation(entry: tk.Entry) -> None:
+        """Cancel the debounce timer and result polling of *entry* (rebind/destroy)."""
+        for attr in ("_after_id", "_poll_id"):
+            after_id = entry.__dict__.pop(attr, None)
+            if after_id is not None:
+                try:
+                    entry.after_cancel(after_id)
+                except TclError:
+                    pass
 
 # ────────── Utility: parse DnD data ─────────────────────────────
+# Tcl list syntax used by tkinterdnd2: {brace quoted} tokens or bare words.
+_DND_TOKEN_RGX = re.compile(r"\{([^}]*)\}|(\S+)")
+
 def _split_dnd_event_data(data: str | bytes | None) -> Sequence[str]:
+    """Split a DnD payload into paths in a single linear regex scan."""
     if not data:
         return []
     if isinstance(data, bytes):
         data = data.decode()
-    out, token, in_brace = [], "", False
-    for ch in data:
-        if ch == "{":
-            in_brace, token = True, ""
-        elif ch == "}":
-            in_brace = False
-            out.append(token)
-            token = ""
-        elif ch == " " and not in_brace:
-            if token:
-                out.append(token)
-                token = ""
-        else:
-            token += ch
-    if token:
-        out.append(token)
-    return [os.path.expanduser(p) for p in out]
\ No newline at end of file
+    return [
+        os.path.expanduser(m.group(1) if m.group(1) is not None else m.group(2))
+        for m in _DND_TOKEN_RGX.finditer(data)
+    ]
@@ -0,0 +1,116 @@
+# tests/test_autosave.py
+"""Journal di autosave: replay, compattazione, righe troncate, thread."""
+import time
+
+from template_builder.services.autosave import AutosaveJournal
+
+
+def _journal(tmp_path, **kw):
+    kw.setdefault("fsync", False)
+    return AutosaveJournal(tmp_path / "autosave", **kw)
+
+
+def test_records_are_replayed_by_next_session(tmp_path):
+    j = _journal(tmp_path)
+    j.record("TITLE", "Torta")
+    j.record("IMAGES_STEP", ("a.png", "b.png"))
+    j.record("TITLE", "Torta di mele")
+    j.record("OLD", "x")
+    j.record("OLD", None)
+    j.close()
+    assert _journal(tmp_path).replay() == {
+        "TITLE": "Torta di mele", "IMAGES_STEP": ["a.png", "b.png"],
+    }
+
+
+def test_compaction_and_truncated_tail(tmp_path):
+    j = _journal(tmp_path, compact_every=3)
+    for i in range(4):
+        j.record(f"K{i}", str(i))
+    j.flush()
+    # 4 record ≥ 3 → snapshot scritto e journal svuotato
+    assert j.snapshot_path.exists() and j.journal_path.read_bytes() == b""
+    j.record("K0", "nuovo")
+    j.flush()
+    with j.journal_path.open("ab") as fh:
+        fh.write(b'["K1", "tronc')            # crash a metà scrittura
+    state = _journal(tmp_path).replay()
+    assert state == {"K0": "nuovo", "K1": "1", "K2": "2", "K3": "3"}
+
+
+def test_background_thread_flushes(tmp_path):
+    j = _journal(tmp_path, flush_interval=0.01)
+    j.record("A", "1")
+    deadline = time.time() + 2
+    while time.time() < deadline and not j.journal_path.exists():
+        time.sleep(0.01)
+    assert j.journal_path.exists()
+    j.close()
+    j.discard()
+    assert _journal(tmp_path).replay() == {}
+
+
+def test_builder_journals_field_edits_and_restores(tmp_path, monkeypatch):
+    import importlib
+    core = importlib.import_module("template_builder.builder_core")
+    monkeypatch.setattr(core, "AutosaveJournal", lambda: _journal(tmp_path))
+
+    app = core.TemplateBuilderApp(enable_gui=False)
+    app._start_autosave()
+    app.model.define("TITLE", "Product")
+    app.model.set("TITLE", "Crostata")
+    app.autosave.close()
+
+    again = core.TemplateBuilderApp(enable_gui=False)
+    again._start_autosave()
+    assert again._state["TITLE"] == "Crostata"
+    again.autosave.close()
+
+
+def test_checkpoint_restarts_session_from_saved_state(tmp_path):
+    j = _journal(tmp_path)
+    j.record("A", "1")
+    j.record("B", "2")
+    j.checkpoint({"A": "salvato"})
+    j.record("C", "3")
+    j.close()
+    assert j.journal_path.read_bytes().count(b"\n") == 1
+    assert _journal(tmp_path).replay() == {"A": "salvato", "C": "3"}
+
+
+def test_builder_replays_only_after_unclean_exit(tmp_path, monkeypatch):
+    import importlib
+    core = importlib.import_module("template_builder.builder_core")
+    monkeypatch.setattr(core, "AutosaveJournal", lambda: _journal(tmp_path))
+    monkeypatch.setattr(core, "quick_save_fn", lambda state: None)
+
+    app = core.TemplateBuilderApp(enable_gui=False)
+    app._start_autosave()
+    app.model.define("TITLE", "Product")
+    app.model.set("TITLE", "Crostata")
+    app.quick_save()
+    app.model.set("TITLE", "Torta")
+    app.autosave.close()                       # crash: nessun _on_close
+
+    again = core.TemplateBuilderApp(enable_gui=False)
+    again._start_autosave()
+    assert again._state["TITLE"] == "Torta"
+    again._on_close()
+
+    third = core.TemplateBuilderApp(enable_gui=False)
+    third._start_autosave()
+    assert "TITLE" not in third._state
+    third.autosave.close()
+
+
+def test_write_after_torn_tail_is_not_lost(tmp_path):
+    j = _journal(tmp_path)
+    j.record("A", "1")
+    j.close()
+    with j.journal_path.open("ab") as fh:
+        fh.write(b'["B", "tor')                # crash senza newline finale
+    again = _journal(tmp_path)
+    again.record("C", "3")
+    again.close()
+    assert again.journal_path.read_bytes().count(b"tor") == 0
+    assert _journal(tmp_path).replay() == {"A": "1", "C": "3"}
@@ -7,3 +7,65 @@ def test_collect_adds_steps_and_alt(monkeypatch):
     ctx = app._collect()
     assert ctx["STEPS"][0]["IMG_SRC"] == "mix.png"
     assert ctx["STEP1_IMG_ALT"] == "Mix"
+
+
+def test_collect_reads_model_for_unbuilt_tabs():
+    app = TemplateBuilderApp(enable_gui=False)
+    app.model.define("INGREDIENTI", "Recipe", "ul")
+    app.model.set("INGREDIENTI", "farina\nuova")
+    app.model.set("IMAGES_DESC", ["a.png"])
+    ctx = app._collect()
+    assert "<li>farina</li>" in ctx["INGREDIENTI"]
+    assert ctx["IMAGES_DESC"] == ["a.png"]
+    assert ctx["COLS_DESC"] == 1
+
+
+def test_collect_binds_more_than_nine_steps():
+    app = TemplateBuilderApp(enable_gui=False)
+    for i in range(1, 31):
+        app._state[f"STEP{i}"] = f"Passo {i}"
+    app._state["IMAGES_STEP"] = [f"{i}.png" for i in range(1, 31)]
+    ctx = app._collect()
+    assert len(ctx["STEPS"]) == 30
+    assert ctx["STEPS"][29]["IMG_SRC"] == "30.png"
+    assert ctx["STEP30_IMG_ALT"] == "Passo 30"
+
+
+def test_move_step_moves_text_and_image_together():
+    app = TemplateBuilderApp(enable_gui=False)
+    for i in range(1, 4):
+        app._state[f"STEP{i}"] = f"Passo {i}"
+    app._state["IMAGES_STEP"] = ["1.png", "2.png"]
+    app.move_step(0, 2)
+    ctx = app._collect()
+    assert [s["TEXT"] for s in ctx["STEPS"]] == ["Passo 2", "Passo 3", "Passo 1"]
+    assert [s["IMG_SRC"] for s in ctx["STEPS"]] == ["2.png", "", "1.png"]
+    assert [s["ORDER"] for s in ctx["STEPS"]] == [1, 2, 3]
+
+
+def test_batch_updates_coalesce_preview_requests():
+    from types import SimpleNamespace
+    app = TemplateBuilderApp(enable_gui=False)
+    rendered = []
+    app.preview_engine = SimpleNamespace(render=rendered.append)
+    with app._batch_updates():
+        pass
+    assert rendered == []                   # nessuna richiesta: nessun render
+    with app._batch_updates():
+        for _ in range(3):
+            app.update_preview()
+        assert rendered == []
+    assert len(rendered) == 1 and app._preview_pending is False
+
+
+def test_state_is_a_plain_dict_after_load_and_undo(tmp_path, monkeypatch):
+    from template_builder.services import storage
+    monkeypatch.setattr(storage, "_HISTORY_DIR", tmp_path)
+    app = TemplateBuilderApp(enable_gui=False)
+    first = storage.quick_save({"IMAGES_DESC": ["a.png"]}, fsync="none")
+    app.load_recipe(first)
+    app.load_recipe(storage.quick_save({"IMAGES_DESC": []}, fsync="none"))
+    app.undo()
+    assert type(app._state) is dict
+    app._state["IMAGES_DESC"].append("b.png")
+    assert app._state["IMAGES_DESC"] == ["a.png", "b.png"]
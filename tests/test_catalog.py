@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+from template_builder.services import catalog as cat
+
+TPL = """<h1>{{ TITLE }}</h1>
+<img src="{{ DESC1_SRC }}" alt="{{ DESC1_ALT }}">
+<img src="{{ REC1_SRC }}" alt="{{ REC1_ALT }}">
+<img src="{{ LOGO_SRC }}" alt="{{ LOGO_ALT }}">
+{% for src,alt in IMAGES_DESC %}<img src="{{src}}">{% endfor %}
+{% for ing in INGREDIENTI %}{{ ing }}{% endfor %}
+"""
+
+
+def _catalog(tmp_path):
+    folder = tmp_path / "templates"
+    folder.mkdir(exist_ok=True)
+    return folder, cat.TemplateCatalog(folder, index_path=tmp_path / "index.json")
+
+
+def test_entry_contents(tmp_path):
+    folder, c = _catalog(tmp_path)
+    (folder / "a.html").write_text(TPL, encoding="utf-8")
+    assert c.refresh() == ["a.html"]
+    e = c.get("a.html")
+    assert "TITLE" in e.placeholders
+    assert (e.desc_groups, e.rec_groups, e.other_groups) == (["DESC1"], ["REC1"], ["LOGO"])
+    assert e.loops == ["IMAGES_DESC", "INGREDIENTI"]
+    assert e.size == len(TPL.encode())
+    assert e.compile_status in ("ok", "unknown")
+
+
+def test_incremental_refresh_and_persistence(tmp_path, monkeypatch):
+    folder, c = _catalog(tmp_path)
+    (folder / "a.html").write_text("{{ A }}", encoding="utf-8")
+    (folder / "b.html").write_text("{{ B }}", encoding="utf-8")
+    assert c.refresh() == ["a.html", "b.html"]
+    assert c.refresh() == []
+
+    # nuovo processo: l'indice su disco evita ogni rianalisi
+    calls = []
+    real = cat.analyze_template
+    monkeypatch.setattr(cat, "analyze_template", lambda n, s: calls.append(n) or real(n, s))
+    _, c2 = _catalog(tmp_path)
+    assert c2.refresh() == [] and calls == []
+    assert c2.names() == ["a.html", "b.html"]
+
+    # touch senza modifiche → nessuna rianalisi; modifica reale → solo quel file
+    st = os.stat(folder / "a.html")
+    os.utime(folder / "a.html", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert c2.refresh() == [] and calls == []
+    (folder / "b.html").write_text("{{ B }}{{ C }}", encoding="utf-8")
+    assert c2.refresh() == ["b.html"] and calls == ["b.html"]
+    assert c2.get("b.html").placeholders == ["B", "C"]
+
+    (folder / "a.html").unlink()
+    assert c2.refresh() == ["a.html"] and "a.html" not in c2
+
+
+def test_dependency_graph(tmp_path):
+    pytest.importorskip("jinja2")
+    folder, c = _catalog(tmp_path)
+    (folder / "_css.html").write_text("body{}", encoding="utf-8")
+    (folder / "_base.html").write_text("{% include '_css.html' %}{{ SHOP }}{% block b %}{% endblock %}",
+                                       encoding="utf-8")
+    (folder / "a.html").write_text("{% extends '_base.html' %}{% block b %}{{ A }}{% endblock %}",
+                                   encoding="utf-8")
+    (folder / "b.html").write_text("{% include '_css.html' %}{{ B }}", encoding="utf-8")
+    (folder / "c.html").write_text("{{ C }}", encoding="utf-8")
+    c.refresh()
+    assert c.names(partials=False) == ["a.html", "b.html", "c.html"]
+    assert c.dependencies("a.html") == ["_base.html"]
+    assert c.dependencies("a.html", recursive=True) == ["_base.html", "_css.html"]
+    assert c.dependents("_css.html") == ["_base.html", "a.html", "b.html"]
+    assert c.affected(["_base.html", "c.html"]) == ["_base.html", "a.html", "c.html"]
+    assert c.placeholders_of("a.html") == ["A", "SHOP"]
+
+    # il grafo è persistito nell'indice e segue le modifiche
+    _, c2 = _catalog(tmp_path)
+    assert c2.dependents("_base.html") == ["a.html"]
+    (folder / "c.html").write_text("{% include '_base.html' %}", encoding="utf-8")
+    c2.refresh()
+    assert c2.dependents("_base.html") == ["a.html", "c.html"]
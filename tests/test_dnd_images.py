@@ -27,3 +27,12 @@ def test_split_dnd_event_data() -> None:
     split = widgets._split_dnd_event_data  # type: ignore[attr-defined]
     raw = r'{/path/with space/img 1.png} {/other/img2.jpg}'
     assert split(raw) == ["/path/with space/img 1.png", "/other/img2.jpg"]
+
+
+def test_split_dnd_event_data_linear() -> None:
+    """Il parser non dipende da tkinterdnd2: bare word, brace e payload grandi."""
+    split = widgets._split_dnd_event_data  # type: ignore[attr-defined]
+    assert split(b"/a.png {/b c.png} /d.png") == ["/a.png", "/b c.png", "/d.png"]
+    raw = " ".join("{/tmp/dir %d/img.png}" % i for i in range(5000))
+    out = split(raw)
+    assert len(out) == 5000 and out[-1] == "/tmp/dir 4999/img.png"
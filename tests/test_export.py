@@ -0,0 +1,105 @@
+# tests/test_export.py
+"""Export incrementale guidato dal manifest."""
+import json
+import os
+
+import pytest
+
+pytest.importorskip("jinja2")
+
+from template_builder.__main__ import main
+from template_builder.services import export, storage
+
+
+def _bump(path, text=None):
+    if text is not None:
+        path.write_text(text, encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    tpl = tmp_path / "tpl"
+    tpl.mkdir()
+    (tpl / "base.html").write_text("<style>{% include 'css.html' %}</style>{% block body %}{% endblock %}", "utf-8")
+    (tpl / "css.html").write_text("body{}", "utf-8")
+    (tpl / "page.html").write_text(
+        "{% extends 'base.html' %}{% block body %}{{ TITLE }}|{{ HERO_IMAGE_SRC }}{% endblock %}", "utf-8")
+    (tpl / "solo.html").write_text("{{ TITLE }}", "utf-8")
+    recipes = tmp_path / "recipes"
+    recipes.mkdir()
+    (recipes / "hero.png").write_bytes(b"\x89PNG-1")
+    for i in range(5):
+        data = {"TITLE": f"R{i}", "HERO_IMAGE_SRC": "hero.png" if i == 0 else "https://x/y.png"}
+        (recipes / f"r{i}.json").write_text(
+            json.dumps({"created": "x", "schema": storage.SCHEMA_VERSION, "data": data}), "utf-8")
+    return tpl, recipes, tmp_path / "out"
+
+
+def test_template_dependencies(catalog):
+    tpl, _, _ = catalog
+    assert [p.name for p in export.template_dependencies(tpl / "page.html")] == [
+        "base.html", "css.html", "page.html"]
+    assert [p.name for p in export.template_dependencies(tpl / "solo.html")] == ["solo.html"]
+
+
+def test_nested_partials_in_subfolders(catalog):
+    tpl, recipes, out = catalog
+    (tpl / "inc").mkdir()
+    (tpl / "inc" / "a.html").write_text("A{% include 'inc/b.html' %}", "utf-8")
+    (tpl / "inc" / "b.html").write_text("B1", "utf-8")
+    (tpl / "nested.html").write_text("{% include 'inc/a.html' %}{{ TITLE }}", "utf-8")
+    deps = export.template_dependencies(tpl / "nested.html")
+    assert [p.relative_to(tpl).as_posix() for p in deps] == ["inc/a.html", "inc/b.html", "nested.html"]
+
+    jobs = export.jobs_from_folder(recipes, tpl / "nested.html", out)
+    assert len(export.export_incremental(jobs).rendered) == 5
+    _bump(tpl / "inc" / "b.html", "B2")
+    assert len(export.export_incremental(jobs).rendered) == 5
+    assert (out / "r1.html").read_text("utf-8") == "AB2R1"
+
+
+def test_catalog_index_lives_next_to_manifest(catalog, monkeypatch):
+    tpl, recipes, out = catalog
+    home = out.parent / "home"
+    monkeypatch.setattr(storage, "_BASE_DIR", home)
+    export.export_incremental(export.jobs_from_folder(recipes, tpl / "page.html", out))
+    assert not home.exists()
+    assert len(list(out.glob(".catalog-*.json"))) == 1
+
+
+def test_only_changed_outputs_are_rendered(catalog):
+    tpl, recipes, out = catalog
+    jobs = export.jobs_from_folder(recipes, tpl / "page.html", out)
+    assert len(export.export_incremental(jobs).rendered) == 5
+    assert (out / "r1.html").read_text("utf-8") == "<style>body{}</style>R1|https://x/y.png"
+
+    again = export.export_incremental(jobs)
+    assert again.rendered == [] and again.skipped == 5
+
+    # ricetta modificata
+    _bump(recipes / "r2.json", (recipes / "r2.json").read_text("utf-8").replace("R2", "R2b"))
+    assert export.export_incremental(jobs).rendered == [str(out / "r2.html")]
+    # immagine locale modificata
+    _bump(recipes / "hero.png")                       # mtime cambiato, stesso contenuto
+    assert export.export_incremental(jobs).rendered == []
+    (recipes / "hero.png").write_bytes(b"\x89PNG-2")
+    _bump(recipes / "hero.png")
+    assert export.export_incremental(jobs).rendered == [str(out / "r0.html")]
+    # output cancellato
+    (out / "r3.html").unlink()
+    assert export.export_incremental(jobs).rendered == [str(out / "r3.html")]
+    # partial incluso → tutto
+    _bump(tpl / "css.html", "body{color:red}")
+    assert len(export.export_incremental(jobs).rendered) == 5
+
+
+def test_renderer_version_and_cli(catalog, monkeypatch, capsys):
+    tpl, recipes, out = catalog
+    args = ["export", str(recipes), "--template", str(tpl / "solo.html"), "--out", str(out)]
+    assert main(args) == 0
+    assert main(args) == 0
+    assert "0 rigenerati, 5 invariati" in capsys.readouterr().out
+    monkeypatch.setattr(export, "RENDERER_VERSION", "altro")
+    assert len(export.export_incremental(export.jobs_from_folder(recipes, tpl / "solo.html", out)).rendered) == 5
@@ -0,0 +1,42 @@
+# tests/test_field_model.py
+from template_builder import field_model
+from template_builder.field_model import FieldModel
+
+
+def _model():
+    m = FieldModel()
+    for i in range(50):
+        m.define(f"K{i}", "Other")
+    m.define("INGREDIENTI", "Recipe", "ul")
+    return m
+
+
+def test_collect_formats_only_dirty_keys(monkeypatch):
+    m = _model()
+    calls = []
+    real = field_model.text_service.auto_format
+    monkeypatch.setattr(field_model.text_service, "auto_format",
+                        lambda v, mode="p": calls.append(v) or real(v, mode=mode))
+    first = m.collect()
+    assert len(calls) == 51
+    calls.clear()
+
+    assert m.set("K3", "ciao") and not m.set("K3", "ciao")
+    second = m.collect()
+    assert calls == ["ciao"]
+    assert second["K3"] == "<p>ciao</p>"
+    assert second["K4"] is first["K4"]          # parti invariate condivise
+    assert m.collect() == second and calls == ["ciao"]
+
+
+def test_schema_change_and_observers():
+    m = _model()
+    seen = []
+    m.observe(seen.append)
+    m.set("INGREDIENTI", "farina\nuova")
+    assert seen == ["INGREDIENTI"] and m.dirty() == {"INGREDIENTI"}
+    assert "<li>farina</li>" in m.collect()["INGREDIENTI"]
+    m.undefine("K0")
+    assert "K0" not in m.collect()
+    m.define("K0", "Other")
+    assert m.get("K0") == "" and "K0" in m.collect()
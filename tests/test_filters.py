@@ -0,0 +1,62 @@
+# tests/test_filters.py
+"""Registro filtri Jinja2: installazione nell'Environment e memoizzazione."""
+import pytest
+
+jinja2 = pytest.importorskip("jinja2")
+
+from template_builder import filters
+from template_builder.services import storage
+
+
+def test_filters_installed_without_touching_defaults(tmp_path):
+    env = storage.get_environment(tmp_path)
+    for name in ("steps_bind", "from_json", "nl2br", "lines"):
+        assert name in env.filters
+        assert name not in jinja2.defaults.DEFAULT_FILTERS
+
+
+def test_from_json_is_memoized(tmp_path):
+    tpl = tmp_path / "t.html"
+    tpl.write_text("{% for s in '{{RECIPE_STEPS_JSON}}' | from_json %}[{{ s[0] }}|{{ s[1] }}]{% endfor %}"
+                   "{{ BAD | from_json | length }}", "utf-8")
+    filters._parse_json.cache_clear()
+    ctx = {"RECIPE_STEPS_JSON": '[["Mescolare", "a.png"], ["Cuocere", ""]]', "BAD": "{non json"}
+    for _ in range(3):
+        assert storage.export_html(ctx, tpl) == "[Mescolare|a.png][Cuocere|]0"
+    info = filters._parse_json.cache_info()
+    assert info["misses"] == 1 and info["hits"] == 2
+    assert isinstance(filters._parse_json('[1, [2]]'), tuple)      # risultato condiviso → immutabile
+
+
+def test_steps_bind_nl2br_lines(tmp_path):
+    tpl = tmp_path / "s.html"
+    tpl.write_text("{% for s in RECIPE_STEPS_TEXT | steps_bind %}<{{ s.text }}:{{ s.img }}:{{ s.alt }}>"
+                   "{% endfor %}|{{ NOTE | nl2br }}|{{ INGR | lines | join(',') }}", "utf-8")
+    ctx = {"RECIPE_STEPS_TEXT": "'Uno\n\n Due '", "IMAGES_STEP": [["u.png", "U"]],
+           "NOTE": "a<b\nc", "INGR": " farina \n\nuova\n"}
+    assert storage.export_html(ctx, tpl) == "<Uno:u.png:U><Due::>|a&lt;b<br>c|farina,uova"
+    ctx["IMAGES_STEP"] = [{"src": "d.png", "alt": "D"}]          # dict non hashable → senza cache
+    assert storage.export_html(ctx, tpl).startswith("<Uno:d.png:D>")
+
+
+def test_memo_keys_keep_numeric_types_apart():
+    memo = filters._memoize(lambda v: repr(v), 16)
+    for value in (1, True, 1.0, (1,), (True,), (1.0,), [True], {"a": (1,)}, {"a": (True,)}):
+        assert memo(value) == repr(value)
+    assert memo.cache_info()["misses"] == 9
+    assert filters._hashable({"a": 1, "b": 2}) == filters._hashable({"b": 2, "a": 1})
+
+
+def test_register_custom_pure_filter():
+    calls = []
+
+    @filters.register_filter("_test_upper", pure=True)
+    def upper(value):
+        calls.append(value)
+        return str(value).upper()
+
+    try:
+        assert upper("a") == upper("a") == "A" and calls == ["a"]
+        assert upper(["x"]) == upper(["x"]) == "['X']" and len(calls) == 2   # liste: chiave per valore
+    finally:
+        filters.FILTERS.pop("_test_upper")
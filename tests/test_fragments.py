@@ -0,0 +1,74 @@
+# tests/test_fragments.py
+"""Tag ``{% cache %}`` e store dei frammenti."""
+import os
+
+import pytest
+
+pytest.importorskip("jinja2")
+
+from template_builder.fragments import FragmentStore
+from template_builder.services import catalog, storage
+
+TEMPLATES = os.path.join(os.path.dirname(catalog.__file__), "..", "templates")
+
+
+def test_store_lru_bounds():
+    store = FragmentStore(max_entries=2, max_bytes=10)
+    store.put("a", "xxx")
+    store.put("b", "yyy")
+    assert store.get("a") == "xxx"          # "a" diventa il più recente
+    store.put("c", "zzz")
+    assert store.get("b") is None and len(store) == 2
+    store.put("d", "12345678")              # supera i byte: escono i più vecchi
+    assert store.nbytes <= 10 and store.get("d") == "12345678"
+    store.put("big", "x" * 11)              # più grande del limite: ignorato
+    assert store.get("big") is None
+
+
+def test_store_counts_encoded_bytes():
+    store = FragmentStore(max_bytes=10)
+    store.put("a", "èèè")                   # 3 caratteri, 6 byte
+    assert store.nbytes == 6
+    store.put("b", "èèè")                   # 6 + 6 > 10: esce "a"
+    assert store.get("a") is None and store.nbytes == 6
+    store.put("c", "è" * 6)                 # 12 byte: ignorato
+    assert store.get("c") is None
+
+
+def test_shipped_gallery_is_cached():
+    env = storage.get_environment(os.path.abspath(TEMPLATES))
+    tpl = env.get_template("template_final_ebay.html")
+    ctx = {"IMAGES_DESC": [["a.png", "A"]], "COLS_DESC": 1, "IMAGES_REC": [], "COLS_REC": 1}
+    hits = env.fragment_store.hits
+    first = tpl.render(ctx)
+    assert tpl.render(ctx) == first and 'src="a.png"' in first
+    assert env.fragment_store.hits >= hits + 2   # galleria descrizione e ricetta
+    ctx["IMAGES_DESC"] = [["b.png", "B"]]
+    assert 'src="b.png"' in tpl.render(ctx)
+
+
+def test_cache_tag_reuses_fragment(tmp_path):
+    tpl = tmp_path / "t.html"
+    tpl.write_text('{% cache "k", A %}{{ A }}{{ calls.append(1) or "" }}{% endcache %}|{{ B }}', "utf-8")
+    calls = []
+    assert storage.export_html({"A": "<1>", "B": 1, "calls": calls}, tpl) == "&lt;1&gt;|1"
+    assert storage.export_html({"A": "<1>", "B": 2, "calls": calls}, tpl) == "&lt;1&gt;|2"
+    assert calls == [1]                     # corpo eseguito una sola volta
+    assert storage.export_html({"A": "<2>", "B": 2, "calls": calls}, tpl) == "&lt;2&gt;|2"
+    assert calls == [1, 1]                  # variabile di chiave cambiata
+
+    # il file modificato non riusa frammenti della compilazione precedente
+    tpl.write_text('{% cache "k", A %}[{{ A }}]{% endcache %}', "utf-8")
+    st = os.stat(tpl)
+    os.utime(tpl, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert storage.export_html({"A": "<1>", "calls": calls}, tpl) == "[&lt;1&gt;]"
+    assert storage.get_environment(tmp_path).fragment_store.hits >= 1
+
+
+def test_shipped_templates_parse_with_cache_tags():
+    folder = os.path.abspath(TEMPLATES)
+    for name in sorted(os.listdir(folder)):
+        with open(os.path.join(folder, name), encoding="utf-8") as fh:
+            src = fh.read()
+        entry = catalog.analyze_template(name, src)
+        assert entry.compile_status == "ok", (name, entry.compile_error)
@@ -0,0 +1,101 @@
+# tests/test_history.py
+"""Retention della storia: piano, archivi tar.gz, load_recipe trasparente, CLI."""
+import json
+import time
+
+from template_builder.__main__ import main
+from template_builder.services import history, storage
+
+NOW = time.mktime(time.strptime("20250601-120000", "%Y%m%d-%H%M%S"))
+
+
+def _snap(folder, hours_ago, n=0):
+    ts = NOW - hours_ago * 3600
+    name = f"recipe_{time.strftime('%Y%m%d-%H%M%S', time.localtime(ts))}"
+    name += f"-{n}.json" if n else ".json"
+    data = {"H": str(hours_ago), "BODY": "impasto " * 2000}
+    (folder / name).write_text(json.dumps({"schema": 2, "data": data}), "utf-8")
+    return folder / name
+
+
+def test_plan_buckets():
+    hours = (1, 2, 9.75, 10, 30, 31, 24 * 40)
+    snaps = [history.Snapshot(f"s{h}", NOW - h * 3600, 1) for h in hours]
+    plan = history.plan_retention(snaps, history.RetentionPolicy(6, 24, 30), now=NOW)
+    assert plan["s1"] == plan["s2"] == "keep"
+    assert plan["s9.75"] == "pack" and plan["s10"] == "drop"     # stessa ora: vince la più recente
+    assert plan["s30"] == "pack" and plan["s31"] == "drop"       # stesso giorno
+    assert plan["s960"] == "drop"                                # oltre il mese
+
+
+def test_compaction_packs_and_load_recipe_reads_archives(tmp_path):
+    recent = _snap(tmp_path, 1)
+    old = _snap(tmp_path, 12)
+    dup = _snap(tmp_path, 12, n=1)          # stessa ora di `old`
+    ancient = _snap(tmp_path, 24 * 60)
+    report = history.compact_history(tmp_path, now=NOW)
+    assert (report.kept, report.packed, report.deleted) == (1, 1, 2)
+    assert report.reclaimed > 0 and len(report.archives) == 1
+    assert recent.exists() and not old.exists() and not ancient.exists()
+    assert not dup.exists()
+    (packed,) = [s for s in history.list_history(tmp_path) if s.archive]
+    assert storage.load_recipe(tmp_path / packed.name)["H"] == "12"
+
+    # un secondo giro, mesi dopo, svuota e rimuove l'archivio
+    report = history.compact_history(tmp_path, now=NOW + 86400 * 90)
+    assert report.deleted == 2 and not list(tmp_path.glob("pack_*"))
+
+
+def test_cli_dry_run(tmp_path, capsys):
+    _snap(tmp_path, 24 * 60)
+    assert main(["history-gc", "--folder", str(tmp_path), "--dry-run"]) == 0
+    assert "1 eliminate" in capsys.readouterr().out
+    assert len(list(tmp_path.glob("recipe_*"))) == 1
+
+
+def test_quick_save_does_not_wait_for_compression(tmp_path, monkeypatch):
+    import threading
+
+    for h in (30, 50, 70):
+        _snap(tmp_path, h)
+    started, release = threading.Event(), threading.Event()
+    real_tar = history._tar_bytes
+
+    def slow_tar(members):
+        started.set()
+        release.wait(5)
+        return real_tar(members)
+
+    monkeypatch.setattr(history, "_tar_bytes", slow_tar)
+    monkeypatch.setattr(storage, "_HISTORY_DIR", tmp_path)
+    gc = threading.Thread(target=history.compact_history, args=(tmp_path,), kwargs={"now": NOW})
+    gc.start()
+    assert started.wait(5)
+    saved = threading.Thread(target=storage.quick_save, args=({"A": "1"},), kwargs={"fsync": "none"})
+    saved.start()
+    saved.join(2)
+    assert not saved.is_alive()            # salvataggio riuscito mentre la GC comprime
+    release.set()
+    gc.join(5)
+    assert len(history.list_history(tmp_path)) >= 2
+
+
+def test_stale_index_entry_is_dropped_not_fatal(tmp_path):
+    import pytest
+
+    for h in (30, 50, 70):
+        _snap(tmp_path, h)
+    history.compact_history(tmp_path, now=NOW)
+    index = json.loads((tmp_path / "packs.json").read_text("utf-8"))["members"]
+    archive = next(iter(index.values()))["archive"]
+    ghost = f"recipe_{time.strftime('%Y%m%d-%H%M%S', time.localtime(NOW - 30 * 3600 + 60))}.json"
+    index[ghost] = {"archive": archive, "ts": NOW - 30 * 3600 + 60, "size": 1}
+    history._save_index(tmp_path, index)
+    with pytest.raises(FileNotFoundError):
+        storage.load_recipe(tmp_path / ghost)
+
+    # il fantasma, più recente, fa scartare l'istantanea delle 30h e riscrivere l'archivio
+    history.compact_history(tmp_path, now=NOW)
+    index = json.loads((tmp_path / "packs.json").read_text("utf-8"))["members"]
+    assert ghost not in index and len(index) == 2
+    assert {storage.load_recipe(tmp_path / n)["H"] for n in index} == {"50", "70"}
@@ -0,0 +1,94 @@
+# tests/test_image_validation.py
+"""
+Test del validator asincrono (services.validation) contro un server HTTP
+locale: nessuna rete esterna né display richiesti.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from template_builder.services.validation import ImageUrlValidator
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"          # keep-alive
+    routes = {
+        "/ok.png": (200, "image/png"),
+        "/page.html": (200, "text/html"),
+    }
+
+    def do_HEAD(self):
+        self.server.hits.append(self.path)
+        self.server.peers.add(self.client_address)
+        status, ctype = self.routes.get(self.path, (404, "text/plain"))
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):  # silenzia stderr
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    srv.hits, srv.peers = [], set()
+    th = threading.Thread(target=srv.serve_forever, daemon=True)
+    th.start()
+    yield srv, f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_http_results(server):
+    _, base = server
+    v = ImageUrlValidator(max_workers=2)
+    try:
+        assert v.submit(f"{base}/ok.png").result(timeout=5).ok
+        assert not v.submit(f"{base}/missing.png").result(timeout=5).ok
+        res = v.submit(f"{base}/page.html").result(timeout=5)
+        assert not res.ok and "text/html" in res.reason
+    finally:
+        v.shutdown()
+
+
+def test_cache_and_negative_ttl(server):
+    srv, base = server
+    now = [0.0]
+    v = ImageUrlValidator(max_workers=1, ttl=60, negative_ttl=5, clock=lambda: now[0])
+    try:
+        for _ in range(3):
+            assert v.submit(f"{base}/ok.png").result(timeout=5).ok
+            assert not v.submit(f"{base}/nope.png").result(timeout=5).ok
+        assert srv.hits == ["/ok.png", "/nope.png"]
+        # l'esito negativo scade prima di quello positivo
+        now[0] = 10.0
+        v.check(f"{base}/ok.png")
+        v.check(f"{base}/nope.png")
+        assert srv.hits == ["/ok.png", "/nope.png", "/nope.png"]
+    finally:
+        v.shutdown()
+
+
+def test_connection_reuse(server):
+    srv, base = server
+    v = ImageUrlValidator(max_workers=1)
+    try:
+        for i in range(5):
+            v.submit(f"{base}/img{i}.png").result(timeout=5)
+        assert len(srv.hits) == 5
+        assert len(srv.peers) == 1   # stessa socket keep-alive
+    finally:
+        v.shutdown()
+
+
+def test_local_paths(tmp_path):
+    img = tmp_path / "a.png"
+    img.write_bytes(b"\x89PNG")
+    v = ImageUrlValidator()
+    assert v.check(str(img)).ok
+    assert v.check(img.as_uri()).ok
+    assert not v.check(str(tmp_path / "missing.png")).ok
+    assert not v.check("").ok
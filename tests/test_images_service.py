@@ -5,3 +5,60 @@ def test_guess_grid_basic():
 
 def test_generate_placeholders():
     assert imgs.generate_placeholders(3) == ["{{ IMG1 }}", "{{ IMG2 }}", "{{ IMG3 }}"]
+
+def test_expand_image_paths(tmp_path):
+    (tmp_path / "sub").mkdir()
+    for name in ("b.JPG", "a.png", "notes.txt", ".hidden.png", "sub/c.webp"):
+        (tmp_path / name).write_bytes(b"x")
+    out = imgs.expand_image_paths([tmp_path, tmp_path / "a.png", "https://x/y.png"])
+    names = [p.rsplit("/", 1)[-1] for p in out]
+    assert names == ["a.png", "b.JPG", "c.webp", "y.png"]
+    assert imgs.expand_image_paths([tmp_path], recursive=False)[-1].endswith("b.JPG")
+
+def test_expand_image_paths_survives_symlink_cycle(tmp_path):
+    import os
+    import pytest
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "a.png").write_bytes(b"x")
+    try:
+        os.symlink(tmp_path, tmp_path / "sub" / "loop")
+    except (OSError, NotImplementedError):
+        pytest.skip("symlink non supportati")
+    out = imgs.expand_image_paths([tmp_path])
+    assert [p.rsplit("/", 1)[-1] for p in out] == ["a.png"]
+
+def test_probe_metadata(tmp_path):
+    f = tmp_path / "a.png"
+    f.write_bytes(b"1234")
+    meta = imgs.probe_metadata(f)
+    assert meta["bytes"] == 4
+    assert "error" in imgs.probe_metadata(tmp_path / "missing.png")
+
+def test_sized_lru_weight_cap():
+    from template_builder.services.thumbnails import SizedLRU
+    lru = SizedLRU(10, weigher=len)
+    lru.put("a", "xxxx")
+    lru.put("b", "xxxx")
+    assert lru.get("a") == "xxxx"        # "a" diventa il più recente
+    lru.put("c", "xxxx")                 # supera 10 → esce "b"
+    assert "b" not in lru and "a" in lru and lru.weight == 8
+    assert lru.put("big", "x" * 11) is False and "big" not in lru
+
+def test_load_thumbnail_skips_non_local(tmp_path):
+    from template_builder.services.thumbnails import load_thumbnail, thumbnail_cache_path
+    assert load_thumbnail("https://example.com/a.png") is None
+    assert load_thumbnail(tmp_path / "missing.png") is None
+    f = tmp_path / "a.png"
+    f.write_bytes(b"x")
+    p1 = thumbnail_cache_path(f, cache_dir=tmp_path)
+    assert p1 == thumbnail_cache_path(f, cache_dir=tmp_path)
+    assert p1 != thumbnail_cache_path(f, size=96, cache_dir=tmp_path)
+
+
+def test_thumbnail_cache_lives_in_data_dir(tmp_path, monkeypatch):
+    from template_builder.services import storage
+    from template_builder.services.thumbnails import thumbnail_cache_path
+    monkeypatch.setattr(storage, "_BASE_DIR", tmp_path)
+    f = tmp_path / "a.png"
+    f.write_bytes(b"x")
+    assert thumbnail_cache_path(f).is_relative_to(tmp_path / "thumbs")
@@ -0,0 +1,64 @@
+# tests/test_migration.py
+"""Migrazione in blocco v1/batch-1 → v2 e caricamento dei file già v2."""
+import json
+
+import pytest
+
+from template_builder.__main__ import main
+from template_builder.services import migration, storage
+
+
+def _tree(tmp_path, n_v1=6, n_batch=4):
+    root = tmp_path / "ricette"
+    (root / "sub").mkdir(parents=True)
+    for i in range(n_v1):
+        (root / f"v1_{i}.json").write_text(json.dumps(
+            {"created": "20200101-000000", "data": {"TITLE": f"R{i}", "STEP1": "Mescolare",
+                                                   "IMAGES_STEP": ["a.png"]}}), "utf-8")
+    for i in range(n_batch):
+        (root / "sub" / f"b_{i}.json").write_text(json.dumps({"TITLE": f"B{i}", "STEP1": "Cuocere"}), "utf-8")
+    storage.atomic_write(root / "v2.json", json.dumps(
+        {"created": "x", "schema": storage.SCHEMA_VERSION, "data": {"TITLE": "Nuova"}}))
+    (root / "packs.json").write_text('{"version": 1, "members": {}}', "utf-8")
+    (root / "config.json").write_text('{"theme": "dark"}', "utf-8")
+    (root / "rotto.json").write_text('{"TITLE": ', "utf-8")
+    return root
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_migrate_tree(tmp_path, workers):
+    root = _tree(tmp_path)
+    before = {p: storage.load_recipe(p) for p in root.rglob("*_*.json")}
+    report = migration.migrate_tree(root, workers=workers)
+    assert (report.migrated, report.current, report.skipped, len(report.errors)) == (10, 1, 1, 1)
+
+    for path, recipe in before.items():
+        data = json.loads(path.read_text("utf-8"))
+        assert storage.recipe_schema(data) == storage.SCHEMA_VERSION
+        assert storage.load_recipe(path) == recipe          # stesso contenuto del loader legacy
+        assert path.with_name(path.name + migration.BACKUP_SUFFIX).exists()
+    assert json.loads((root / "v1_0.json").read_text("utf-8"))["created"] == "20200101-000000"
+    assert json.loads((root / "config.json").read_text("utf-8")) == {"theme": "dark"}
+
+    again = migration.migrate_tree(root, workers=workers)
+    assert again.migrated == 0 and again.current == 11
+
+
+def test_dry_run_and_cli(tmp_path, capsys):
+    root = _tree(tmp_path, n_v1=2, n_batch=0)
+    original = (root / "v1_0.json").read_bytes()
+    assert migration.migrate_tree(root, dry_run=True).migrated == 2
+    assert (root / "v1_0.json").read_bytes() == original
+
+    out = tmp_path / "report.json"
+    assert main(["migrate", str(root), "--workers", "1", "--no-backup", "--report", str(out)]) == 1
+    assert "2 migrate" in capsys.readouterr().out
+    assert json.loads(out.read_text("utf-8"))["migrated"] == 2
+    assert not list(root.glob("*.bak"))
+
+
+def test_loader_does_not_migrate_v2(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "_HISTORY_DIR", tmp_path)
+    saved = storage.quick_save({"TITLE": "Hi", "STEP1": "X"}, fsync="none")
+    monkeypatch.setattr(storage, "_migrate_v1_to_v2", lambda data: pytest.fail("migrazione non attesa"))
+    assert storage.load_recipe(saved)["TITLE"] == "Hi"
@@ -1,4 +1,6 @@
 # tests/test_model.py
+import sys
+
 import pytest
 from template_builder.model import Hero, StepImage, GalleryRow
 
@@ -37,3 +39,25 @@ def test_gallery_row_to_jinja_ctx():
     with pytest.raises(ValueError):
         GalleryRow([s1, s2, StepImage(img="3.png", alt="a3", order=3),
                     StepImage(img="4.png", alt="a4", order=4)])  # >3 imgs
+
+
+def test_recipe_state_roundtrip_and_copy():
+    from template_builder.model import Recipe
+
+    d = {"TITLE": "T", "IMAGES_STEP": ["a.png", "b.png"],
+         "STEPS": [{"IMG_SRC": "a.png", "ORDER": 1}]}
+    r = Recipe.from_dict(d)
+    assert r["IMAGES_STEP"] == ("a.png", "b.png")
+    assert r.to_dict() == d and r == d
+    c = r.copy()
+    assert c == r and c["STEPS"] is r["STEPS"]        # copia superficiale
+    c["TITLE"] = "U"
+    assert r["TITLE"] == "T" and c != r
+    with pytest.raises(TypeError):
+        r["STEPS"][0]["ORDER"] = 2                    # valori immutabili
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10), reason="dataclass(slots=True) richiede Python 3.10")
+def test_dataclasses_use_slots():
+    for cls in (Hero, StepImage, GalleryRow):
+        assert not hasattr(cls(), "__dict__"), cls
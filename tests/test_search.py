@@ -0,0 +1,108 @@
+# tests/test_search.py
+"""Indice full-text delle ricette salvate (FTS5 e indice invertito di riserva)."""
+import pytest
+
+from template_builder.__main__ import main
+from template_builder.services import search, storage
+
+RECIPES = [
+    {"TITLE": "Torta di mele", "INGREDIENTI": "<ul><li>mele</li><li>farina</li></ul>",
+     "STEP1": "Sbucciare le mele", "DESCRIPTION_HTML": "Dolce della nonna"},
+    {"RECIPE_NAME": "Crostata", "INGREDIENTI": "marmellata, farina",
+     "STEPS": [{"TEXT": "Stendere la pasta frolla", "ORDER": 1}]},
+    {"PRODUCT_TITLE": "Mele essiccate", "DESCRIPTION_HTML": "Snack croccante"},
+]
+
+
+def test_recipe_fields():
+    title, desc, ingr, steps = search.recipe_fields(RECIPES[0])
+    assert (title, desc, ingr, steps) == ("Torta di mele", "Dolce della nonna", "mele farina", "Sbucciare le mele")
+    assert search.recipe_fields(RECIPES[1])[3] == "Stendere la pasta frolla"
+
+
+@pytest.fixture
+def history_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "_HISTORY_DIR", tmp_path / "history")
+    return tmp_path / "history"
+
+
+@pytest.mark.parametrize("fts5", [True, False])
+def test_ranked_incremental_search(history_dir, tmp_path, fts5):
+    index = search.RecipeIndex(tmp_path / "idx.sqlite", use_fts5=fts5)
+    paths = [storage.quick_save(r, fsync="none") for r in RECIPES]
+    assert index.refresh(history_dir) == 3
+    assert index.refresh(history_dir) == 0               # nulla di cambiato
+
+    hits = index.search("mele")
+    assert {h.title for h in hits} == {"Torta di mele", "Mele essiccate"}
+    assert {h.title for h in index.search("farin")} == {"Torta di mele", "Crostata"}  # prefisso
+    assert [h.path for h in index.search("pasta frolla")] == [str(paths[1])]
+    assert index.search("mele marmellata") == []
+
+    paths[2].unlink()
+    index.refresh(history_dir)
+    assert {h.title for h in index.search("mele")} == {"Torta di mele"}
+    index.close()
+
+
+def test_save_hook_and_cli(history_dir, tmp_path, capsys):
+    index = search.RecipeIndex(":memory:")
+    search.install_save_hook(index)
+    try:
+        storage.quick_save({"TITLE": "Tiramisù", "STEP1": "Montare il mascarpone"}, fsync="none")
+        assert index.search("mascarpone")[0].title == "Tiramisù"
+    finally:
+        storage._SAVE_HOOKS.clear()
+    db = tmp_path / "cli.sqlite"
+    assert main(["search", "mascarpone", "--folder", str(history_dir), "--db", str(db)]) == 0
+    assert "Tiramisù" in capsys.readouterr().out
+
+
+def test_refresh_does_not_block_searches(history_dir, tmp_path, monkeypatch):
+    import threading
+    import time
+
+    index = search.RecipeIndex(tmp_path / "idx.sqlite")
+    for r in RECIPES:
+        storage.quick_save(r, fsync="none")
+    slow_load = storage.load_recipe
+
+    def load(path):
+        time.sleep(0.2)
+        return slow_load(path)
+
+    monkeypatch.setattr(storage, "load_recipe", load)
+    worker = threading.Thread(target=index.refresh, args=(history_dir,), kwargs={"batch": 1})
+    worker.start()
+    time.sleep(0.05)
+    started = time.perf_counter()
+    index.search("mele")                      # il parsing avviene fuori dal lock
+    assert time.perf_counter() - started < 0.15
+    worker.join()
+    assert {h.title for h in index.search("mele")} == {"Torta di mele", "Mele essiccate"}
+    index.close()
+
+
+def test_builder_close_tears_down_index(history_dir, tmp_path, monkeypatch):
+    import importlib
+    core = importlib.import_module("template_builder.builder_core")
+    monkeypatch.setattr(core, "RecipeIndex", lambda: search.RecipeIndex(tmp_path / "idx.sqlite"))
+
+    app = core.TemplateBuilderApp(enable_gui=False)
+    app._start_search_index()
+    index, hook = app.search_index, app._search_hook
+    assert hook in storage._SAVE_HOOKS
+    app._on_close()
+    assert hook not in storage._SAVE_HOOKS and app.search_index is None
+    assert index.refresh(history_dir) == 0     # indice chiuso: nessuna scrittura
+
+
+@pytest.mark.parametrize("fts5", [True, False])
+def test_closed_index_is_inert(tmp_path, fts5):
+    index = search.RecipeIndex(tmp_path / "idx.sqlite", use_fts5=fts5)
+    index.add(tmp_path / "a.json", RECIPES[0])
+    assert len(index) == 1 and index.search("mele")    # _count() sotto il lock
+    index.close()
+    assert len(index) == 0
+    assert index.search("mele") == []
+    index.remove(tmp_path / "a.json")                  # nessun ProgrammingError
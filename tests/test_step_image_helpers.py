@@ -23,3 +23,30 @@ def test_helpers_ok():
     assert [s.text for s in steps] == ["B", "A"]
     renumber_steps(steps)
     assert [s.order for s in steps] == [1, 2]
+
+
+def test_bind_steps_cached_and_step_count():
+    from template_builder.step_image import bind_steps_cached, step_count
+
+    a = bind_steps_cached(("A", "B"), ("a.png",))
+    assert bind_steps_cached(("A", "B"), ("a.png",)) is a
+    assert [s.alt for s in a] == ["A", "B"] and a[0].img == "a.png"
+    assert step_count(["TITLE", "STEP2", "STEP12", "STEP3_IMG_SRC"]) == 12
+
+
+def test_step_list_columns():
+    from template_builder.step_image import StepList
+
+    sl = StepList(["A", "B", "C", "D"], ["a.png", "", "c.png"])
+    assert len(sl) == 4 and sl.images[3] == ""
+    sl.swap(0, 2)
+    sl.move(3, 0)                       # D in testa
+    assert sl.texts == ["D", "C", "B", "A"]
+    steps = sl.to_steps()
+    assert [s.order for s in steps] == [1, 2, 3, 4]
+    assert steps[1].img == "c.png" and steps[1].alt == "C"
+    assert steps[3].alt == "A"
+    again = StepList.from_steps(reversed(steps))
+    assert again.texts == sl.texts
+    with pytest.raises(ValueError):
+        sl.swap(0, 9)
@@ -17,3 +17,15 @@ def test_migrate_v1(tmp_path):
     new_ctx = load_recipe(f)
     assert "STEPS" in new_ctx
     assert new_ctx["STEP1_IMG_ALT"] == "X"
+
+def test_migrate_v1_keeps_steps_beyond_nine(tmp_path):
+    f = tmp_path / "lunga.json"
+    data = {f"STEP{i}": f"Passo {i}" for i in range(1, 13)}
+    f.write_text(json.dumps({"created": "t", "data": data}), "utf-8")
+    new_ctx = load_recipe(f)
+    assert [s["TEXT"] for s in new_ctx["STEPS"]] == [f"Passo {i}" for i in range(1, 13)]
+    assert new_ctx["STEP12_IMG_ALT"] == "Passo 12"
+
+def test_quick_save_keeps_indented_history_files():
+    saved = quick_save({"TITLE": "Hi"})
+    assert saved.read_text("utf-8").startswith('{\n  "')
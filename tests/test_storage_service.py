@@ -29,3 +29,162 @@ def test_export_html(tmp_path):
     tpl.write_text("<h1>{{ title }}</h1>", encoding="utf-8")
     html = st.export_html({"title": "Hello"}, tpl)
     assert "<h1>Hello</h1>" in html
+
+
+def test_json_codec_selection_and_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.setattr(st, "_HISTORY_DIR", tmp_path)
+    previous = st.set_json_codec("json")
+    try:
+        assert st.get_json_codec().name == "json"
+        state = {"TITLE": "Crème", "IMAGES_STEP": ["a.png"]}
+        path = st.quick_save(state)
+        assert "Crème" in path.read_text("utf-8")     # UTF-8, non \\u-escape
+        assert st.load_recipe(path) == state
+        with pytest.raises(ValueError):
+            st.set_json_codec("nope")
+    finally:
+        st.set_json_codec(previous)
+
+
+def test_undo_snapshots_share_unchanged_values():
+    state = st.Recipe({"a": "1", "IMAGES": ["x.png"]})
+    stack = st.UndoRedoStack()
+    stack.push(state)
+    state["a"] = "2"
+    stack.push(state)
+    assert stack._stack[0]["IMAGES"] is stack._stack[1]["IMAGES"]
+    assert stack.undo() == {"a": "1", "IMAGES": ["x.png"]}
+    assert stack.redo()["a"] == "2"
+
+
+def test_public_api_returns_json_native_containers(tmp_path, monkeypatch):
+    import json
+    monkeypatch.setattr(st, "_HISTORY_DIR", tmp_path)
+    state = {"IMAGES_STEP": ["a.png"], "STEPS": [{"TEXT": "x", "ORDER": 1}]}
+    loaded = st.load_recipe(st.quick_save(state, fsync="none"))
+    loaded["IMAGES_STEP"].append("b.png")
+    loaded["STEPS"][0]["TEXT"] = "y"
+    json.dumps(loaded)
+
+    stack = st.UndoRedoStack()
+    stack.push(state)
+    stack.push({})
+    back = stack.undo()
+    assert type(back) is dict and back == state
+    back["IMAGES_STEP"].append("c.png")
+    json.dumps(back)
+    assert stack.redo() == {} and stack.undo() == state      # lo stack non è toccato
+
+
+def test_atomic_write_policies_and_no_leftovers(tmp_path):
+    target = tmp_path / "out" / "page.html"
+    for policy in st.FSYNC_POLICIES:
+        st.atomic_write(target, f"<p>{policy}</p>", fsync=policy, lock=True)
+        assert target.read_text("utf-8") == f"<p>{policy}</p>"
+    assert sorted(p.name for p in target.parent.iterdir()) == [".storage.lock", "page.html"]
+    with pytest.raises(ValueError):
+        st.atomic_write(target, "x", fsync="sometimes")
+
+
+def test_concurrent_quick_saves_get_distinct_files(tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    monkeypatch.setattr(st, "_HISTORY_DIR", tmp_path)
+    with ThreadPoolExecutor(8) as pool:
+        paths = list(pool.map(lambda i: st.quick_save({"N": str(i)}, fsync="none"), range(32)))
+    assert len(set(paths)) == 32
+    assert sorted(int(st.load_recipe(p)["N"]) for p in paths) == list(range(32))
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_render_many_shares_context(tmp_path, workers):
+    pytest.importorskip("jinja2")
+    from template_builder.model import Recipe
+
+    (tmp_path / "a.html").write_text("A:{{ TITLE }}", "utf-8")
+    (tmp_path / "b.html").write_text("B:{% for s in STEPS %}{{ s }}{% endfor %}", "utf-8")
+    (tmp_path / "bad.html").write_text("{{ TITLE | nofilter }}", "utf-8")
+    templates = [tmp_path / "a.html", tmp_path / "bad.html", tmp_path / "b.html"]
+    ctx = Recipe.from_dict({"TITLE": "Torta", "STEPS": ["x", "y"]})
+    results = st.render_many(ctx, templates, out_dir=tmp_path / "out", workers=workers)
+    assert [r.template.name for r in results] == ["a.html", "bad.html", "b.html"]
+    assert [r.html for r in results] == ["A:Torta", "", "B:xy"]
+    assert not results[1].ok and "nofilter" in results[1].error
+    assert (tmp_path / "out" / "b.html").read_text("utf-8") == "B:xy"
+    assert all(r.seconds >= 0 for r in results)
+
+
+def test_render_many_same_named_templates_do_not_collide(tmp_path):
+    pytest.importorskip("jinja2")
+    for folder in ("ebay", "shop"):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / "page.html").write_text(folder + ":{{ TITLE }}", "utf-8")
+    (tmp_path / "solo.html").write_text("{{ TITLE }}", "utf-8")
+    templates = [tmp_path / "ebay" / "page.html", tmp_path / "shop" / "page.html", tmp_path / "solo.html"]
+    results = st.render_many({"TITLE": "T"}, templates, out_dir=tmp_path / "out")
+    assert [r.path.name for r in results] == ["ebay-page.html", "shop-page.html", "solo.html"]
+    assert [r.path.read_text("utf-8") for r in results] == ["ebay:T", "shop:T", "T"]
+
+
+def test_render_cli(tmp_path, capsys, monkeypatch):
+    pytest.importorskip("jinja2")
+    from template_builder.__main__ import main
+
+    monkeypatch.setattr(st, "_HISTORY_DIR", tmp_path)
+    recipe = st.quick_save({"TITLE": "Torta"}, fsync="none")
+    (tmp_path / "a.html").write_text("{{ TITLE }}", "utf-8")
+    (tmp_path / "b.html").write_text("<b>{{ TITLE }}</b>", "utf-8")
+    assert main(["render", str(recipe), "-t", str(tmp_path / "a.html"), "-t", str(tmp_path / "b.html"),
+                 "--out", str(tmp_path / "out")]) == 0
+    out = capsys.readouterr().out
+    assert "a.html" in out and "b.html" in out
+    assert (tmp_path / "out" / "b.html").read_text("utf-8") == "<b>Torta</b>"
+
+
+def test_quick_save_never_exposes_empty_files(tmp_path, monkeypatch):
+    import threading
+
+    monkeypatch.setattr(st, "_HISTORY_DIR", tmp_path)
+    stop = threading.Event()
+    seen_empty = []
+
+    def watch():
+        while not stop.is_set():
+            for p in tmp_path.glob("recipe_*.json"):
+                try:
+                    if p.stat().st_size == 0:
+                        seen_empty.append(p.name)
+                except FileNotFoundError:
+                    pass
+
+    watcher = threading.Thread(target=watch)
+    watcher.start()
+    try:
+        for i in range(50):
+            st.quick_save({"N": str(i)}, fsync="none")
+    finally:
+        stop.set()
+        watcher.join()
+    assert seen_empty == []
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_dir_lock_is_per_folder_and_reentrant(tmp_path):
+    import threading
+
+    a, b = tmp_path / "a", tmp_path / "b"
+    a.mkdir()
+    b.mkdir()
+    with st.dir_lock(a, True):
+        with st.dir_lock(a, True):          # annidato: nessun deadlock
+            st.atomic_write(a / "x.txt", "1", fsync="none", lock=True)
+        done = threading.Event()
+
+        def other_folder():
+            with st.dir_lock(b, True):
+                done.set()
+
+        t = threading.Thread(target=other_folder)
+        t.start()
+        t.join(2)
+        assert done.is_set()                 # un'altra cartella non attende "a"
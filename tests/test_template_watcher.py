@@ -0,0 +1,150 @@
+# tests/test_template_watcher.py
+"""
+Hot-reload dei template: watcher (polling e inotify) + ricostruzione
+selettiva delle tab in TemplateBuilderApp (head-less, builder stub).
+"""
+import importlib
+import os
+
+import pytest
+
+from template_builder.services import storage
+from template_builder.services.catalog import TemplateCatalog
+from template_builder.services.watcher import TemplateWatcher
+
+os.environ.pop("DISPLAY", None)
+core = importlib.import_module("template_builder.builder_core")
+
+
+def _write(path, text, bump=0):
+    path.write_text(text, encoding="utf-8")
+    if bump:
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + bump * 10**9))
+
+
+@pytest.mark.parametrize("use_inotify", [False, True])
+def test_watcher_reports_changed_templates(tmp_path, use_inotify):
+    folder = tmp_path / "tpl"
+    folder.mkdir()
+    _write(folder / "a.html", "{{ A }}")
+    _write(folder / "b.html", "{{ B }}")
+    catalog = TemplateCatalog(folder, index_path=tmp_path / "idx.json")
+    catalog.refresh()
+    watcher = TemplateWatcher(catalog, use_inotify=use_inotify)
+    if use_inotify and not watcher.uses_inotify:
+        pytest.skip("inotify non disponibile")
+    try:
+        assert watcher.poll() == []
+        _write(folder / "b.html", "{{ B }}{{ C }}", bump=1)
+        assert watcher.poll() == ["b.html"]
+        assert catalog.get("b.html", check=False).placeholders == ["B", "C"]
+        assert watcher.poll() == []
+        _write(folder / "c.html", "{{ X }}")
+        assert watcher.poll() == ["c.html"]
+    finally:
+        watcher.close()
+
+
+def test_watcher_recompiles_only_changed(tmp_path):
+    pytest.importorskip("jinja2")
+    folder = tmp_path / "tpl"
+    folder.mkdir()
+    _write(folder / "a.html", "A={{ A }}")
+    _write(folder / "b.html", "B={{ B }}")
+    catalog = TemplateCatalog(folder, index_path=tmp_path / "idx.json")
+    catalog.refresh()
+    watcher = TemplateWatcher(catalog, use_inotify=False)
+    tpl_a = storage.compile_template(folder / "a.html")
+    storage.compile_template(folder / "b.html")
+    _write(folder / "b.html", "B2={{ B }}", bump=1)
+    watcher.poll()
+    assert storage.compile_template(folder / "a.html") is tpl_a
+    assert storage.export_html({"B": 1}, folder / "b.html") == "B2=1"
+
+
+class _Layouts:
+    """App head-less con builder di tab registrati invece che creati."""
+
+    def __init__(self, tmp_path, monkeypatch):
+        folder = tmp_path / "tpl"
+        folder.mkdir()
+        monkeypatch.setattr(core, "TEMPLATE_FOLDER", folder)
+        self.folder = folder
+        self.app = core.TemplateBuilderApp(enable_gui=False)
+        self.app.catalog = TemplateCatalog(folder, index_path=tmp_path / "idx.json")
+        self.built, self.previews = [], []
+        self.app._tabs = {"Product": object()}   # tab già create
+        self.app._built_tabs = {"Product", "Recipe", "Other", "Images"}
+        monkeypatch.setattr(self.app, "_sync_field_tab", lambda t, k: self.built.append(t))
+        monkeypatch.setattr(self.app, "_sync_image_groups", lambda *g: self.built.append("Images"))
+        monkeypatch.setattr(self.app, "update_preview", lambda: self.previews.append(1))
+
+
+def test_hot_reload_rebuilds_only_affected_tabs(tmp_path, monkeypatch):
+    env = _Layouts(tmp_path, monkeypatch)
+    app = env.app
+    _write(env.folder / "t.html", "{{ TITLE }}{{ STEP1 }}{{ FOOTER }}")
+    app.catalog.refresh()
+    app._layout = app._template_layout("t.html")
+
+    # stesso set di placeholder → solo anteprima
+    _write(env.folder / "t.html", "<b>{{ TITLE }}</b>{{ STEP1 }}{{ FOOTER }}", bump=1)
+    app._on_template_file_changed("t.html")
+    assert env.built == [] and env.previews == [1]
+
+    # nuovo step → solo la tab Recipe
+    _write(env.folder / "t.html", "{{ TITLE }}{{ STEP1 }}{{ STEP2 }}{{ FOOTER }}", bump=2)
+    app._on_template_file_changed("t.html")
+    assert env.built == ["Recipe"]
+
+    # nuovo gruppo immagini → solo la tab Images
+    _write(env.folder / "t.html",
+           "{{ TITLE }}{{ STEP1 }}{{ STEP2 }}{{ FOOTER }}{{ DESC1_SRC }}{{ DESC1_ALT }}", bump=3)
+    app._on_template_file_changed("t.html")
+    assert env.built == ["Recipe", "Images"]
+
+
+def test_unbuilt_tabs_only_update_model(tmp_path, monkeypatch):
+    env = _Layouts(tmp_path, monkeypatch)
+    app = env.app
+    app._built_tabs = {"Product"}
+    _write(env.folder / "t.html", "{{ TITLE }}{{ STEP1 }}")
+    app.catalog.refresh()
+    app._layout = app._template_layout("t.html")
+    _write(env.folder / "t.html", "{{ TITLE }}{{ STEP1 }}{{ STEP2 }}{{ DESC1_SRC }}{{ DESC1_ALT }}", bump=1)
+    app._on_template_file_changed("t.html")
+    assert env.built == []                        # Recipe/Images mai aperte
+    assert app.model.tab_of("STEP2") == "Recipe"
+
+
+class _FakePanel:
+    def __init__(self):
+        self.keys = []
+
+    def set_keys(self, keys):
+        self.keys.append(list(keys))
+
+
+def test_field_tab_sync_uses_panel():
+    app = core.TemplateBuilderApp(enable_gui=False)
+    panel = app._panels["Recipe"] = _FakePanel()
+    app._sync_field_tab("Recipe", ["INGREDIENTI", "STEP1"])
+    app._sync_field_tab("Other", ["FOOTER"])          # tab non costruita
+    assert panel.keys == [["INGREDIENTI", "STEP1"]]
+
+
+def test_partial_change_reports_dependents(tmp_path):
+    pytest.importorskip("jinja2")
+    folder = tmp_path / "tpl"
+    folder.mkdir()
+    _write(folder / "_head.html", "<h1>{{ TITLE }}</h1>")
+    _write(folder / "a.html", "{% include '_head.html' %}{{ A }}")
+    _write(folder / "b.html", "{{ B }}")
+    catalog = TemplateCatalog(folder, index_path=tmp_path / "idx.json")
+    catalog.refresh()
+    watcher = TemplateWatcher(catalog, use_inotify=False)
+    assert storage.export_html({"TITLE": "x", "A": 1}, folder / "a.html") == "<h1>x</h1>1"
+    _write(folder / "_head.html", "<h2>{{ TITLE }}</h2>", bump=1)
+    assert watcher.poll() == ["_head.html", "a.html"]
+    assert storage.export_html({"TITLE": "x", "A": 1}, folder / "a.html") == "<h2>x</h2>1"
@@ -26,3 +26,40 @@ def test_undo_redo_headless() -> None:
     # Le chiamate non devono sollevare
     app.edit_undo()
     app.edit_redo()
+
+
+class _Panel:
+    def __init__(self):
+        self.refreshed = []
+
+    def refresh(self, keys=None):
+        self.refreshed.append(set(keys))
+
+
+class _Engine:
+    def __init__(self):
+        self.renders = 0
+
+    def render(self, html):
+        self.renders += 1
+
+
+def test_apply_state_batches_changed_keys_only() -> None:
+    app = TemplateBuilderApp(enable_gui=False)
+    app.enable_gui, app.root = True, object()      # finta GUI
+    app.preview_engine = _Engine()
+    panel = app._panels["Recipe"] = _Panel()
+    for key in ("STEP1", "STEP2", "INGREDIENTI"):
+        app.model.define(key, "Recipe")
+    app.model.set("STEP1", "uno")
+    app.model.set("STEP2", "due")
+
+    # un widget che chiama update_preview durante il batch non genera render extra
+    app._panels["Other"] = type("P", (), {"refresh": lambda self, keys: app.update_preview()})()
+    app._state = {"STEP1": "uno", "STEP2": "DUE", "INGREDIENTI": "sale"}
+    app._apply_state_to_widgets()
+    assert panel.refreshed == [{"STEP2", "INGREDIENTI"}]
+    assert app.preview_engine.renders == 1
+
+    app._apply_state_to_widgets()                   # nessun cambiamento
+    assert len(panel.refreshed) == 1 and app.preview_engine.renders == 2
@@ -75,23 +75,140 @@ def test_placeholder_multi_text_field(root):
 # ---------- Test: SortableImageRepeaterField ---------- #
 @pytest.mark.skipif(not HAS_DISPLAY, reason="Display non disponibile")
 def test_sortable_image_repeater_field(root):
-    s = SortableImageRepeaterField(root)
-    s._add_row("url1")
+    s = SortableImageRepeaterField(root, visible_rows=2)
+    s._add_row("", placeholder="{{A_SRC}}")
     s._add_row("url2")
+    assert s.get_urls() == ["", "url2"]
 
-    # Simuliamo l'inserimento di percorsi reali
-    for i, frame in enumerate(s._rows):
-        entry = frame.winfo_children()[0]
-        entry._clear_placeholder()
-        entry.delete(0, tk.END)
-        entry.insert(0, f"path{i+1}")
+    # Simuliamo la digitazione nelle righe visibili (slot riciclati)
+    for i, slot in enumerate(s._slots):
+        slot.entry.set_value(f"path{i+1}")
+        s._on_slot_edit(slot)
 
     assert s.get_urls() == ["path1", "path2"]
 
     # Sposta la seconda riga in cima
-    s._move_row(s._rows[1], -1)
+    s._move_row(1, -1)
     assert s.get_urls() == ["path2", "path1"]
+    assert s._slots[0].entry.get_value() == "path2"
 
     # Cancella la prima riga
-    s._del_row(s._rows[0])
+    s._del_row(0)
     assert s.get_urls() == ["path1"]
+
+
+@pytest.mark.skipif(not HAS_DISPLAY, reason="Display non disponibile")
+def test_sortable_image_repeater_delegates_moves(root):
+    moves = []
+    s = SortableImageRepeaterField(root, on_move=lambda i, j: moves.append((i, j)))
+    s.set_urls(["a.png", "b.png"])
+    s._move_row(1, -1)
+    assert moves == [(1, 0)] and s.get_urls() == ["a.png", "b.png"]
+
+
+@pytest.mark.skipif(not HAS_DISPLAY, reason="Display non disponibile")
+def test_sortable_image_repeater_virtualized(root):
+    s = SortableImageRepeaterField(root, visible_rows=5)
+    s.set_urls([f"img{i}.png" for i in range(500)])
+    # solo gli slot visibili hanno widget
+    assert len(s._slots) == 5
+    s.yview("moveto", 0.5)
+    assert s._slots[0].entry.get_value() == "img250.png"
+    s._move_row(499, -1)
+    assert s.get_urls()[-2:] == ["img499.png", "img498.png"]
+
+
+@pytest.mark.skipif(not HAS_DISPLAY, reason="Tkinter/display non disponibile")
+def test_virtual_field_panel_recycles_slots(root):
+    from template_builder.field_model import FieldModel
+    from template_builder.widgets import VirtualFieldPanel
+
+    model = FieldModel()
+    keys = [f"F{i:03d}" for i in range(300)]
+    for k in keys:
+        model.define(k, "Other")
+    model.set("F150", "ciao")
+    panel = VirtualFieldPanel(root, model, visible_rows=5)
+    panel.set_keys(keys)
+    assert len(panel._slots) == 5
+    panel.yview("moveto", 0.5)
+    assert panel.get_field("F150").get_raw() == "ciao"
+    assert len(panel._slots) == 5
+
+
+def test_virtual_panel_resize_does_not_oscillate():
+    """Logica di _apply_resize senza display: l'eco del proprio repack è ignorato."""
+    from types import SimpleNamespace
+    from template_builder.widgets import VirtualFieldPanel
+
+    synced = []
+    frame = SimpleNamespace(winfo_reqheight=lambda: 100)
+    panel = SimpleNamespace(
+        _resize_job="after#1", _resize_height=450, _fit_height=None, visible_rows=6,
+        _slots=[SimpleNamespace(frame=frame)], _sync_view=lambda: synced.append(panel.visible_rows),
+    )
+    VirtualFieldPanel._apply_resize(panel)
+    assert panel.visible_rows == 4 and synced == [4] and panel._resize_job is None
+    panel._resize_height = 400                  # il repack riduce l'altezza a 4 righe
+    VirtualFieldPanel._apply_resize(panel)
+    assert synced == [4]
+    panel._resize_height = 620                  # finestra ingrandita davvero
+    VirtualFieldPanel._apply_resize(panel)
+    assert synced == [4, 6]
+
+
+@pytest.mark.skipif(not HAS_DISPLAY, reason="Display non disponibile")
+def test_programmatic_edits_reach_on_change(root):
+    calls = []
+    entry = PlaceholderEntry(root, placeholder="url", on_change=lambda: calls.append("entry"))
+    entry.set_value("a.png")                    # set_value non notifica
+    assert calls == []
+    entry.insert("end", "-b")                   # incolla/drop/insert sì
+    assert calls == ["entry"]
+
+    mtf = PlaceholderMultiTextField(root, "ph", on_change=lambda: calls.append("text"))
+    mtf.set_value("uno")
+    root.update()
+    assert calls == ["entry"]
+    mtf.text.insert("end", " due")
+    root.update()
+    assert calls == ["entry", "text"] and mtf.get_raw() == "uno due"
+
+
+def test_thumbnail_reaches_every_row_sharing_an_image(monkeypatch):
+    """_poll_thumbs senza display: due righe con la stessa immagine."""
+    from concurrent.futures import Future
+    from types import SimpleNamespace
+    import template_builder.widgets as w
+
+    fut = Future()
+    fut.set_result(b"png")
+    cache = {}
+    monkeypatch.setattr(w.tk, "PhotoImage", lambda master, data: "photo")
+    monkeypatch.setattr(w, "_thumb_cache", lambda: SimpleNamespace(put=cache.__setitem__))
+    shown = []
+    slots = [SimpleNamespace(index=i) for i in range(3)]
+    field = SimpleNamespace(
+        _thumb_poll="after#1", _THUMB_POLL_MS=50, _slots=slots,
+        _rows=[SimpleNamespace(src=s) for s in ("a.png", "b.png", "a.png")],
+        _thumb_jobs={"a.png": fut}, _show_thumb=shown.append,
+    )
+    SortableImageRepeaterField._poll_thumbs(field)
+    assert cache == {"a.png": "photo"}
+    assert shown == [slots[0], slots[2]] and field._thumb_jobs == {}
+
+
+def test_cancel_validation_cancels_debounce_and_polling():
+    cancelled = []
+
+    class _Entry:
+        def after_cancel(self, after_id):
+            cancelled.append(after_id)
+
+    entry = _Entry()
+    entry._after_id, entry._poll_id = "after#1", "after#2"
+    SortableImageRepeaterField._cancel_validation(entry)
+    assert sorted(cancelled) == ["after#1", "after#2"]
+    assert not hasattr(entry, "_poll_id") and not hasattr(entry, "_after_id")
+    SortableImageRepeaterField._cancel_validation(entry)     # niente da annullare
+    assert len(cancelled) == 2